@@ -0,0 +1,66 @@
+"""
+Export queries shared by the /api/admin/export endpoint and export_data.py.
+
+export_cursor works with both a Motor and a PyMongo database: it only calls
+find and aggregate, whose signatures the two drivers share. Every query is
+sorted by created_at, which is indexed on all exported collections and
+their archives, so exports stream in index order without an in-memory sort.
+"""
+
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+EXPORT_COLUMNS = {
+    "games": ["game_id", "creator_id", "event_name", "entry_fee", "status", "squares", "random_numbers", "quarter_scores", "winners", "created_at"],
+    "game_entries": ["entry_id", "game_id", "user_id", "user_name", "square_number", "paid_amount", "created_at"],
+    "payouts": ["payout_id", "game_id", "user_id", "quarter", "amount", "paid", "created_at"],
+}
+
+# Completed games are moved here, with their entries and payouts, by the backend archiver
+ARCHIVE_COLLECTIONS = {"games": "games_archive", "game_entries": "game_entries_archive", "payouts": "payouts_archive"}
+
+
+def json_default(value: Any) -> Any:
+    """JSON encoder fallback for values stored by Mongo"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.isoformat()
+    return str(value)
+
+
+def csv_value(value: Any) -> Any:
+    """Flatten a document field into a single CSV cell"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=json_default)
+    if isinstance(value, datetime):
+        return json_default(value)
+    return value
+
+
+def export_cursor(db, collection: str, start: Optional[datetime], end: Optional[datetime], status: Optional[str], batch_size: int, archived: bool = False):
+    """Cursor over one collection (or its archive) filtered by created_at range and game status"""
+    source = ARCHIVE_COLLECTIONS[collection] if archived else collection
+    match: Dict[str, Any] = {}
+    if start or end:
+        match["created_at"] = {}
+        if start:
+            match["created_at"]["$gte"] = start
+        if end:
+            match["created_at"]["$lt"] = end
+    projection = {"_id": 0, **{column: 1 for column in EXPORT_COLUMNS[collection]}}
+
+    if collection == "games" or not status:
+        if status:
+            match["status"] = status
+        return db[source].find(match, projection, batch_size=batch_size).sort("created_at", 1)
+
+    # Entries and payouts are filtered by the status of the game they belong to
+    return db[source].aggregate([
+        {"$match": match},
+        {"$sort": {"created_at": 1}},
+        {"$lookup": {"from": ARCHIVE_COLLECTIONS["games"] if archived else "games", "localField": "game_id", "foreignField": "game_id", "as": "game"}},
+        {"$match": {"game.status": status}},
+        {"$project": projection},
+    ], batchSize=batch_size, allowDiskUse=True)
@@ -1,26 +1,348 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Header, Request, Response, Cookie
+from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.encoders import jsonable_encoder
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import cookie_parser
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReadPreference, UpdateOne, ReplaceOne, CursorType, ReturnDocument
+from bson import Timestamp, decode as bson_decode, encode as bson_encode
+from pymongo.errors import CollectionInvalid, ConnectionFailure, ExecutionTimeout, BulkWriteError
 import os
 import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import httpx
+import jwt
+import asyncio
 from pathlib import Path
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, ValidationError, field_validator
+from typing import List, Optional, Dict, Any, Tuple, Callable, Awaitable, FrozenSet, AsyncIterator
 import uuid
 from datetime import datetime, timezone, timedelta
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from urllib.parse import urlsplit
 import random
+import time
+import csv
+import io
+import json
+import hashlib
+import base64
+import queue
+import re
+import math
+import bisect
+import copy
+from functools import lru_cache
+import numpy as np
+
+from exports import ARCHIVE_COLLECTIONS, EXPORT_COLUMNS, csv_value, export_cursor, json_default
 
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# MongoDB connection; an unreachable server fails calls after
+# MONGO_SERVER_SELECTION_TIMEOUT_MS instead of the driver's 30s
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, serverSelectionTimeoutMS=int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")))
 db = client[os.environ['DB_NAME']]
 
+# Read routing: read-heavy routes can be served by replica set secondaries.
+# Set READ_PREFERENCE for all routes or READ_PREFERENCE_<ROUTE> per route
+# (e.g. READ_PREFERENCE_GET_GAMES=secondaryPreferred). The game list shared
+# by all users is always rebuilt from the primary; get_games only reads the
+# caller's own entries with its preference.
+READ_PREFERENCE_MODES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+DEFAULT_READ_PREFERENCE = os.environ.get("READ_PREFERENCE", "primary")
+ROUTE_READ_PREFERENCES = {
+    route: os.environ.get(f"READ_PREFERENCE_{route.upper()}", DEFAULT_READ_PREFERENCE)
+    for route in ("get_games", "get_game", "get_profile")
+}
+route_dbs = {
+    route: client.get_database(os.environ['DB_NAME'], read_preference=READ_PREFERENCE_MODES[mode])
+    for route, mode in ROUTE_READ_PREFERENCES.items()
+}
+secondary_reads_enabled = any(mode != "primary" for mode in ROUTE_READ_PREFERENCES.values())
+
+# How long a user's last write is tracked for read-your-writes. Secondaries
+# catch up long before this, after which plain secondary reads are safe.
+CAUSAL_TOKEN_TTL_SECONDS = float(os.environ.get("CAUSAL_TOKEN_TTL_SECONDS", "300"))
+CAUSAL_TOKEN_MAX_USERS = int(os.environ.get("CAUSAL_TOKEN_MAX_USERS", "100000"))
+# user_id -> (recorded_at, cluster_time, operation_time)
+causal_tokens: "OrderedDict[str, Tuple[float, Dict[str, Any], Any]]" = OrderedDict()
+# Workers do not share causal_tokens, so a user's token is also handed to the
+# client (X-Causal-Token header and causal_token cookie) and echoed back:
+# reads landing on another worker then wait for the write all the same.
+# Echoed tokens more than CAUSAL_TOKEN_MAX_SKEW_SECONDS ahead are ignored.
+CAUSAL_TOKEN_HEADER = "X-Causal-Token"
+CAUSAL_TOKEN_COOKIE = "causal_token"
+CAUSAL_TOKEN_MAX_SKEW_SECONDS = 60
+
+# Auth token mode: "session" looks up every bearer token in user_sessions.
+# "jwt" also issues short-lived signed access tokens that are verified
+# in-process; the session token then only serves as the refresh token.
+AUTH_TOKEN_MODE = os.environ.get("AUTH_TOKEN_MODE", "session")
+JWT_SECRET = os.environ.get("JWT_SECRET", "")
+JWT_ALGORITHM = "HS256"
+ACCESS_TOKEN_TTL_SECONDS = int(os.environ.get("ACCESS_TOKEN_TTL_SECONDS", "900"))
+REVOCATION_SYNC_INTERVAL_SECONDS = float(os.environ.get("REVOCATION_SYNC_INTERVAL_SECONDS", "15"))
+if AUTH_TOKEN_MODE == "jwt" and not JWT_SECRET:
+    raise RuntimeError("JWT_SECRET must be set when AUTH_TOKEN_MODE=jwt")
+
+# Sliding session expiry: a session used at least once per SESSION_TTL_DAYS
+# stays alive. Last-seen updates are written at most once per
+# SESSION_TOUCH_INTERVAL_SECONDS per session and flushed in bulk.
+SESSION_TTL = timedelta(days=float(os.environ.get("SESSION_TTL_DAYS", "7")))
+SESSION_TOUCH_INTERVAL = timedelta(seconds=float(os.environ.get("SESSION_TOUCH_INTERVAL_SECONDS", "300")))
+SESSION_FLUSH_INTERVAL_SECONDS = float(os.environ.get("SESSION_FLUSH_INTERVAL_SECONDS", "10"))
+
+# session_token -> last seen time, waiting to be flushed to user_sessions
+dirty_sessions: Dict[str, datetime] = {}
+
+# Users allowed to call /api/admin/* (comma separated user_ids)
+ADMIN_USER_IDS = {uid.strip() for uid in os.environ.get("ADMIN_USER_IDS", "").split(",") if uid.strip()}
+
+# Streaming exports: documents fetched per cursor batch / per response chunk.
+# Columns and queries are in exports.py, shared with export_data.py.
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "1000"))
+
+# Leaderboards are kept sorted in memory per scope ("global" or
+# "event:<event_name>") and persisted in the leaderboards collection. Loaded
+# scopes are re-read after LEADERBOARD_REFRESH_SECONDS to pick up updates
+# made by other workers. At most LEADERBOARD_CACHE_MAX_SCOPES scopes are
+# kept; any event name can be asked for, so the least recently used go.
+LEADERBOARD_METRICS = ("total_won", "net_profit", "win_count")
+LEADERBOARD_REFRESH_SECONDS = float(os.environ.get("LEADERBOARD_REFRESH_SECONDS", "30"))
+LEADERBOARD_CACHE_MAX_SCOPES = int(os.environ.get("LEADERBOARD_CACHE_MAX_SCOPES", "100"))
+
+# Share of the pot paid out per quarter
+QUARTERS = ["Q1", "Q2", "Q3", "Q4"]
+PAYOUT_PERCENTAGES = {"Q1": 0.20, "Q2": 0.20, "Q3": 0.20, "Q4": 0.40}
+
+# Historical end-of-quarter scores (CSV with quarter,team1,team2 columns,
+# cumulative scores) used to estimate how likely each winning number is.
+# No dataset ships with the app; without one game odds are null. A header
+# and rows like "Q1,7,3" and "Q2,14,10" are all it needs. It is parsed at
+# startup, and again off the event loop when the file changes.
+SCORE_DATASET_PATH = Path(os.environ.get("SCORE_DATASET_PATH", ROOT_DIR / "data" / "historical_scores.csv"))
+
+# The shared part of GET /api/games (the 100 newest games) is cached as
+# pre-serialized JSON and invalidated on every game mutation. The TTL bounds
+# staleness for mutations handled by other workers.
+GAMES_LIST_CACHE_TTL_SECONDS = float(os.environ.get("GAMES_LIST_CACHE_TTL_SECONDS", "5"))
+GAMES_LIST_PROJECTION = {"_id": 0, "game_id": 1, "creator_id": 1, "event_name": 1, "entry_fee": 1, "status": 1, "squares": 1, "random_numbers": 1, "created_at": 1, "quarter_scores": 1, "winners": 1, "name": 1}
+
+# Sparse fieldsets: ?fields=a,b on the game list, game details and profile
+# selects top-level fields; queries for fields not asked for are skipped.
+# filled_squares is computed by MongoDB so list clients can leave out the
+# squares arrays; list items always carry game_id. Each field selection of
+# the list is cached separately.
+GAMES_LIST_FIELDS = {
+    **{field: 1 for field in GAMES_LIST_PROJECTION if field != "_id"},
+    "filled_squares": {"$size": {"$filter": {"input": "$squares", "cond": {"$ne": ["$$this", None]}}}},
+    "user_entries": None,
+}
+GAMES_LIST_CACHE_MAX_VARIANTS = 16
+GAME_RELATED_FIELDS = {"entries", "payouts", "held_squares", "odds"}
+
+# Delta sync: every game change takes the next number of a global change
+# sequence; GET /api/games/changes returns what changed after a client's
+# number, with tombstones (kept GAME_TOMBSTONE_RETENTION_DAYS) for games that
+# left the collection. Numbers are taken just before their write lands, so
+# the last GAME_CHANGES_OVERLAP changes are sent again in case one landed
+# late. Clients with more than GAME_CHANGES_MAX changes to catch up on are
+# told to reload the list.
+GAME_CHANGES_OVERLAP = int(os.environ.get("GAME_CHANGES_OVERLAP", "20"))
+GAME_CHANGES_MAX = int(os.environ.get("GAME_CHANGES_MAX", "200"))
+GAME_TOMBSTONE_RETENTION_DAYS = float(os.environ.get("GAME_TOMBSTONE_RETENTION_DAYS", "7"))
+PROFILE_FIELDS = ("user", "entries", "payouts", "created_games", "total_winnings")
+
+# Write-through cache of game documents. Every game write is conditional on
+# the document's version stamp and announced on a capped collection that all
+# workers tail to evict their copies.
+GAME_CACHE_MAX_SIZE = int(os.environ.get("GAME_CACHE_MAX_SIZE", "5000"))
+CACHE_INVALIDATION_FEED_BYTES = int(os.environ.get("CACHE_INVALIDATION_FEED_BYTES", str(4 * 1024 * 1024)))
+CACHE_INVALIDATION_POLL_SECONDS = float(os.environ.get("CACHE_INVALIDATION_POLL_SECONDS", "0.2"))
+WORKER_ID = uuid.uuid4().hex
+
+# game_id -> game document, least recently used first
+game_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+# Joins for the same game arriving within JOIN_BATCH_WINDOW_MS of each other
+# are validated and written together as one batch.
+JOIN_BATCH_WINDOW_MS = float(os.environ.get("JOIN_BATCH_WINDOW_MS", "5"))
+
+# A square tapped in the app is held for the player for SQUARE_HOLD_SECONDS
+# while they confirm. Expired holds are released in bulk every
+# SQUARE_HOLD_SWEEP_SECONDS; the TTL index only drops holds no worker got to
+# within SQUARE_HOLD_RETENTION_SECONDS of expiring.
+SQUARE_HOLD_SECONDS = int(os.environ.get("SQUARE_HOLD_SECONDS", "30"))
+SQUARE_HOLD_SWEEP_SECONDS = float(os.environ.get("SQUARE_HOLD_SWEEP_SECONDS", "1"))
+SQUARE_HOLD_SWEEP_BATCH = int(os.environ.get("SQUARE_HOLD_SWEEP_BATCH", "1000"))
+SQUARE_HOLD_RETENTION_SECONDS = int(os.environ.get("SQUARE_HOLD_RETENTION_SECONDS", "86400"))
+
+# Games completed more than ARCHIVE_AFTER_DAYS ago are moved, with their
+# entries and payouts, to the cold ARCHIVE_COLLECTIONS (see exports.py) in
+# batches of ARCHIVE_BATCH_SIZE games. Reads by game_id fall back to the archive.
+# Set ARCHIVE_AFTER_DAYS=0 to turn archiving off.
+ARCHIVE_AFTER_DAYS = float(os.environ.get("ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", "100"))
+ARCHIVE_BATCH_PAUSE_SECONDS = float(os.environ.get("ARCHIVE_BATCH_PAUSE_SECONDS", "1"))
+ARCHIVE_INTERVAL_SECONDS = float(os.environ.get("ARCHIVE_INTERVAL_SECONDS", "3600"))
+
+# Side effects of a settled quarter (payout, balance credit, leaderboards)
+# run as jobs stored in MongoDB, claimed in batches under a lease by
+# JOB_WORKERS workers per process. Failed jobs are retried with exponential
+# backoff and moved to dead_jobs after JOB_MAX_ATTEMPTS; a lease running out
+# counts as a failed attempt. Users remember their last CREDITED_PAYOUTS_KEPT
+# credited payouts so retries never pay twice. A settlement is also kept on
+# its game until it has run, and every SETTLEMENT_RECONCILE_SECONDS those
+# older than SETTLEMENT_GRACE_SECONDS without a job are queued again.
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_BATCH_SIZE = int(os.environ.get("JOB_BATCH_SIZE", "100"))
+JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", "0.5"))
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_SECONDS = float(os.environ.get("JOB_RETRY_BASE_SECONDS", "2"))
+CREDITED_PAYOUTS_KEPT = 100
+SETTLEMENT_RECONCILE_SECONDS = float(os.environ.get("SETTLEMENT_RECONCILE_SECONDS", "60"))
+SETTLEMENT_GRACE_SECONDS = float(os.environ.get("SETTLEMENT_GRACE_SECONDS", "60"))
+
+# Live scores: SCORE_FEED names the adapter that delivers quarter-end scores
+# (tcp://host:port, or file:///path to replay a recorded feed). Each new
+# score is recorded on every active game of its event, up to
+# SCORE_SETTLE_CONCURRENCY games at a time. Run the feed in one process;
+# repeated deliveries are skipped and never settle a quarter twice.
+SCORE_FEED = os.environ.get("SCORE_FEED", "")
+SCORE_SETTLE_CONCURRENCY = int(os.environ.get("SCORE_SETTLE_CONCURRENCY", "50"))
+SCORE_SETTLE_ATTEMPTS = 3
+SCORE_FEED_RETRY_SECONDS = float(os.environ.get("SCORE_FEED_RETRY_SECONDS", "5"))
+SCORE_FEED_REPLAY_DELAY_SECONDS = float(os.environ.get("SCORE_FEED_REPLAY_DELAY_SECONDS", "0"))
+SCORE_FEED_DEDUPE_MAX = 10000
+
+# Opt-in capture of API traffic for replay_traffic.py: one JSON line per
+# request in a rotating log. Tokens are stored as hashes only.
+TRAFFIC_CAPTURE_PATH = os.environ.get("TRAFFIC_CAPTURE_PATH", "")
+TRAFFIC_CAPTURE_MAX_BYTES = int(os.environ.get("TRAFFIC_CAPTURE_MAX_BYTES", str(50 * 1024 * 1024)))
+TRAFFIC_CAPTURE_BACKUPS = int(os.environ.get("TRAFFIC_CAPTURE_BACKUPS", "5"))
+TRAFFIC_CAPTURE_MAX_BODY_BYTES = int(os.environ.get("TRAFFIC_CAPTURE_MAX_BODY_BYTES", "4096"))
+
+# Admission control: at most ADMISSION_MAX_CONCURRENCY API requests run at
+# once (0 turns it off), up to ADMISSION_QUEUE_SIZE more wait, and the rest
+# get 503 + Retry-After. Priority 0 (money-moving writes) is served before
+# 1 (everything else) and 2 (heavy reads). ADMISSION_ROUTE_LIMITS (JSON)
+# caps single routes below the global limit.
+ADMISSION_MAX_CONCURRENCY = int(os.environ.get("ADMISSION_MAX_CONCURRENCY", "64"))
+ADMISSION_QUEUE_SIZE = int(os.environ.get("ADMISSION_QUEUE_SIZE", "256"))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT_SECONDS", "2"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.environ.get("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+ADMISSION_ROUTES = [
+    ("POST", re.compile(r"^/api/games/quick-join$"), "quick_join", 0),
+    ("POST", re.compile(r"^/api/games/[^/]+/join$"), "join_game", 0),
+    ("POST", re.compile(r"^/api/games/[^/]+/score$"), "update_score", 0),
+    ("POST", re.compile(r"^/api/games/[^/]+/reserve$"), "reserve_square", 0),
+    ("GET", re.compile(r"^/api/games$"), "get_games", 2),
+    ("GET", re.compile(r"^/api/games/changes$"), "get_game_changes", 2),
+    ("GET", re.compile(r"^/api/games/[^/]+$"), "get_game", 1),
+    ("GET", re.compile(r"^/api/profile$"), "get_profile", 2),
+    ("GET", re.compile(r"^/api/leaderboards$"), "get_leaderboard", 2),
+    ("GET", re.compile(r"^/api/admin/export/"), "export_collection", 2),
+]
+ADMISSION_ROUTE_LIMITS = {
+    "get_games": max(1, ADMISSION_MAX_CONCURRENCY // 2),
+    "get_profile": max(1, ADMISSION_MAX_CONCURRENCY // 4),
+    "get_leaderboard": max(1, ADMISSION_MAX_CONCURRENCY // 4),
+    "export_collection": 2,
+    **json.loads(os.environ.get("ADMISSION_ROUTE_LIMITS", "{}")),
+}
+# Monitoring must keep working while the API is overloaded
+ADMISSION_EXEMPT_PATHS = {"/api/admin/admission"}
+# A batch only dispatches; its sub-requests are admitted one by one, so the
+# batch holding a slot while they wait could starve them
+ADMISSION_DISPATCH_PATHS = {"/api/batch"}
+
+# Token-bucket rate limits per route (admission route names): burst
+# capacity and refill per second for each caller, overridable with
+# RATE_LIMITS (JSON, {"route": [capacity, per_second]}). Buckets live in
+# this worker ("memory"), in MongoDB shared by all workers ("mongo"), or
+# limiting is "off". Behind RATE_LIMIT_TRUSTED_PROXIES proxies the client IP
+# is the X-Forwarded-For entry that many hops from the right; entries further
+# left are set by the client and never trusted.
+RATE_LIMIT_STORE = os.environ.get("RATE_LIMIT_STORE", "memory")
+RATE_LIMITS = {
+    "get_games": (20, 1.0),
+    "get_game": (60, 5.0),
+    "get_profile": (20, 1.0),
+    "get_leaderboard": (20, 1.0),
+    "export_collection": (5, 0.1),
+    "quick_join": (30, 2.0),
+    "join_game": (30, 2.0),
+    "reserve_square": (60, 4.0),
+    "update_score": (30, 2.0),
+    "other": (120, 10.0),
+    **{route: tuple(limit) for route, limit in json.loads(os.environ.get("RATE_LIMITS", "{}")).items()},
+}
+RATE_LIMIT_IP_MULTIPLIER = float(os.environ.get("RATE_LIMIT_IP_MULTIPLIER", "5"))
+RATE_LIMIT_TRUSTED_PROXIES = int(os.environ.get("RATE_LIMIT_TRUSTED_PROXIES", "0"))
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", "100000"))
+
+# Circuit breakers around MongoDB and the auth provider: after
+# CIRCUIT_FAILURE_THRESHOLD consecutive failures or timeouts the dependency
+# is not called for CIRCUIT_RESET_SECONDS, then one trial call decides
+# whether it is back. Meanwhile GET /api/games and /api/games/{id} serve
+# their last good response (at most STALE_MAX_AGE_SECONDS old) marked
+# stale, and other requests fail with 503 at once.
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.environ.get("CIRCUIT_RESET_SECONDS", "10"))
+MONGO_CALL_TIMEOUT_SECONDS = float(os.environ.get("MONGO_CALL_TIMEOUT_SECONDS", "3"))
+AUTH_PROVIDER_TIMEOUT_SECONDS = float(os.environ.get("AUTH_PROVIDER_TIMEOUT_SECONDS", "5"))
+STALE_MAX_AGE_SECONDS = float(os.environ.get("STALE_MAX_AGE_SECONDS", "600"))
+STALE_CACHE_MAX_ENTRIES = int(os.environ.get("STALE_CACHE_MAX_ENTRIES", "20000"))
+
+# Logs are queued and written by a background thread, as JSON lines
+# (LOG_FORMAT=json) carrying request id, route and user, or as text. One
+# access record is written per API request; high-volume routes keep only a
+# sample of them (JSON override in ACCESS_LOG_SAMPLE_RATES, route names as
+# for admission control). Errors and slow requests are always kept, and
+# uvicorn's own access log is turned off. Records dropped because the queue
+# was full are reported every LOG_DROP_REPORT_SECONDS.
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+ACCESS_LOG_SAMPLE_RATES = {
+    "get_games": 0.1,
+    "get_game": 0.1,
+    "get_leaderboard": 0.1,
+    **json.loads(os.environ.get("ACCESS_LOG_SAMPLE_RATES", "{}")),
+}
+ACCESS_LOG_SLOW_MS = float(os.environ.get("ACCESS_LOG_SLOW_MS", "1000"))
+LOG_DROP_REPORT_SECONDS = float(os.environ.get("LOG_DROP_REPORT_SECONDS", "60"))
+
+# POST /api/batch runs up to BATCH_MAX_REQUESTS API calls in one round trip.
+# Each sub-request passes through the middleware stack like a request of
+# its own (rate limits, admission, logging) and its BATCH_RESPONSE_HEADERS
+# are returned with its body.
+BATCH_MAX_REQUESTS = int(os.environ.get("BATCH_MAX_REQUESTS", "10"))
+BATCH_METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE"}
+BATCH_RESPONSE_HEADERS = ("x-change-seq", "retry-after")
+
+# POST /api/games/bulk creates up to BULK_CREATE_MAX_GAMES boards in one insert
+BULK_CREATE_MAX_GAMES = int(os.environ.get("BULK_CREATE_MAX_GAMES", "500"))
+
+# Revoked session ids (sid claim) -> time after which every access token
+# issued for that session has expired anyway. Synced from revoked_tokens.
+revoked_session_ids: Dict[str, datetime] = {}
+
 # Create the main app without a prefix
 app = FastAPI()
 
@@ -42,6 +364,8 @@ class UserSession(BaseModel):
     session_token: str
     expires_at: datetime
     created_at: datetime
+    last_seen_at: Optional[datetime] = None  # Updated at most once per touch interval
+    sid: Optional[str] = None  # Identifies the session inside access tokens (jwt mode)
 
 class Game(BaseModel):
     game_id: str
@@ -54,6 +378,19 @@ class Game(BaseModel):
     created_at: datetime
     quarter_scores: Dict[str, str] = {}  # {"Q1": "21-17", "Q2": "28-24", ...}
     winners: Dict[str, Optional[str]] = {}  # {"Q1": user_id, "Q2": user_id, ...}
+    version: int = 0  # Incremented on every update; writes are conditional on it
+    open_squares: List[int] = []  # Open square numbers in random order, claimed front first by quick-join
+    completed_at: Optional[datetime] = None  # Set with the Q4 score; archived ARCHIVE_AFTER_DAYS later
+    name: Optional[str] = None  # Board name of games created in bulk, e.g. "Office Pool 7"
+    pending_settlements: List[Dict[str, Any]] = []  # Payloads of settle_quarter jobs that have not run yet
+
+class SquareHold(BaseModel):
+    hold_id: str
+    game_id: str
+    square_number: int  # 0-9, taken out of the game's open_squares while held
+    user_id: str
+    expires_at: datetime
+    created_at: datetime
 
 class GameEntry(BaseModel):
     entry_id: str
@@ -81,35 +418,479 @@ class SessionDataResponse(BaseModel):
     name: str
     picture: Optional[str] = None
     session_token: str
+    access_token: Optional[str] = None
+    access_token_expires_at: Optional[datetime] = None
+
+class AccessTokenResponse(BaseModel):
+    access_token: str
+    access_token_expires_at: datetime
 
 class CreateGameRequest(BaseModel):
     event_name: str
     entry_fee: float
 
+class BulkCreateGamesRequest(BaseModel):
+    event_name: str
+    entry_fee: float
+    count: int
+    name_pattern: Optional[str] = None  # {n} is replaced by the board number, e.g. "Office Pool {n}"
+    start: int = 1  # Number of the first board
+
 class JoinGameRequest(BaseModel):
     square_number: int
 
+class ReserveSquareRequest(BaseModel):
+    square_number: int
+
+class QuickJoinRequest(BaseModel):
+    event_name: Optional[str] = None
+    min_entry_fee: float = 0.0
+    max_entry_fee: Optional[float] = None
+
 class UpdateScoreRequest(BaseModel):
     quarter: str  # Q1, Q2, Q3, Q4
     score: str  # e.g., "21-17"
 
+class ScoreUpdate(BaseModel):
+    event_name: str
+    quarter: str  # Q1, Q2, Q3, Q4
+    score: str  # end-of-quarter score, e.g., "21-17"
+    
+    @field_validator("quarter")
+    @classmethod
+    def check_quarter(cls, quarter: str) -> str:
+        if quarter not in QUARTERS:
+            raise ValueError("quarter must be one of Q1, Q2, Q3, Q4")
+        return quarter
+    
+    @field_validator("score")
+    @classmethod
+    def check_score(cls, score: str) -> str:
+        parse_score(score)
+        return score
+
+class BatchSubRequest(BaseModel):
+    id: Optional[str] = None  # echoed back to match responses
+    method: str = "GET"
+    path: str  # e.g. "/api/games", may include a query string
+    body: Optional[Any] = None
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest]
+
+
+# ============= Read Routing Helpers =============
+def route_db(route: str):
+    """Database handle carrying the read preference configured for a route"""
+    return route_dbs.get(route, db)
+
+@asynccontextmanager
+async def write_session(user_id: Optional[str] = None):
+    """Causally consistent session for a user's mutations.
+
+    The session's cluster/operation time is remembered afterwards so that the
+    user's next read on a secondary waits until it has seen these writes.
+    Writes made on behalf of several users pass no user_id and remember the
+    session for each of them with remember_causal_token.
+    """
+    if not secondary_reads_enabled:
+        yield None
+        return
+    
+    async with await client.start_session(causal_consistency=True) as session:
+        yield session
+        if user_id:
+            remember_causal_token(user_id, session)
+
+def remember_causal_token(user_id: str, session):
+    """Make the user's next reads wait for the writes made in `session`"""
+    if session is None or session.operation_time is None:
+        return
+    
+    causal_tokens[user_id] = (time.monotonic(), session.cluster_time, session.operation_time)
+    causal_tokens.move_to_end(user_id)
+    while len(causal_tokens) > CAUSAL_TOKEN_MAX_USERS:
+        causal_tokens.popitem(last=False)
+
+def current_causal_token(user_id: str) -> Optional[Tuple[Dict[str, Any], Any]]:
+    """(cluster_time, operation_time) of the user's last write on this worker"""
+    token = causal_tokens.get(user_id)
+    if token is None:
+        return None
+    
+    recorded_at, cluster_time, operation_time = token
+    if time.monotonic() - recorded_at > CAUSAL_TOKEN_TTL_SECONDS:
+        causal_tokens.pop(user_id, None)
+        return None
+    return cluster_time, operation_time
+
+def encode_causal_token(cluster_time: Dict[str, Any], operation_time: Any) -> str:
+    return base64.urlsafe_b64encode(bson_encode({"cluster_time": cluster_time, "operation_time": operation_time})).decode("ascii")
+
+def decode_causal_token(value: str) -> Optional[Tuple[Dict[str, Any], Any]]:
+    """(cluster_time, operation_time) of an echoed token, or None if invalid or out of range"""
+    try:
+        token = bson_decode(base64.urlsafe_b64decode(value))
+        cluster_time, operation_time = token["cluster_time"], token["operation_time"]
+    except Exception:
+        return None
+    if not isinstance(cluster_time, dict) or not isinstance(operation_time, Timestamp):
+        return None
+    
+    now = time.time()
+    if not now - CAUSAL_TOKEN_TTL_SECONDS <= operation_time.time <= now + CAUSAL_TOKEN_MAX_SKEW_SECONDS:
+        return None
+    return cluster_time, operation_time
+
+# Causal token echoed by the client of the request being handled
+echoed_causal_token: ContextVar[Optional[Tuple[Dict[str, Any], Any]]] = ContextVar("echoed_causal_token", default=None)
+
+@asynccontextmanager
+async def read_session(user_id: str):
+    """Session for reads that must observe the user's own recent writes,
+    made on this worker or echoed by the client from another one"""
+    tokens = [token for token in (current_causal_token(user_id), echoed_causal_token.get()) if token]
+    if not tokens:
+        yield None
+        return
+    
+    async with await client.start_session(causal_consistency=True) as session:
+        # The session keeps the latest of the times it is advanced to
+        for cluster_time, operation_time in tokens:
+            session.advance_cluster_time(cluster_time)
+            session.advance_operation_time(operation_time)
+        yield session
+
+class CausalTokenMiddleware:
+    """Pick up the causal token the client echoes and hand it the caller's latest one"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+        
+        headers = dict(scope["headers"])
+        value = headers.get(CAUSAL_TOKEN_HEADER.lower().encode(), b"").decode("latin-1")
+        if not value:
+            value = cookie_parser(headers.get(b"cookie", b"").decode("latin-1")).get(CAUSAL_TOKEN_COOKIE, "")
+        reset_token = echoed_causal_token.set(decode_causal_token(value) if value else None)
+        
+        async def send_with_token(message):
+            if message["type"] == "http.response.start":
+                # The caller is known once the handler has authenticated them
+                user_id = (request_context.get() or {}).get("user_id")
+                token = current_causal_token(user_id) if user_id else None
+                if token:
+                    encoded = encode_causal_token(*token)
+                    cookie = f"{CAUSAL_TOKEN_COOKIE}={encoded}; Max-Age={int(CAUSAL_TOKEN_TTL_SECONDS)}; Path=/api; HttpOnly; SameSite=Lax"
+                    message = {**message, "headers": [
+                        *message.get("headers", []),
+                        (CAUSAL_TOKEN_HEADER.lower().encode(), encoded.encode("ascii")),
+                        (b"set-cookie", cookie.encode("latin-1")),
+                    ]}
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_token)
+        finally:
+            echoed_causal_token.reset(reset_token)
+
+
+# ============= Circuit Breakers =============
+class DependencyUnavailable(Exception):
+    """A dependency failed, timed out or has its circuit open"""
+    
+    def __init__(self, breaker: "CircuitBreaker"):
+        super().__init__(f"{breaker.name} is unavailable")
+        self.breaker = breaker
+
+class CircuitBreaker:
+    """Fail fast while a dependency keeps failing.
+
+    Closed, calls go through and consecutive failures are counted; at
+    failure_threshold the circuit opens and calls fail immediately. After
+    reset_seconds one trial call is let through (half-open): success closes
+    the circuit, failure opens it again. Exceptions other than
+    failure_types mean the dependency answered and count as success.
+    """
+    
+    def __init__(self, name: str, failure_types: Tuple[type, ...], timeout_seconds: float):
+        self.name = name
+        self.failure_types = failure_types + (asyncio.TimeoutError,)
+        self.timeout_seconds = timeout_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_running = False
+    
+    def retry_after(self) -> int:
+        if self.state != "open":
+            return 1
+        return max(1, math.ceil(CIRCUIT_RESET_SECONDS - (time.monotonic() - self.opened_at)))
+    
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= CIRCUIT_RESET_SECONDS:
+            self.state = "half_open"
+        if self.state == "half_open" and not self.trial_running:
+            self.trial_running = True
+            return True
+        return False
+    
+    def record_success(self):
+        if self.state != "closed":
+            logger.info(f"Circuit for {self.name} closed")
+        self.state = "closed"
+        self.failures = 0
+        self.trial_running = False
+    
+    def record_failure(self):
+        self.trial_running = False
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= CIRCUIT_FAILURE_THRESHOLD:
+            if self.state != "open":
+                logger.warning(f"Circuit for {self.name} opened after {self.failures} failure(s)")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+    
+    async def call(self, operation: Callable[[], Awaitable[Any]]) -> Any:
+        """Run operation() under the breaker; raises DependencyUnavailable instead of waiting"""
+        if not self.allow():
+            raise DependencyUnavailable(self)
+        try:
+            result = await asyncio.wait_for(operation(), self.timeout_seconds)
+        except self.failure_types as exc:
+            self.record_failure()
+            raise DependencyUnavailable(self) from exc
+        except Exception:
+            self.record_success()
+            raise
+        except BaseException:
+            self.trial_running = False
+            raise
+        self.record_success()
+        return result
+    
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "failures": self.failures}
+
+mongo_breaker = CircuitBreaker("MongoDB", (ConnectionFailure, ExecutionTimeout), MONGO_CALL_TIMEOUT_SECONDS)
+auth_provider_breaker = CircuitBreaker("auth provider", (httpx.TransportError, httpx.HTTPStatusError), AUTH_PROVIDER_TIMEOUT_SECONDS)
+
+class StaleCache:
+    """Last good responses of read endpoints, least recently used dropped first"""
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+    
+    def put(self, key: str, value: Any):
+        self.entries[key] = (time.monotonic(), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+    
+    def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        """(age in seconds, value), if younger than STALE_MAX_AGE_SECONDS"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        age = time.monotonic() - entry[0]
+        if age > STALE_MAX_AGE_SECONDS:
+            self.entries.pop(key, None)
+            return None
+        return age, entry[1]
+    
+    def pop(self, key: str):
+        self.entries.pop(key, None)
+
+stale_responses = StaleCache(STALE_CACHE_MAX_ENTRIES)
+
+def stale_headers(age: float) -> Dict[str, str]:
+    return {"Age": str(int(age)), "Warning": '110 - "Response is Stale"'}
+
+@app.exception_handler(DependencyUnavailable)
+async def dependency_unavailable_handler(request: Request, exc: DependencyUnavailable):
+    return JSONResponse(
+        {"detail": f"Service temporarily unavailable ({exc.breaker.name})"},
+        status_code=503,
+        headers={"Retry-After": str(exc.breaker.retry_after())}
+    )
+
 
 # ============= Auth Helper Functions =============
-async def get_current_user(authorization: Optional[str] = Header(None)) -> Optional[User]:
-    """Get current user from Authorization header"""
+def extract_token(authorization: str) -> str:
+    """Strip the optional "Bearer " prefix from an Authorization header"""
+    if authorization.startswith("Bearer "):
+        return authorization[7:]
+    return authorization
+
+def is_access_token(token: str) -> bool:
+    """Signed access tokens are JWTs; session tokens are opaque strings"""
+    return AUTH_TOKEN_MODE == "jwt" and token.count(".") == 2
+
+def issue_access_token(user_doc: Dict[str, Any], sid: str) -> Tuple[str, datetime]:
+    """Sign a short-lived access token carrying the user's identity"""
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(seconds=ACCESS_TOKEN_TTL_SECONDS)
+    created_at = user_doc["created_at"]
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    claims = {
+        "sub": user_doc["user_id"],
+        "sid": sid,
+        "email": user_doc["email"],
+        "name": user_doc["name"],
+        "picture": user_doc.get("picture"),
+        "bal": user_doc.get("mock_balance", 1000.0),  # Snapshot; balance checks use the DB
+        "ucr": int(created_at.timestamp()),
+        "iat": int(now.timestamp()),
+        "exp": int(expires_at.timestamp()),
+    }
+    return jwt.encode(claims, JWT_SECRET, algorithm=JWT_ALGORITHM), expires_at
+
+def decode_access_token(token: str, verify_exp: bool = True) -> Optional[Dict[str, Any]]:
+    """Verify an access token's signature (and expiry) and return its claims"""
+    try:
+        return jwt.decode(
+            token,
+            JWT_SECRET,
+            algorithms=[JWT_ALGORITHM],
+            options={"require": ["sub", "sid", "exp"], "verify_exp": verify_exp}
+        )
+    except jwt.InvalidTokenError:
+        return None
+
+async def revoke_session_id(sid: str):
+    """Reject every outstanding access token of a session, on all workers"""
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=ACCESS_TOKEN_TTL_SECONDS)
+    revoked_session_ids[sid] = expires_at
+    await db.revoked_tokens.update_one(
+        {"sid": sid},
+        {"$set": {"sid": sid, "expires_at": expires_at}},
+        upsert=True
+    )
+
+async def sync_revoked_session_ids():
+    """Reload the revocation set; expired entries drop out on their own"""
+    now = datetime.now(timezone.utc)
+    docs = await db.revoked_tokens.find(
+        {"expires_at": {"$gt": now}},
+        {"_id": 0, "sid": 1, "expires_at": 1}
+    ).to_list(None)
+    synced = {}
+    for doc in docs:
+        expires_at = doc["expires_at"]
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        synced[doc["sid"]] = expires_at
+    # Keep local revocations that have not reached Mongo's answer yet
+    for sid, expires_at in revoked_session_ids.items():
+        if expires_at > now:
+            synced.setdefault(sid, expires_at)
+    revoked_session_ids.clear()
+    revoked_session_ids.update(synced)
+
+def touch_session(session: Dict[str, Any], now: datetime):
+    """Mark a session as seen; the write is deferred and coalesced"""
+    token = session["session_token"]
+    if token in dirty_sessions:
+        dirty_sessions[token] = now
+        return
+    
+    last_seen = session.get("last_seen_at") or session["created_at"]
+    if last_seen.tzinfo is None:
+        last_seen = last_seen.replace(tzinfo=timezone.utc)
+    if now - last_seen >= SESSION_TOUCH_INTERVAL:
+        dirty_sessions[token] = now
+
+async def flush_session_touches():
+    """Write pending last-seen times and slide expiry in one bulk write"""
+    if not dirty_sessions:
+        return
+    
+    pending = dict(dirty_sessions)
+    dirty_sessions.clear()
+    await db.user_sessions.bulk_write(
+        [
+            UpdateOne(
+                {"session_token": token},
+                {"$set": {"last_seen_at": seen_at, "expires_at": seen_at + SESSION_TTL}}
+            )
+            for token, seen_at in pending.items()
+        ],
+        ordered=False
+    )
+
+async def load_user(user_id: str) -> Optional[User]:
+    """Fetch the user's current document (e.g. for an up-to-date balance)"""
+    user_doc = await db.users.find_one({"user_id": user_id}, {"_id": 0})
+    if user_doc:
+        return User(**user_doc)
+    return None
+
+async def get_current_user(authorization: Optional[str] = Header(None), allow_stale: bool = False) -> Optional[User]:
+    """Get current user from Authorization header.
+
+    Read routes that can serve stale data pass allow_stale to authenticate
+    from the last successful session lookup while MongoDB is unavailable.
+    """
+    users = authenticated_users.get()
+    if users is not None and authorization in users:
+        user = users[authorization]
+    else:
+        user = await authenticate(authorization, allow_stale)
+    context = request_context.get()
+    if user and context is not None:
+        context["user_id"] = user.user_id
+    return user
+
+async def authenticate(authorization: Optional[str], allow_stale: bool) -> Optional[User]:
     if not authorization:
         return None
     
     # Handle "Bearer token" format
-    token = authorization
-    if authorization.startswith("Bearer "):
-        token = authorization[7:]
+    token = extract_token(authorization)
+    
+    # Signed access tokens are verified without touching the database
+    if is_access_token(token):
+        claims = decode_access_token(token)
+        if not claims or claims["sid"] in revoked_session_ids:
+            return None
+        return User(
+            user_id=claims["sub"],
+            email=claims["email"],
+            name=claims["name"],
+            picture=claims.get("picture"),
+            mock_balance=claims["bal"],
+            created_at=datetime.fromtimestamp(claims["ucr"], timezone.utc)
+        )
     
-    # Find session
-    session = await db.user_sessions.find_one(
-        {"session_token": token},
-        {"_id": 0}
-    )
+    async def find_session():
+        return await db.user_sessions.find_one(
+            {"session_token": token},
+            {"_id": 0}
+        )
+    
+    async def find_user(user_id: str):
+        return await db.users.find_one(
+            {"user_id": user_id},
+            {"_id": 0}
+        )
+    
+    stale_key = f"auth:{token_identity(token)}"
+    try:
+        session = await mongo_breaker.call(find_session)
+    except DependencyUnavailable:
+        stale = stale_responses.get(stale_key) if allow_stale else None
+        if stale is None:
+            raise
+        user, expires_at = stale[1]
+        return user if expires_at > datetime.now(timezone.utc) else None
     
     if not session:
         return None
@@ -119,301 +900,900 @@ async def get_current_user(authorization: Optional[str] = Header(None)) -> Optio
     if expires_at.tzinfo is None:
         expires_at = expires_at.replace(tzinfo=timezone.utc)
     
-    if expires_at < datetime.now(timezone.utc):
+    now = datetime.now(timezone.utc)
+    if expires_at < now:
         return None
     
+    touch_session(session, now)
+    
     # Get user
-    user_doc = await db.users.find_one(
-        {"user_id": session["user_id"]},
-        {"_id": 0}
-    )
+    user_doc = await mongo_breaker.call(lambda: find_user(session["user_id"]))
     
     if user_doc:
-        return User(**user_doc)
+        user = User(**user_doc)
+        stale_responses.put(stale_key, (user, expires_at))
+        return user
     return None
 
 
-# ============= Auth Routes =============
-@api_router.post("/auth/session")
-async def create_session(request: Request, response: Response):
-    """Exchange session_id for session_token"""
-    session_id = request.headers.get("X-Session-ID")
-    if not session_id:
-        raise HTTPException(status_code=400, detail="X-Session-ID header required")
-    
-    # Call Emergent Auth API
-    async with httpx.AsyncClient() as client:
-        auth_response = await client.get(
-            "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
-            headers={"X-Session-ID": session_id}
-        )
-    
-    if auth_response.status_code != 200:
-        raise HTTPException(status_code=401, detail="Invalid session")
-    
-    user_data = auth_response.json()
-    
-    # Check if user exists
-    existing_user = await db.users.find_one(
-        {"email": user_data["email"]},
-        {"_id": 0}
-    )
-    
-    if existing_user:
-        user_id = existing_user["user_id"]
-    else:
-        # Create new user
-        user_id = f"user_{uuid.uuid4().hex[:12]}"
-        new_user = {
-            "user_id": user_id,
-            "email": user_data["email"],
-            "name": user_data["name"],
-            "picture": user_data.get("picture"),
-            "mock_balance": 1000.0,
-            "created_at": datetime.now(timezone.utc)
-        }
-        await db.users.insert_one(new_user)
-    
-    # Create session
-    session_token = user_data["session_token"]
-    session = {
-        "user_id": user_id,
-        "session_token": session_token,
-        "expires_at": datetime.now(timezone.utc) + timedelta(days=7),
-        "created_at": datetime.now(timezone.utc)
-    }
-    await db.user_sessions.insert_one(session)
-    
-    return SessionDataResponse(**user_data)
+# ============= Leaderboard Helpers =============
+class Leaderboard:
+    """Per-scope player stats with one sorted index per metric"""
+    
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self.loaded_at = time.monotonic()
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        self.ranks: Dict[str, List[Tuple[float, str]]] = {metric: [] for metric in LEADERBOARD_METRICS}
+        for doc in docs:
+            self.stats[doc["user_id"]] = doc
+        for metric, ranking in self.ranks.items():
+            ranking.extend(sorted((-doc.get(metric, 0), user_id) for user_id, doc in self.stats.items()))
+    
+    def apply(self, user_id: str, user_name: str, delta: Dict[str, float]):
+        """Apply incremental deltas, keeping every ranking sorted"""
+        doc = self.stats.get(user_id)
+        if doc is None:
+            doc = {"user_id": user_id, "user_name": user_name, "total_won": 0.0, "total_paid": 0.0, "net_profit": 0.0, "win_count": 0}
+            self.stats[user_id] = doc
+        else:
+            for metric, ranking in self.ranks.items():
+                index = bisect.bisect_left(ranking, (-doc.get(metric, 0), user_id))
+                if index < len(ranking) and ranking[index][1] == user_id:
+                    del ranking[index]
+        doc["user_name"] = user_name
+        for field, value in delta.items():
+            doc[field] = doc.get(field, 0) + value
+        for metric, ranking in self.ranks.items():
+            bisect.insort(ranking, (-doc.get(metric, 0), user_id))
+    
+    def top(self, metric: str, limit: int) -> List[Dict[str, Any]]:
+        return [
+            {"rank": rank, **self.stats[user_id]}
+            for rank, (_, user_id) in enumerate(self.ranks[metric][:limit], start=1)
+        ]
 
-@api_router.get("/auth/me")
-async def get_me(authorization: Optional[str] = Header(None)):
-    """Get current user info"""
-    user = await get_current_user(authorization)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    return user
+# scope -> loaded leaderboard, least recently used first
+leaderboards: "OrderedDict[str, Leaderboard]" = OrderedDict()
 
-@api_router.post("/auth/logout")
-async def logout(authorization: Optional[str] = Header(None)):
-    """Logout user"""
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    token = authorization
-    if authorization.startswith("Bearer "):
-        token = authorization[7:]
-    
-    await db.user_sessions.delete_one({"session_token": token})
-    return {"message": "Logged out successfully"}
+def leaderboard_scopes(event_name: str) -> List[str]:
+    return ["global", f"event:{event_name}"]
 
+async def load_leaderboard(scope: str) -> Leaderboard:
+    """In-memory leaderboard for a scope, (re)loaded from Mongo when stale"""
+    board = leaderboards.get(scope)
+    if board is None or time.monotonic() - board.loaded_at > LEADERBOARD_REFRESH_SECONDS:
+        docs = await db.leaderboards.find(
+            {"scope": scope},
+            {"_id": 0, "user_id": 1, "user_name": 1, "total_won": 1, "total_paid": 1, "net_profit": 1, "win_count": 1}
+        ).to_list(None)
+        board = Leaderboard(docs)
+        leaderboards[scope] = board
+    leaderboards.move_to_end(scope)
+    while len(leaderboards) > LEADERBOARD_CACHE_MAX_SCOPES:
+        leaderboards.popitem(last=False)
+    return board
 
-# ============= Game Routes =============
-@api_router.get("/games")
-async def get_games(authorization: Optional[str] = Header(None)):
-    """Get all games"""
-    user = await get_current_user(authorization)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    games = await db.games.find(
-        {},
-        {"_id": 0, "game_id": 1, "creator_id": 1, "event_name": 1, "entry_fee": 1, "status": 1, "squares": 1, "random_numbers": 1, "created_at": 1, "quarter_scores": 1, "winners": 1}
-    ).sort("created_at", -1).limit(100).to_list(100)
-    
-    # Optimize: Batch fetch all user entries in a single query instead of N+1 queries
-    if games:
-        game_ids = [game["game_id"] for game in games]
-        all_user_entries = await db.game_entries.find(
-            {"game_id": {"$in": game_ids}, "user_id": user.user_id},
-            {"_id": 0, "game_id": 1, "entry_id": 1, "square_number": 1, "paid_amount": 1}
-        ).to_list(1000)
-        
-        # Group entries by game_id
-        entries_by_game = {}
-        for entry in all_user_entries:
-            game_id = entry["game_id"]
-            if game_id not in entries_by_game:
-                entries_by_game[game_id] = []
-            entries_by_game[game_id].append(entry)
-        
-        # Attach user entries to each game
-        for game in games:
-            game["user_entries"] = entries_by_game.get(game["game_id"], [])
-    
-    return games
+async def record_leaderboard_deltas(event_name: str, deltas: Dict[str, Dict[str, Any]]):
+    """Persist and apply stat deltas: {user_id: {"user_name", "total_won", ...}}"""
+    if not deltas:
+        return
+    
+    started = time.monotonic()
+    now = datetime.now(timezone.utc)
+    operations = []
+    for scope in leaderboard_scopes(event_name):
+        for user_id, delta in deltas.items():
+            increments = {field: value for field, value in delta.items() if field != "user_name"}
+            operations.append(UpdateOne(
+                {"scope": scope, "user_id": user_id},
+                {"$inc": increments, "$set": {"user_name": delta["user_name"], "updated_at": now}},
+                upsert=True
+            ))
+    await db.leaderboards.bulk_write(operations, ordered=False)
+    
+    for scope in leaderboard_scopes(event_name):
+        board = leaderboards.get(scope)
+        # Boards loaded after the write already include it
+        if board is not None and board.loaded_at <= started:
+            for user_id, delta in deltas.items():
+                board.apply(user_id, delta["user_name"], {k: v for k, v in delta.items() if k != "user_name"})
 
-@api_router.get("/games/{game_id}")
-async def get_game(game_id: str, authorization: Optional[str] = Header(None)):
-    """Get game details"""
-    user = await get_current_user(authorization)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    game = await db.games.find_one({"game_id": game_id}, {"_id": 0})
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
-    
-    # Get all entries for this game
-    entries = await db.game_entries.find(
-        {"game_id": game_id},
-        {"_id": 0, "entry_id": 1, "user_id": 1, "user_name": 1, "square_number": 1, "paid_amount": 1, "created_at": 1}
-    ).limit(100).to_list(100)
-    game["entries"] = entries
-    
-    # Get payouts if game is active or completed
-    if game["status"] in ["active", "completed"]:
-        payouts = await db.payouts.find(
-            {"game_id": game_id},
-            {"_id": 0}
-        ).to_list(100)
-        game["payouts"] = payouts
+async def rebuild_leaderboards() -> int:
+    """Recompute every leaderboard from payouts and settled entries in bulk"""
+    totals: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    
+    def bucket(scope: str, user_id: str) -> Dict[str, Any]:
+        key = (scope, user_id)
+        if key not in totals:
+            totals[key] = {"scope": scope, "user_id": user_id, "user_name": None, "total_won": 0.0, "total_paid": 0.0, "net_profit": 0.0, "win_count": 0}
+        return totals[key]
+    
+    # Entry fees are only counted once a board is full and the game is live
+    # Archived games still count; their entries and payouts are archived too
+    with_games = [
+        {"$lookup": {"from": "games", "localField": "game_id", "foreignField": "game_id", "as": "game"}},
+        {"$lookup": {"from": "games_archive", "localField": "game_id", "foreignField": "game_id", "as": "archived_game"}},
+        {"$set": {"game": {"$concatArrays": ["$game", "$archived_game"]}}},
+        {"$unwind": "$game"},
+    ]
+    
+    paid = db.game_entries.aggregate([
+        {"$unionWith": "game_entries_archive"},
+        *with_games,
+        {"$match": {"game.status": {"$in": ["active", "completed"]}}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "event_name": "$game.event_name"},
+            "user_name": {"$last": "$user_name"},
+            "total_paid": {"$sum": "$paid_amount"},
+        }},
+    ], allowDiskUse=True)
+    async for row in paid:
+        for scope in leaderboard_scopes(row["_id"]["event_name"]):
+            doc = bucket(scope, row["_id"]["user_id"])
+            doc["user_name"] = row["user_name"]
+            doc["total_paid"] += row["total_paid"]
+            doc["net_profit"] -= row["total_paid"]
+    
+    won = db.payouts.aggregate([
+        {"$unionWith": "payouts_archive"},
+        *with_games,
+        {"$group": {
+            "_id": {"user_id": "$user_id", "event_name": "$game.event_name"},
+            "total_won": {"$sum": "$amount"},
+            "win_count": {"$sum": 1},
+        }},
+    ], allowDiskUse=True)
+    async for row in won:
+        for scope in leaderboard_scopes(row["_id"]["event_name"]):
+            doc = bucket(scope, row["_id"]["user_id"])
+            doc["total_won"] += row["total_won"]
+            doc["win_count"] += row["win_count"]
+            doc["net_profit"] += row["total_won"]
+    
+    # Build the new collection aside and swap it in atomically
+    now = datetime.now(timezone.utc)
+    docs = [{**doc, "updated_at": now} for doc in totals.values()]
+    await db.leaderboards_rebuild.drop()
+    for start in range(0, len(docs), 1000):
+        await db.leaderboards_rebuild.insert_many(docs[start:start + 1000], ordered=False)
+    await db.leaderboards_rebuild.create_index([("scope", 1), ("user_id", 1)], unique=True)
+    if docs:
+        await db.leaderboards_rebuild.rename("leaderboards", dropTarget=True)
     else:
-        game["payouts"] = []
+        await db.leaderboards.drop()
+    await db.leaderboards.create_index([("scope", 1), ("user_id", 1)], unique=True)
     
-    return game
+    leaderboards.clear()
+    return len(docs)
 
-@api_router.post("/games")
-async def create_game(game_request: CreateGameRequest, authorization: Optional[str] = Header(None)):
-    """Create a new game"""
-    user = await get_current_user(authorization)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
+
+# ============= Field Selection =============
+def parse_fields(fields: Optional[str], allowed) -> Optional[FrozenSet[str]]:
+    """Fields named in a fields= parameter, or None for all of them"""
+    if fields is None:
+        return None
+    selected = frozenset(field.strip() for field in fields.split(",") if field.strip())
+    unknown = selected - set(allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown field(s): {', '.join(sorted(unknown))}")
+    return selected
+
+def wants(fields: Optional[FrozenSet[str]], field: str) -> bool:
+    return fields is None or field in fields
+
+def select_fields(doc: Dict[str, Any], fields: Optional[FrozenSet[str]]) -> Dict[str, Any]:
+    if fields is None:
+        return doc
+    return {key: value for key, value in doc.items() if key in fields}
+
+
+# ============= Game List Cache =============
+class GamesListCache:
+    """Serialized newest games; each fragment is a JSON object minus its closing brace.
+
+    seq is the change sequence number read before the games were.
+    """
     
-    game_id = f"game_{uuid.uuid4().hex[:12]}"
-    game = {
-        "game_id": game_id,
-        "creator_id": user.user_id,
-        "event_name": game_request.event_name,
-        "entry_fee": game_request.entry_fee,
-        "status": "pending",
-        "squares": [None] * 10,  # 10 empty squares
-        "random_numbers": [None] * 10,
-        "created_at": datetime.now(timezone.utc),
-        "quarter_scores": {},
-        "winners": {}
-    }
+    def __init__(self, fragments: List[Tuple[str, bytes]], seq: int):
+        self.fragments = fragments
+        self.seq = seq
+        self.built_at = time.monotonic()
     
-    await db.games.insert_one(game)
-    # Remove MongoDB's _id field before returning
-    game.pop('_id', None)
+    def is_fresh(self) -> bool:
+        return time.monotonic() - self.built_at < GAMES_LIST_CACHE_TTL_SECONDS
+
+# Field selection (None = all fields) -> cached list
+games_list_caches: Dict[Optional[FrozenSet[str]], GamesListCache] = {}
+games_list_version = 0
+games_list_lock = asyncio.Lock()
+
+def invalidate_games_list():
+    """Drop the cached game lists after any game mutation"""
+    global games_list_version
+    games_list_version += 1
+    games_list_caches.clear()
+
+def serialize_game_fragment(game: Dict[str, Any]) -> bytes:
+    # Same encoding as FastAPI's JSONResponse, left open for the user overlay
+    encoded = json.dumps(jsonable_encoder(game), ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+    return encoded[:-1].encode("utf-8")
+
+def games_list_body(fragments: List[Tuple[str, bytes]], entries_by_game: Optional[Dict[str, List[Dict[str, Any]]]]) -> bytes:
+    """Attach user entries to each game; only this small overlay is serialized per request.
+
+    entries_by_game is None when user entries were not asked for.
+    """
+    if entries_by_game is None:
+        return b"[" + b",".join(fragment + b"}" for _, fragment in fragments) + b"]"
+    
+    no_entries = b',"user_entries":[]}'
+    body = b",".join(
+        fragment + (
+            b',"user_entries":' + json.dumps(entries_by_game[game_id], separators=(",", ":")).encode("utf-8") + b"}"
+            if game_id in entries_by_game else no_entries
+        )
+        for game_id, fragment in fragments
+    )
+    return b"[" + body + b"]"
+
+def games_list_projection(fields: Optional[FrozenSet[str]]) -> Dict[str, Any]:
+    if fields is None:
+        return GAMES_LIST_PROJECTION
+    return {"_id": 0, "game_id": 1, **{field: GAMES_LIST_FIELDS[field] for field in fields if field != "user_entries"}}
+
+async def cached_games_list(fields: Optional[FrozenSet[str]] = None) -> GamesListCache:
+    """Shared game list fragments, rebuilt by a single request on a miss.
+
+    Rebuilt from the primary: the list is served to every user, so it must
+    not lag behind a write that any of them has already seen.
+    """
+    cache = games_list_caches.get(fields)
+    if cache is not None and cache.is_fresh():
+        return cache
+    
+    async with games_list_lock:
+        cache = games_list_caches.get(fields)
+        if cache is not None and cache.is_fresh():
+            return cache
+        
+        version = games_list_version
+        seq = await current_change_seq(db)
+        games = await db.games.find(
+            {},
+            games_list_projection(fields)
+        ).sort("created_at", -1).limit(100).to_list(100)
+        cache = GamesListCache([(game["game_id"], serialize_game_fragment(game)) for game in games], seq)
+        
+        # A mutation during the rebuild means this result may already be stale
+        if version == games_list_version:
+            games_list_caches.pop(fields, None)
+            games_list_caches[fields] = cache
+            while len(games_list_caches) > GAMES_LIST_CACHE_MAX_VARIANTS:
+                games_list_caches.pop(next(iter(games_list_caches)))
+        return cache
+
+
+# ============= Game Document Cache =============
+def cache_game(game: Dict[str, Any]):
+    game_cache[game["game_id"]] = copy.deepcopy(game)
+    game_cache.move_to_end(game["game_id"])
+    while len(game_cache) > GAME_CACHE_MAX_SIZE:
+        game_cache.popitem(last=False)
+
+def evict_game(game_id: str):
+    game_cache.pop(game_id, None)
+
+async def fetch_game(game_id: str, session=None, read_db=None, projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """Game document from the cache, or from MongoDB on a miss.
+
+    Misses read the primary unless a route passes its read_db; copies read
+    from a secondary may lag and are not cached. Only reads that are not
+    cached apply `projection`; otherwise the caller gets the whole document.
+    Callers get their own copy and may modify it before passing it to
+    update_game.
+    """
+    cached = game_cache.get(game_id)
+    if cached is not None:
+        game_cache.move_to_end(game_id)
+        return copy.deepcopy(cached)
+    
+    source = db if read_db is None else read_db
+    cacheable = source.read_preference == ReadPreference.PRIMARY
+    if cacheable or projection is None:
+        projection = {"_id": 0}
+    game = await source.games.find_one({"game_id": game_id}, projection, session=session)
+    if game and cacheable:
+        cache_game(game)
     return game
 
-@api_router.post("/games/{game_id}/join")
-async def join_game(game_id: str, join_request: JoinGameRequest, authorization: Optional[str] = Header(None)):
-    """Join a game by selecting a square"""
-    user = await get_current_user(authorization)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    # Get game
-    game = await db.games.find_one({"game_id": game_id}, {"_id": 0})
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
-    
-    if game["status"] != "pending":
-        raise HTTPException(status_code=400, detail="Game is not accepting new players")
-    
-    square_num = join_request.square_number
-    if square_num < 0 or square_num > 9:
-        raise HTTPException(status_code=400, detail="Invalid square number")
-    
-    if game["squares"][square_num] is not None:
-        raise HTTPException(status_code=400, detail="Square already taken")
-    
-    # Check if user already has 2 entries in this game
-    user_entries_count = await db.game_entries.count_documents({
-        "game_id": game_id,
-        "user_id": user.user_id
-    })
-    
-    if user_entries_count >= 2:
-        raise HTTPException(status_code=400, detail="You can only have 2 entries per game")
-    
-    # Check user balance (only if entry fee > 0)
-    if game["entry_fee"] > 0 and user.mock_balance < game["entry_fee"]:
-        raise HTTPException(status_code=400, detail="Insufficient balance")
-    
-    # Create entry
-    entry_id = f"entry_{uuid.uuid4().hex[:12]}"
-    entry = {
-        "entry_id": entry_id,
-        "game_id": game_id,
-        "user_id": user.user_id,
-        "user_name": user.name,
-        "square_number": square_num,
-        "paid_amount": game["entry_fee"],
-        "created_at": datetime.now(timezone.utc)
-    }
-    await db.game_entries.insert_one(entry)
-    # Remove MongoDB's _id field before returning
-    entry.pop('_id', None)
-    
-    # Update game squares
-    game["squares"][square_num] = {
-        "user_id": user.user_id,
-        "user_name": user.name,
-        "entry_id": entry_id
-    }
-    
-    # Deduct from user balance (only if entry fee > 0)
-    if game["entry_fee"] > 0:
-        await db.users.update_one(
-            {"user_id": user.user_id},
-            {"$inc": {"mock_balance": -game["entry_fee"]}}
+def version_filter(game: Dict[str, Any]) -> Dict[str, Any]:
+    """Match the version the caller read (documents predating versions have none)"""
+    version = game.get("version", 0)
+    if version:
+        return {"version": version}
+    return {"version": {"$in": [0, None]}}
+
+async def game_changed(game_id: str):
+    """Invalidate derived caches here, announce the change to other workers
+    and stamp it with the next change sequence number"""
+    invalidate_games_list()
+    await db.cache_invalidations.insert_one({"game_id": game_id, "worker_id": WORKER_ID})
+    
+    seq = await next_change_seq()
+    now = datetime.now(timezone.utc)
+    result = await db.games.update_one({"game_id": game_id}, {"$set": {"change_seq": seq, "changed_at": now}})
+    if result.matched_count == 0:
+        # Deleted or archived
+        await db.game_tombstones.replace_one(
+            {"game_id": game_id},
+            {"game_id": game_id, "change_seq": seq, "deleted_at": now},
+            upsert=True
         )
-    
-    # Check if all squares are filled
-    if all(square is not None for square in game["squares"]):
-        # Generate random numbers (0-9, no duplicates)
-        numbers = list(range(10))
-        random.shuffle(numbers)
-        game["random_numbers"] = numbers
-        game["status"] = "active"
-    
-    # Update game
-    await db.games.update_one(
-        {"game_id": game_id},
-        {"$set": {
-            "squares": game["squares"],
-            "random_numbers": game["random_numbers"],
-            "status": game["status"]
-        }}
+
+async def games_created(game_ids: List[str]):
+    """game_changed for a batch of new games, with one write per collection"""
+    invalidate_games_list()
+    await db.cache_invalidations.insert_many([{"game_id": game_id, "worker_id": WORKER_ID} for game_id in game_ids])
+    
+    last_seq = await next_change_seq(len(game_ids))
+    now = datetime.now(timezone.utc)
+    await db.games.bulk_write([
+        UpdateOne({"game_id": game_id}, {"$set": {"change_seq": seq, "changed_at": now}})
+        for seq, game_id in enumerate(game_ids, start=last_seq - len(game_ids) + 1)
+    ], ordered=False)
+
+async def next_change_seq(count: int = 1) -> int:
+    """Reserve the next `count` change sequence numbers; returns the last one"""
+    counter = await db.counters.find_one_and_update(
+        {"_id": "game_changes"},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
-    
-    return {"message": "Successfully joined game", "entry": entry, "game_status": game["status"]}
+    return counter["seq"]
 
-@api_router.post("/games/{game_id}/score")
-async def update_score(game_id: str, score_request: UpdateScoreRequest, authorization: Optional[str] = Header(None)):
-    """Update score for a quarter (only game creator can do this)"""
-    user = await get_current_user(authorization)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    # Get game
-    game = await db.games.find_one({"game_id": game_id}, {"_id": 0})
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
-    
-    if game["creator_id"] != user.user_id:
-        raise HTTPException(status_code=403, detail="Only game creator can update scores")
-    
-    if game["status"] != "active":
-        raise HTTPException(status_code=400, detail="Game is not active")
-    
-    quarter = score_request.quarter
-    score = score_request.score
-    
-    if quarter not in ["Q1", "Q2", "Q3", "Q4"]:
-        raise HTTPException(status_code=400, detail="Invalid quarter")
+async def current_change_seq(read_db, session=None) -> int:
+    counter = await read_db.counters.find_one({"_id": "game_changes"}, session=session)
+    return counter["seq"] if counter else 0
+
+async def update_game(game: Dict[str, Any], update: Dict[str, Any], session=None) -> bool:
+    """Apply a versioned update and write the result through to the cache.
+
+    `game` must already reflect `update`. Returns False (and evicts the
+    cached copy) if the stored document changed since `game` was read.
+    """
+    update = {**update, "$inc": {**update.get("$inc", {}), "version": 1}}
+    result = await db.games.update_one(
+        {"game_id": game["game_id"], **version_filter(game)},
+        update,
+        session=session
+    )
+    if result.matched_count == 0:
+        evict_game(game["game_id"])
+        return False
+    
+    game["version"] = game.get("version", 0) + 1
+    cache_game(game)
+    await game_changed(game["game_id"])
+    return True
+
+
+async def record_entry_fees(game: Dict[str, Any]):
+    """Entry fees count towards the leaderboards once the board is locked in"""
+    paid_deltas: Dict[str, Dict[str, Any]] = {}
+    for square in game["squares"]:
+        delta = paid_deltas.setdefault(square["user_id"], {"user_name": square["user_name"], "total_paid": 0.0, "net_profit": 0.0})
+        delta["total_paid"] += game["entry_fee"]
+        delta["net_profit"] -= game["entry_fee"]
+    await record_leaderboard_deltas(game["event_name"], paid_deltas)
+
+async def activate_if_full(game_id: str, session=None) -> Optional[Dict[str, Any]]:
+    """Atomically start a pending game once no square is empty"""
+    numbers = list(range(10))
+    random.shuffle(numbers)
+    game = await db.games.find_one_and_update(
+        {"game_id": game_id, "status": "pending", "squares": {"$ne": None}},
+        {"$set": {"status": "active", "random_numbers": numbers}, "$inc": {"version": 1}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER,
+        session=session
+    )
+    if game:
+        cache_game(game)
+        await game_changed(game_id)
+        await record_entry_fees(game)
+    return game
+
+
+# ============= Join Batching =============
+class JoinBatcher:
+    """Coalesces concurrent joins of the same game into one write.
+
+    The first join for a game starts a drain task that waits
+    JOIN_BATCH_WINDOW_MS, then takes every join queued so far and processes
+    them together: one game read, one entry count, one versioned squares
+    update and one bulk entry insert. Each caller awaits a future that gets
+    its own result or HTTPException. Joins arriving while a batch is being
+    written queue up for the next one.
+    """
+    
+    def __init__(self):
+        self.pending: Dict[str, List[Tuple[User, int, asyncio.Future]]] = {}
+        self.workers: Dict[str, asyncio.Task] = {}
+    
+    async def submit(self, game_id: str, user: User, square_num: int) -> Dict[str, Any]:
+        future = asyncio.get_running_loop().create_future()
+        self.pending.setdefault(game_id, []).append((user, square_num, future))
+        if game_id not in self.workers:
+            self.workers[game_id] = asyncio.create_task(self.drain(game_id))
+        return await future
+    
+    async def drain(self, game_id: str):
+        try:
+            while game_id in self.pending:
+                await asyncio.sleep(JOIN_BATCH_WINDOW_MS / 1000)
+                batch = self.pending.pop(game_id)
+                try:
+                    await self.process(game_id, batch)
+                except Exception as e:
+                    logger.exception(f"Join batch for {game_id} failed")
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+        finally:
+            self.workers.pop(game_id, None)
+    
+    async def process(self, game_id: str, batch: List[Tuple[User, int, asyncio.Future]]):
+        def reject(future: asyncio.Future, status_code: int, detail: str):
+            if not future.done():
+                future.set_exception(HTTPException(status_code=status_code, detail=detail))
+        
+        async with write_session() as session:
+            game = await fetch_game(game_id, session)
+            if not game:
+                for _, _, future in batch:
+                    reject(future, 404, "Game not found")
+                return
+            if game["status"] != "pending":
+                for _, _, future in batch:
+                    reject(future, 400, "Game is not accepting new players")
+                return
+            
+            # Entries each player already has in this game, in one query
+            user_ids = list({user.user_id for user, _, _ in batch})
+            entry_counts = {
+                row["_id"]: row["count"]
+                async for row in db.game_entries.aggregate([
+                    {"$match": {"game_id": game_id, "user_id": {"$in": user_ids}}},
+                    {"$group": {"_id": "$user_id", "count": {"$sum": 1}}},
+                ], session=session)
+            }
+            
+            # Squares players are holding while they confirm
+            holds = {
+                hold["square_number"]: hold
+                async for hold in db.square_holds.find(
+                    {"game_id": game_id, "square_number": {"$in": [square_num for _, square_num, _ in batch]}, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+                    {"_id": 0, "square_number": 1, "user_id": 1},
+                    session=session
+                )
+            }
+            
+            # Hand out squares first come, first served
+            accepted = []
+            for user, square_num, future in batch:
+                hold = holds.get(square_num)
+                if game["squares"][square_num] is None and hold and hold["user_id"] != user.user_id:
+                    reject(future, 409, "Square is held by another player")
+                    continue
+                # A square missing from open_squares without a hold may be
+                # mid-claim by quick-join
+                if game["squares"][square_num] is not None or not (hold or square_num in game.get("open_squares", [square_num])):
+                    reject(future, 400, "Square already taken")
+                    continue
+                if entry_counts.get(user.user_id, 0) >= 2:
+                    reject(future, 400, "You can only have 2 entries per game")
+                    continue
+                
+                entry_id = f"entry_{uuid.uuid4().hex[:12]}"
+                game["squares"][square_num] = {"user_id": user.user_id, "user_name": user.name, "entry_id": entry_id}
+                game["open_squares"] = [i for i in game.get("open_squares", []) if i != square_num]
+                entry_counts[user.user_id] = entry_counts.get(user.user_id, 0) + 1
+                accepted.append((user, square_num, entry_id, future))
+            if not accepted:
+                return
+            
+            # Claim the squares; rejected if the game changed since it was read
+            updated = await update_game(game, {"$set": {
+                "squares": game["squares"],
+                "open_squares": game["open_squares"],
+            }}, session)
+            if not updated:
+                for _, _, _, future in accepted:
+                    reject(future, 409, "Game was just updated, please try again")
+                return
+            
+            # Charge entry fees. Debits go out concurrently, one conditional
+            # update per join, so a lost race is pinned on the right player.
+            unpaid = []
+            if game["entry_fee"] > 0:
+                results = await asyncio.gather(*[
+                    db.users.update_one(
+                        {"user_id": user.user_id, "mock_balance": {"$gte": game["entry_fee"]}},
+                        {"$inc": {"mock_balance": -game["entry_fee"]}},
+                        session=session
+                    )
+                    for user, _, _, _ in accepted
+                ])
+                unpaid = [join for join, result in zip(accepted, results) if result.modified_count == 0]
+            if unpaid:
+                # Hand back the squares of players who could not pay. Held
+                # squares stay out of open_squares until their hold ends.
+                await db.games.update_one(
+                    {"game_id": game_id},
+                    {
+                        "$set": {f"squares.{square_num}": None for _, square_num, _, _ in unpaid},
+                        "$push": {"open_squares": {"$each": [square_num for _, square_num, _, _ in unpaid if square_num not in holds]}},
+                        "$inc": {"version": 1},
+                    },
+                    session=session
+                )
+                evict_game(game_id)
+                await game_changed(game_id)
+                for _, _, _, future in unpaid:
+                    reject(future, 400, "Insufficient balance")
+                unpaid_entry_ids = {entry_id for _, _, entry_id, _ in unpaid}
+                accepted = [join for join in accepted if join[2] not in unpaid_entry_ids]
+                if not accepted:
+                    return
+            
+            now = datetime.now(timezone.utc)
+            entries = [
+                {
+                    "entry_id": entry_id,
+                    "game_id": game_id,
+                    "user_id": user.user_id,
+                    "user_name": user.name,
+                    "square_number": square_num,
+                    "paid_amount": game["entry_fee"],
+                    "created_at": now
+                }
+                for user, square_num, entry_id, _ in accepted
+            ]
+            await db.game_entries.insert_many(entries, session=session)
+            
+            confirmed_holds = [square_num for _, square_num, _, _ in accepted if square_num in holds]
+            if confirmed_holds:
+                await db.square_holds.delete_many({"game_id": game_id, "square_number": {"$in": confirmed_holds}}, session=session)
+            
+            game_status = "pending"
+            if not unpaid and not game["open_squares"] and await activate_if_full(game_id, session):
+                game_status = "active"
+            
+            for (user, _, _, future), entry in zip(accepted, entries):
+                entry.pop('_id', None)
+                remember_causal_token(user.user_id, session)
+                if not future.done():
+                    future.set_result({"message": "Successfully joined game", "entry": entry, "game_status": game_status})
+
+join_batcher = JoinBatcher()
+
+
+# ============= Square Holds =============
+async def release_held_squares(holds: List[Dict[str, Any]], session=None):
+    """Put the squares of ended holds back into their games' open_squares"""
+    if not holds:
+        return
+    
+    await db.games.bulk_write([
+        UpdateOne(
+            {"game_id": hold["game_id"], "status": "pending", f"squares.{hold['square_number']}": None, "open_squares": {"$ne": hold["square_number"]}},
+            {"$push": {"open_squares": hold["square_number"]}, "$inc": {"version": 1}}
+        )
+        for hold in holds
+    ], ordered=False, session=session)
+    for game_id in {hold["game_id"] for hold in holds}:
+        evict_game(game_id)
+        await game_changed(game_id)
+
+async def sweep_expired_holds() -> int:
+    """Release holds that expired without being confirmed, in bulk"""
+    now = datetime.now(timezone.utc)
+    holds = await db.square_holds.find(
+        {"expires_at": {"$lte": now}},
+        {"_id": 0, "hold_id": 1, "game_id": 1, "square_number": 1}
+    ).limit(SQUARE_HOLD_SWEEP_BATCH).to_list(SQUARE_HOLD_SWEEP_BATCH)
+    if not holds:
+        return 0
+    
+    await release_held_squares(holds)
+    await db.square_holds.delete_many({"expires_at": {"$lte": now}, "hold_id": {"$in": [hold["hold_id"] for hold in holds]}})
+    return len(holds)
+
+
+# ============= Archival =============
+async def archive_completed_games(cutoff: datetime) -> int:
+    """Move one batch of games completed before `cutoff` to the archive.
+
+    Documents are copied by id first, so a batch interrupted part way is
+    simply redone by the next run. Entries and payouts leave the hot
+    collections before their game does, so no archived game keeps a
+    half-moved history.
+    """
+    games = await db.games.find(
+        {"status": "completed", "pending_settlements.0": {"$exists": False}, "$or": [
+            {"completed_at": {"$lt": cutoff}},
+            # Games completed before completed_at was recorded
+            {"completed_at": {"$exists": False}, "created_at": {"$lt": cutoff}},
+        ]},
+        {"_id": 0}
+    ).limit(ARCHIVE_BATCH_SIZE).to_list(ARCHIVE_BATCH_SIZE)
+    if not games:
+        return 0
+    
+    game_ids = [game["game_id"] for game in games]
+    for collection, key in (("game_entries", "entry_id"), ("payouts", "payout_id")):
+        docs = await db[collection].find({"game_id": {"$in": game_ids}}, {"_id": 0}).to_list(None)
+        if docs:
+            await db[ARCHIVE_COLLECTIONS[collection]].bulk_write(
+                [ReplaceOne({key: doc[key]}, doc, upsert=True) for doc in docs],
+                ordered=False
+            )
+    await db.games_archive.bulk_write(
+        [ReplaceOne({"game_id": game["game_id"]}, game, upsert=True) for game in games],
+        ordered=False
+    )
     
-    # Parse score (e.g., "21-17")
+    await db.game_entries.delete_many({"game_id": {"$in": game_ids}})
+    await db.payouts.delete_many({"game_id": {"$in": game_ids}})
+    await db.games.delete_many({"game_id": {"$in": game_ids}, "status": "completed"})
+    for game_id in game_ids:
+        evict_game(game_id)
+        await game_changed(game_id)
+    return len(games)
+
+async def find_with_archive(read_db, collection: str, query: Dict[str, Any], projection: Dict[str, Any], session=None, limit: int = 100) -> List[Dict[str, Any]]:
+    """Documents from the hot collection, topped up from its archive up to `limit`"""
+    docs = await read_db[collection].find(query, projection, session=session).limit(limit).to_list(limit)
+    if len(docs) < limit:
+        remaining = limit - len(docs)
+        docs += await read_db[ARCHIVE_COLLECTIONS[collection]].find(query, projection, session=session).limit(remaining).to_list(remaining)
+    return docs
+
+
+# ============= Job Queue =============
+job_wakeup = asyncio.Event()
+
+async def enqueue_job(kind: str, payload: Dict[str, Any], session=None):
+    """Queue a job for the workers; the ones in this process start at once"""
+    now = datetime.now(timezone.utc)
+    await db.jobs.insert_one({
+        "job_id": f"job_{uuid.uuid4().hex[:12]}",
+        "kind": kind,
+        "payload": payload,
+        "status": "queued",
+        "attempts": 0,
+        "run_at": now,
+        "created_at": now,
+    }, session=session)
+    job_wakeup.set()
+
+async def claim_jobs(limit: int) -> List[Dict[str, Any]]:
+    """Take up to `limit` due jobs, oldest first, under a lease"""
+    now = datetime.now(timezone.utc)
+    # Jobs of a worker that died or stalled past its lease failed that attempt
+    expired = await db.jobs.find({"status": "running", "locked_until": {"$lt": now}}).limit(limit).to_list(limit)
+    if expired:
+        await fail_jobs(expired, TimeoutError(f"Lease of {JOB_LEASE_SECONDS:g}s expired"))
+    
+    due = {"status": "queued", "run_at": {"$lte": now}}
+    candidates = await db.jobs.find(due, {"_id": 1}).sort("run_at", 1).limit(limit).to_list(limit)
+    if not candidates:
+        return []
+    claim = uuid.uuid4().hex
+    await db.jobs.update_many(
+        {"_id": {"$in": [job["_id"] for job in candidates]}, **due},
+        {"$set": {"status": "running", "claim": claim, "locked_until": now + timedelta(seconds=JOB_LEASE_SECONDS)}, "$inc": {"attempts": 1}}
+    )
+    return await db.jobs.find({"claim": claim}).to_list(limit)
+
+async def fail_jobs(jobs: List[Dict[str, Any]], error: Exception):
+    """Retry with exponential backoff, or dead-letter after JOB_MAX_ATTEMPTS.
+
+    Only jobs still under the claim they were read with are changed, so
+    workers failing the same expired job race harmlessly.
+    """
+    now = datetime.now(timezone.utc)
+    dead = [job for job in jobs if job["attempts"] >= JOB_MAX_ATTEMPTS]
+    retry = [job for job in jobs if job["attempts"] < JOB_MAX_ATTEMPTS]
+    if dead:
+        try:
+            await db.dead_jobs.insert_many(
+                [{**job, "status": "dead", "error": repr(error), "failed_at": now} for job in dead],
+                ordered=False
+            )
+        except BulkWriteError as exc:
+            # Dead-lettered by another worker
+            if any(write_error["code"] != 11000 for write_error in exc.details["writeErrors"]):
+                raise
+        await db.jobs.delete_many({"$or": [{"_id": job["_id"], "claim": job.get("claim")} for job in dead]})
+    if retry:
+        await db.jobs.bulk_write([
+            UpdateOne({"_id": job["_id"], "claim": job.get("claim")}, {
+                "$set": {"status": "queued", "error": repr(error), "run_at": now + timedelta(seconds=JOB_RETRY_BASE_SECONDS * 2 ** (job["attempts"] - 1))},
+                "$unset": {"claim": ""},
+            })
+            for job in retry
+        ], ordered=False)
+
+async def run_jobs_once() -> int:
+    """Process one batch of due jobs, one handler call per kind; returns how many were claimed"""
+    jobs = await claim_jobs(JOB_BATCH_SIZE)
+    by_kind: Dict[str, List[Dict[str, Any]]] = {}
+    for job in jobs:
+        by_kind.setdefault(job["kind"], []).append(job)
+    
+    for kind, batch in by_kind.items():
+        handler = JOB_HANDLERS.get(kind)
+        if handler is None:
+            # Possibly queued by a newer release; retried until dead-lettered
+            logger.error(f"No handler for {len(batch)} {kind} job(s)")
+            await fail_jobs(batch, LookupError(f"Unknown job kind {kind}"))
+            continue
+        done = batch
+        try:
+            await handler([job["payload"] for job in batch])
+        except Exception:
+            logger.exception(f"Batch of {len(batch)} {kind} job(s) failed, retrying one by one")
+            # Handlers are idempotent; find the failing jobs so the rest go through
+            done = []
+            for job in batch:
+                try:
+                    await handler([job["payload"]])
+                except Exception as exc:
+                    logger.exception(f"Job {job['job_id']} ({kind}) failed on attempt {job['attempts']}")
+                    await fail_jobs([job], exc)
+                else:
+                    done.append(job)
+        if done:
+            await db.jobs.delete_many({"_id": {"$in": [job["_id"] for job in done]}})
+    return len(jobs)
+
+async def settle_quarters(payloads: List[Dict[str, Any]]):
+    """Payouts, balance credits and leaderboard stats of settled quarters, in bulk.
+
+    Safe to repeat: payouts are keyed by payout_id, credits are recorded on
+    the user and leaderboard updates on the payout. The settlements are
+    then cleared from their games.
+    """
+    won = [payload for payload in payloads if payload["winner_user_id"]]
+    if won:
+        await pay_quarter_winners(won)
+    
+    await db.games.bulk_write([
+        UpdateOne(
+            {"game_id": payload["game_id"], "pending_settlements.payout_id": payload["payout_id"]},
+            {"$pull": {"pending_settlements": {"payout_id": payload["payout_id"]}}, "$inc": {"version": 1}}
+        )
+        for payload in payloads
+    ], ordered=False)
+    for game_id in {payload["game_id"] for payload in payloads}:
+        evict_game(game_id)
+        await game_changed(game_id)
+
+async def pay_quarter_winners(won: List[Dict[str, Any]]):
+    """Payouts, credits and leaderboard stats of quarters that had a winner"""
     try:
-        team1, team2 = score.split("-")
-        team1_score = int(team1)
-        team2_score = int(team2)
-    except:
-        raise HTTPException(status_code=400, detail="Invalid score format (use XX-XX)")
+        await db.payouts.insert_many([
+            {
+                "payout_id": payload["payout_id"],
+                "game_id": payload["game_id"],
+                "user_id": payload["winner_user_id"],
+                "quarter": payload["quarter"],
+                "amount": payload["amount"],
+                "paid": False,
+                "created_at": payload["settled_at"],
+            }
+            for payload in won
+        ], ordered=False)
+    except BulkWriteError as exc:
+        # Payouts inserted by an earlier attempt
+        if any(error["code"] != 11000 for error in exc.details["writeErrors"]):
+            raise
+    
+    # Credit winners' balances
+    await db.users.bulk_write([
+        UpdateOne(
+            {"user_id": payload["winner_user_id"], "credited_payouts": {"$ne": payload["payout_id"]}},
+            {
+                "$inc": {"mock_balance": payload["amount"]},
+                "$push": {"credited_payouts": {"$each": [payload["payout_id"]], "$slice": -CREDITED_PAYOUTS_KEPT}},
+            }
+        )
+        for payload in won
+    ], ordered=False)
+    payout_ids = [payload["payout_id"] for payload in won]
+    await db.payouts.update_many({"payout_id": {"$in": payout_ids}}, {"$set": {"paid": True}})
+    
+    # Claim each payout's leaderboard update before applying it, so batches
+    # settling the same payout concurrently count it once
+    results = await asyncio.gather(*[
+        db.payouts.update_one(
+            {"payout_id": payload["payout_id"], "leaderboard_recorded": {"$ne": True}},
+            {"$set": {"leaderboard_recorded": True}}
+        )
+        for payload in won
+    ])
+    
+    # One leaderboard update per event for the whole batch
+    by_event: Dict[str, List[Dict[str, Any]]] = {}
+    for payload, result in zip(won, results):
+        if result.modified_count:
+            by_event.setdefault(payload["event_name"], []).append(payload)
+    unrecorded = [payload["payout_id"] for event_payloads in by_event.values() for payload in event_payloads]
+    for event_name, event_payloads in by_event.items():
+        deltas: Dict[str, Dict[str, Any]] = {}
+        for payload in event_payloads:
+            delta = deltas.setdefault(payload["winner_user_id"], {"user_name": payload["winner_name"], "total_won": 0.0, "net_profit": 0.0, "win_count": 0})
+            delta["total_won"] += payload["amount"]
+            delta["net_profit"] += payload["amount"]
+            delta["win_count"] += 1
+        try:
+            await record_leaderboard_deltas(event_name, deltas)
+        except Exception:
+            # Release the claims not applied, so the retried job records them
+            await db.payouts.update_many({"payout_id": {"$in": unrecorded}}, {"$unset": {"leaderboard_recorded": ""}})
+            raise
+        unrecorded = unrecorded[len(event_payloads):]
+
+async def reconcile_settlements() -> int:
+    """Queue settlements recorded on games whose job was never queued.
+
+    Returns how many were queued.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=SETTLEMENT_GRACE_SECONDS)
+    games = await db.games.find(
+        {"pending_settlements.settled_at": {"$lt": cutoff}},
+        {"_id": 0, "pending_settlements": 1}
+    ).limit(JOB_BATCH_SIZE).to_list(JOB_BATCH_SIZE)
+    overdue = [
+        payload for game in games for payload in game["pending_settlements"]
+        if payload["settled_at"].replace(tzinfo=timezone.utc) < cutoff
+    ]
+    if not overdue:
+        return 0
+    
+    # Queued, running or dead-lettered jobs are left to the queue
+    payout_ids = [payload["payout_id"] for payload in overdue]
+    queued = set()
+    for collection in (db.jobs, db.dead_jobs):
+        queued |= set(await collection.distinct("payload.payout_id", {"payload.payout_id": {"$in": payout_ids}}))
+    missing = [payload for payload in overdue if payload["payout_id"] not in queued]
+    for payload in missing:
+        logger.warning(f"Queueing settlement {payload['payout_id']} of {payload['game_id']} that had no job")
+        await enqueue_job("settle_quarter", payload)
+    return len(missing)
+
+JOB_HANDLERS: Dict[str, Callable[[List[Dict[str, Any]]], Awaitable[None]]] = {
+    "settle_quarter": settle_quarters,
+}
+
+
+# ============= Score Settlement =============
+def parse_score(score: str) -> Tuple[int, int]:
+    """Team scores of a score like "21-17"; ValueError if malformed"""
+    team1, team2 = score.split("-")
+    return int(team1), int(team2)
+
+async def record_quarter_score(game: Dict[str, Any], quarter: str, score: str, session=None) -> Optional[Dict[str, Any]]:
+    """Record a quarter's score on an active game and queue its settlement.
+
+    The settlement is stored on the game with the score, so it is queued
+    again by reconcile_settlements if this process stops before queuing it.
+    `game` is updated in place. Returns None if the stored game changed
+    since it was read.
+    """
+    team1_score, team2_score = parse_score(score)
     
     # Calculate winning number
     team1_last_digit = team1_score % 10
@@ -431,184 +1811,2039 @@ async def update_score(game_id: str, score_request: UpdateScoreRequest, authoriz
     game["quarter_scores"][quarter] = score
     game["winners"][quarter] = winner_user_id
     
-    # Calculate and create payout
-    total_pot = game["entry_fee"] * 10
-    payout_percentages = {"Q1": 0.20, "Q2": 0.20, "Q3": 0.20, "Q4": 0.40}
-    payout_amount = total_pot * payout_percentages[quarter]
-    
-    if winner_user_id:
-        payout_id = f"payout_{uuid.uuid4().hex[:12]}"
-        payout = {
-            "payout_id": payout_id,
-            "game_id": game_id,
-            "user_id": winner_user_id,
-            "quarter": quarter,
-            "amount": payout_amount,
-            "paid": True,
-            "created_at": datetime.now(timezone.utc)
-        }
-        await db.payouts.insert_one(payout)
-        
-        # Credit winner's balance
-        await db.users.update_one(
-            {"user_id": winner_user_id},
-            {"$inc": {"mock_balance": payout_amount}}
-        )
-    
     # If Q4 is done, mark game as completed
     if quarter == "Q4":
         game["status"] = "completed"
+        game["completed_at"] = datetime.now(timezone.utc)
     
-    await db.games.update_one(
-        {"game_id": game_id},
-        {"$set": {
-            "quarter_scores": game["quarter_scores"],
-            "winners": game["winners"],
-            "status": game["status"]
-        }}
-    )
+    # Payout, balance credit and leaderboards are settled by the job queue
+    total_pot = game["entry_fee"] * 10
+    payout_amount = total_pot * PAYOUT_PERCENTAGES[quarter]
+    
+    winner_name = None
+    if winner_user_id:
+        winner_name = next(sq["user_name"] for sq in game["squares"] if sq and sq["user_id"] == winner_user_id)
+    # One payout per game and quarter, however often its job runs
+    settlement = {
+        "payout_id": "payout_" + hashlib.sha1(f"{game['game_id']}:{quarter}".encode()).hexdigest()[:12],
+        "game_id": game["game_id"],
+        "event_name": game["event_name"],
+        "quarter": quarter,
+        "winner_user_id": winner_user_id,
+        "winner_name": winner_name,
+        "amount": payout_amount,
+        "settled_at": datetime.now(timezone.utc),
+    }
+    pending = [payload for payload in game.get("pending_settlements", []) if payload["payout_id"] != settlement["payout_id"]]
+    game["pending_settlements"] = pending + [settlement]
+    
+    # Record the result first so a concurrent or repeated submit cannot pay twice
+    updated = await update_game(game, {"$set": {
+        "quarter_scores": game["quarter_scores"],
+        "winners": game["winners"],
+        "status": game["status"],
+        "completed_at": game.get("completed_at"),
+        "pending_settlements": game["pending_settlements"],
+    }}, session)
+    if not updated:
+        return None
+    await enqueue_job("settle_quarter", settlement, session)
     
     return {
-        "message": "Score updated",
         "winning_number": winning_number,
         "winner_user_id": winner_user_id,
         "payout_amount": payout_amount
     }
 
-@api_router.post("/games/{game_id}/leave")
-async def leave_square(game_id: str, authorization: Optional[str] = Header(None)):
-    """Leave/undo a square selection (only if game is still pending)"""
+async def settle_game_quarter(game: Dict[str, Any], quarter: str, score: str) -> bool:
+    """Record a feed score on one game, re-reading it after concurrent changes"""
+    for _ in range(SCORE_SETTLE_ATTEMPTS):
+        if await record_quarter_score(game, quarter, score):
+            return True
+        game = await fetch_game(game["game_id"])
+        if not game or game["status"] != "active" or quarter in game["quarter_scores"]:
+            return False
+    logger.warning(f"Gave up recording {quarter} on {game['game_id']} after {SCORE_SETTLE_ATTEMPTS} conflicting updates")
+    return False
+
+async def settle_event_quarter(event_name: str, quarter: str, score: str) -> Tuple[int, int]:
+    """Record a quarter's score on every active game of the event that lacks it.
+
+    Returns how many games were settled and how many failed.
+    """
+    query = {"status": "active", "event_name": event_name, f"quarter_scores.{quarter}": {"$exists": False}}
+    cursor = db.games.find(query, {"_id": 0}, batch_size=SCORE_SETTLE_CONCURRENCY)
+    settled = failed = 0
+    while batch := await cursor.to_list(SCORE_SETTLE_CONCURRENCY):
+        results = await asyncio.gather(*[settle_game_quarter(game, quarter, score) for game in batch], return_exceptions=True)
+        for game, result in zip(batch, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to record {quarter} on {game['game_id']}", exc_info=result)
+                failed += 1
+            elif result:
+                settled += 1
+    return settled, failed
+
+
+# ============= Score Feed =============
+class ScoreFeed(ABC):
+    """Source of quarter-end scores, one ScoreUpdate per finished quarter.
+
+    Adapters for a provider subclass this, implement updates() as an async
+    generator and register in SCORE_FEED_ADAPTERS.
+    """
+    # Reconnect when the updates end instead of stopping the pipeline
+    reconnect = True
+    
+    def __init__(self, url):
+        self.url = url
+    
+    @abstractmethod
+    def updates(self) -> AsyncIterator[ScoreUpdate]:
+        """Yield updates as they arrive; returning ends this connection"""
+
+def parse_score_update(line) -> Optional[ScoreUpdate]:
+    """One NDJSON feed line, or None (logged) if it is not a valid update"""
+    try:
+        return ScoreUpdate.model_validate_json(line)
+    except ValidationError as exc:
+        logger.warning(f"Skipping malformed score update {line[:200]!r}: {exc}")
+        return None
+
+class FileScoreFeed(ScoreFeed):
+    """Replays NDJSON updates from a file (file:///path), for testing and backfills"""
+    reconnect = False
+    
+    async def updates(self) -> AsyncIterator[ScoreUpdate]:
+        with open(self.url.path) as feed:
+            lines = await asyncio.to_thread(feed.readlines)
+        for line in lines:
+            if line.strip():
+                update = parse_score_update(line)
+                if update:
+                    yield update
+                    await asyncio.sleep(SCORE_FEED_REPLAY_DELAY_SECONDS)
+
+class SocketScoreFeed(ScoreFeed):
+    """NDJSON updates streamed over a TCP connection (tcp://host:port)"""
+    
+    async def updates(self) -> AsyncIterator[ScoreUpdate]:
+        reader, writer = await asyncio.open_connection(self.url.hostname, self.url.port)
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    update = parse_score_update(line)
+                    if update:
+                        yield update
+        finally:
+            writer.close()
+
+SCORE_FEED_ADAPTERS: Dict[str, type] = {
+    "file": FileScoreFeed,
+    "tcp": SocketScoreFeed,
+}
+
+# (event_name, quarter) -> score of the updates already settled
+ingested_scores: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+
+async def ingest_score_update(update: ScoreUpdate) -> Dict[str, Any]:
+    """Settle a feed update unless the same quarter was already ingested.
+
+    The first score of a quarter wins: paid quarters cannot be re-settled,
+    so a later different score is only logged.
+    """
+    key = (update.event_name, update.quarter)
+    seen = ingested_scores.get(key)
+    if seen is not None:
+        if seen != update.score:
+            logger.warning(f"Ignoring correction of {update.quarter} of {update.event_name} from {seen} to {update.score}")
+        return {"duplicate": True, "settled": 0, "failed": 0}
+    
+    started = time.monotonic()
+    settled, failed = await settle_event_quarter(update.event_name, update.quarter, update.score)
+    logger.info(f"Settled {update.quarter} of {update.event_name} ({update.score}) on {settled} game(s) in {time.monotonic() - started:.2f}s")
+    # Failed games are settled when the update is delivered again
+    if not failed:
+        ingested_scores[key] = update.score
+        while len(ingested_scores) > SCORE_FEED_DEDUPE_MAX:
+            ingested_scores.popitem(last=False)
+    return {"duplicate": False, "settled": settled, "failed": failed}
+
+def make_score_feed(url: str) -> ScoreFeed:
+    parsed = urlsplit(url)
+    if parsed.scheme not in SCORE_FEED_ADAPTERS:
+        raise ValueError(f"Unknown score feed {url!r} (use {', '.join(SCORE_FEED_ADAPTERS)})")
+    return SCORE_FEED_ADAPTERS[parsed.scheme](parsed)
+
+async def score_feed_loop(feed: ScoreFeed):
+    """Consume the feed, settling updates in order and reconnecting on errors"""
+    while True:
+        try:
+            async for update in feed.updates():
+                await ingest_score_update(update)
+            if not feed.reconnect:
+                logger.info("Score feed ended")
+                return
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Score feed failed")
+        await asyncio.sleep(SCORE_FEED_RETRY_SECONDS)
+
+
+# ============= Win Probability Engine =============
+@lru_cache(maxsize=4)
+def winning_number_probabilities(dataset_path: str, dataset_mtime: float) -> np.ndarray:
+    """P(winning number = d) per quarter from historical scores, shape (4, 10).
+
+    Counts are exact histograms over the dataset (the same
+    (team1 % 10 + team2 % 10) % 10 rule update_score uses), with add-one
+    smoothing so unseen numbers keep a small non-zero probability.
+    """
+    import pandas as pd
+    
+    frame = pd.read_csv(dataset_path, usecols=["quarter", "team1", "team2"])
+    frame = frame[frame["quarter"].isin(QUARTERS)]
+    quarter_index = frame["quarter"].map({quarter: i for i, quarter in enumerate(QUARTERS)}).to_numpy()
+    numbers = (frame["team1"].to_numpy(dtype=np.int64) % 10 + frame["team2"].to_numpy(dtype=np.int64) % 10) % 10
+    
+    counts = np.ones((len(QUARTERS), 10))
+    np.add.at(counts, (quarter_index, numbers), 1)
+    return counts / counts.sum(axis=1, keepdims=True)
+
+@lru_cache(maxsize=16)
+def odds_table(dataset_path: str, dataset_mtime: float, schedule: Tuple[Tuple[str, float], ...]) -> Dict[str, np.ndarray]:
+    """Win probabilities and expected share of the pot per winning number"""
+    probabilities = winning_number_probabilities(dataset_path, dataset_mtime)
+    shares = np.array([dict(schedule).get(quarter, 0.0) for quarter in QUARTERS])
+    return {"probabilities": probabilities, "pot_share": shares @ probabilities}
+
+async def load_odds_table() -> Optional[Dict[str, np.ndarray]]:
+    """Odds table of the current dataset, or None without one"""
+    try:
+        dataset_mtime = SCORE_DATASET_PATH.stat().st_mtime
+    except FileNotFoundError:
+        return None
+    
+    # Parsing the CSV would block the event loop
+    return await asyncio.to_thread(odds_table, str(SCORE_DATASET_PATH), dataset_mtime, tuple(sorted(PAYOUT_PERCENTAGES.items())))
+
+def game_odds(game: Dict[str, Any], table: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """Per-number and per-square odds for a board"""
+    probabilities, pot_share = table["probabilities"], table["pot_share"]
+    total_pot = game["entry_fee"] * 10
+    
+    def number_odds(number: int) -> Dict[str, Any]:
+        return {
+            "number": number,
+            "win_probability": {quarter: round(float(probabilities[i, number]), 4) for i, quarter in enumerate(QUARTERS)},
+            "expected_payout": round(float(total_pot * pot_share[number]), 2),
+            "expected_profit": round(float(total_pot * pot_share[number] - game["entry_fee"]), 2),
+        }
+    
+    numbers = [number_odds(number) for number in range(10)]
+    squares = []
+    for square_num, number in enumerate(game.get("random_numbers") or []):
+        if number is not None:
+            squares.append({"square_number": square_num, **numbers[number]})
+    return {"numbers": numbers, "squares": squares}
+
+
+# ============= Auth Routes =============
+@api_router.post("/auth/session")
+async def create_session(request: Request, response: Response):
+    """Exchange session_id for session_token"""
+    session_id = request.headers.get("X-Session-ID")
+    if not session_id:
+        raise HTTPException(status_code=400, detail="X-Session-ID header required")
+    
+    # Call Emergent Auth API
+    async def fetch_session_data():
+        async with httpx.AsyncClient() as client:
+            auth_response = await client.get(
+                "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
+                headers={"X-Session-ID": session_id}
+            )
+        # Rejected session ids are an answer; only server errors trip the breaker
+        if auth_response.status_code >= 500:
+            auth_response.raise_for_status()
+        return auth_response
+    
+    auth_response = await auth_provider_breaker.call(fetch_session_data)
+    
+    if auth_response.status_code != 200:
+        raise HTTPException(status_code=401, detail="Invalid session")
+    
+    user_data = auth_response.json()
+    
+    # Check if user exists
+    existing_user = await db.users.find_one(
+        {"email": user_data["email"]},
+        {"_id": 0}
+    )
+    
+    if existing_user:
+        user_doc = existing_user
+    else:
+        # Create new user
+        user_id = f"user_{uuid.uuid4().hex[:12]}"
+        user_doc = {
+            "user_id": user_id,
+            "email": user_data["email"],
+            "name": user_data["name"],
+            "picture": user_data.get("picture"),
+            "mock_balance": 1000.0,
+            "created_at": datetime.now(timezone.utc)
+        }
+        await db.users.insert_one(user_doc)
+        user_doc.pop('_id', None)
+    
+    # Create session
+    session_token = user_data["session_token"]
+    now = datetime.now(timezone.utc)
+    session = {
+        "user_id": user_doc["user_id"],
+        "session_token": session_token,
+        "expires_at": now + SESSION_TTL,
+        "created_at": now,
+        "last_seen_at": now
+    }
+    if AUTH_TOKEN_MODE == "jwt":
+        session["sid"] = uuid.uuid4().hex
+    await db.user_sessions.insert_one(session)
+    
+    response_data = SessionDataResponse(**user_data)
+    if AUTH_TOKEN_MODE == "jwt":
+        access_token, access_expires_at = issue_access_token(user_doc, session["sid"])
+        response_data.access_token = access_token
+        response_data.access_token_expires_at = access_expires_at
+    return response_data
+
+@api_router.post("/auth/refresh")
+async def refresh_access_token(authorization: Optional[str] = Header(None)):
+    """Exchange a session (refresh) token for a new short-lived access token"""
+    if AUTH_TOKEN_MODE != "jwt":
+        raise HTTPException(status_code=400, detail="Access tokens are not enabled")
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    token = extract_token(authorization)
+    session = await db.user_sessions.find_one({"session_token": token}, {"_id": 0})
+    if not session:
+        raise HTTPException(status_code=401, detail="Invalid session")
+    
+    expires_at = session["expires_at"]
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    now = datetime.now(timezone.utc)
+    if expires_at < now:
+        raise HTTPException(status_code=401, detail="Session expired")
+    
+    touch_session(session, now)
+    
+    user_doc = await db.users.find_one({"user_id": session["user_id"]}, {"_id": 0})
+    if not user_doc:
+        raise HTTPException(status_code=401, detail="Invalid session")
+    
+    # Sessions created before jwt mode was enabled get their sid on first refresh
+    sid = session.get("sid")
+    if not sid:
+        sid = uuid.uuid4().hex
+        await db.user_sessions.update_one({"session_token": token}, {"$set": {"sid": sid}})
+    
+    access_token, access_expires_at = issue_access_token(user_doc, sid)
+    return AccessTokenResponse(access_token=access_token, access_token_expires_at=access_expires_at)
+
+@api_router.get("/auth/me")
+async def get_me(authorization: Optional[str] = Header(None)):
+    """Get current user info"""
     user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    if is_access_token(extract_token(authorization)):
+        # Token claims only hold a balance snapshot
+        user = await load_user(user.user_id) or user
+    return user
+
+@api_router.post("/auth/logout")
+async def logout(authorization: Optional[str] = Header(None)):
+    """Logout user"""
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    token = extract_token(authorization)
+    
+    if is_access_token(token):
+        # Expired access tokens may still log out their session
+        claims = decode_access_token(token, verify_exp=False)
+        if not claims:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        await revoke_session_id(claims["sid"])
+        await db.user_sessions.delete_one({"sid": claims["sid"]})
+        return {"message": "Logged out successfully"}
+    
+    stale_responses.pop(f"auth:{token_identity(token)}")
+    session = await db.user_sessions.find_one_and_delete({"session_token": token}, {"_id": 0, "sid": 1})
+    if session and session.get("sid"):
+        await revoke_session_id(session["sid"])
+    return {"message": "Logged out successfully"}
+
+
+# ============= Game Routes =============
+@api_router.get("/games")
+async def get_games(fields: Optional[str] = None, authorization: Optional[str] = Header(None)):
+    """Get all games, optionally only some of their fields"""
+    user = await get_current_user(authorization, allow_stale=True)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    # Get game
-    game = await db.games.find_one({"game_id": game_id}, {"_id": 0})
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
+    selected = parse_fields(fields, GAMES_LIST_FIELDS)
+    with_entries = wants(selected, "user_entries")
+    read_db = route_db("get_games")
+    
+    async def load():
+        async with read_session(user.user_id) as session:
+            # Shared part comes pre-serialized from the cache
+            games_list = await cached_games_list(selected)
+            fragments = games_list.fragments
+            
+            # Optimize: Batch fetch all user entries in a single query instead of N+1 queries
+            all_user_entries = []
+            if fragments and with_entries:
+                game_ids = [game_id for game_id, _ in fragments]
+                all_user_entries = await read_db.game_entries.find(
+                    {"game_id": {"$in": game_ids}, "user_id": user.user_id},
+                    {"_id": 0, "game_id": 1, "entry_id": 1, "square_number": 1, "paid_amount": 1},
+                    session=session
+                ).to_list(1000)
+        return games_list, all_user_entries
+    
+    list_key = "games_list:" + (",".join(sorted(selected)) if selected is not None else "*")
+    try:
+        games_list, all_user_entries = await mongo_breaker.call(load)
+    except DependencyUnavailable:
+        # Last good list with this user's last known entries
+        stale_list = stale_responses.get(list_key)
+        stale_entries = stale_responses.get(f"games:{user.user_id}") if with_entries else (0.0, None)
+        if stale_list is None or stale_entries is None:
+            raise
+        return Response(
+            content=games_list_body(stale_list[1], stale_entries[1]),
+            media_type="application/json",
+            headers=stale_headers(max(stale_list[0], stale_entries[0]))
+        )
     
-    if game["status"] != "pending":
-        raise HTTPException(status_code=400, detail="Cannot leave square after game has started")
+    fragments = games_list.fragments
+    # Where the client's delta sync starts from
+    headers = {"X-Change-Seq": str(games_list.seq)}
+    stale_responses.put(list_key, fragments)
+    if not with_entries:
+        return Response(content=games_list_body(fragments, None), media_type="application/json", headers=headers)
+    
+    # Group entries by game_id
+    entries_by_game = {}
+    for entry in all_user_entries:
+        game_id = entry["game_id"]
+        if game_id not in entries_by_game:
+            entries_by_game[game_id] = []
+        entries_by_game[game_id].append(entry)
+    
+    stale_responses.put(f"games:{user.user_id}", entries_by_game)
+    return Response(content=games_list_body(fragments, entries_by_game), media_type="application/json", headers=headers)
+
+@api_router.get("/games/changes")
+async def get_game_changes(since: int, fields: Optional[str] = None, authorization: Optional[str] = Header(None)):
+    """Games created, updated or deleted after change sequence number `since`.
+
+    Items have the shape of the game list (same fields= selection); the
+    returned seq is the `since` of the next call. reset means the client
+    must reload the whole list instead.
+    """
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
     
-    # Find user's entries in this game
-    entries = await db.game_entries.find(
-        {"game_id": game_id, "user_id": user.user_id},
-        {"_id": 0}
-    ).to_list(10)
+    selected = parse_fields(fields, GAMES_LIST_FIELDS)
+    read_db = route_db("get_games")
+    async with read_session(user.user_id) as session:
+        # Read first: changes made while this request runs are sent next time
+        seq = await current_change_seq(read_db, session)
+        if since < 0 or since > seq:
+            return {"seq": seq, "reset": True, "games": [], "deleted": []}
+        
+        floor = max(0, since - GAME_CHANGES_OVERLAP)
+        games = await read_db.games.find(
+            {"change_seq": {"$gt": floor}},
+            games_list_projection(selected),
+            session=session
+        ).sort("change_seq", 1).limit(GAME_CHANGES_MAX + 1).to_list(GAME_CHANGES_MAX + 1)
+        if len(games) > GAME_CHANGES_MAX:
+            return {"seq": seq, "reset": True, "games": [], "deleted": []}
+        
+        tombstones = await read_db.game_tombstones.find(
+            {"change_seq": {"$gt": floor}},
+            {"_id": 0, "game_id": 1},
+            session=session
+        ).to_list(None)
+        
+        if games and wants(selected, "user_entries"):
+            entries = await read_db.game_entries.find(
+                {"game_id": {"$in": [game["game_id"] for game in games]}, "user_id": user.user_id},
+                {"_id": 0, "game_id": 1, "entry_id": 1, "square_number": 1, "paid_amount": 1},
+                session=session
+            ).to_list(1000)
+            for game in games:
+                game["user_entries"] = [entry for entry in entries if entry["game_id"] == game["game_id"]]
+    
+    return {"seq": seq, "reset": False, "games": games, "deleted": [tombstone["game_id"] for tombstone in tombstones]}
+
+@api_router.get("/games/{game_id}")
+async def get_game(game_id: str, fields: Optional[str] = None, authorization: Optional[str] = Header(None)):
+    """Get game details, optionally only some of their fields"""
+    user = await get_current_user(authorization, allow_stale=True)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    selected = parse_fields(fields, set(Game.model_fields) | GAME_RELATED_FIELDS)
+    projection = {"_id": 0}
+    if selected is not None:
+        # Payouts depend on the status, odds on the fee and drawn numbers
+        projection.update({field: 1 for field in (selected - GAME_RELATED_FIELDS) | {"status", "entry_fee", "random_numbers"}})
+    read_db = route_db("get_game")
+    
+    async def load():
+        async with read_session(user.user_id) as session:
+            # Cached games are trimmed to the selected fields below
+            game = await fetch_game(game_id, session, read_db, projection)
+            collections = {name: name for name in ARCHIVE_COLLECTIONS}
+            if not game:
+                # Long completed games live in the archive with their history
+                game = await read_db.games_archive.find_one({"game_id": game_id}, projection, session=session)
+                collections = ARCHIVE_COLLECTIONS
+            if not game:
+                raise HTTPException(status_code=404, detail="Game not found")
+            
+            # Get all entries for this game
+            if wants(selected, "entries"):
+                entries = await read_db[collections["game_entries"]].find(
+                    {"game_id": game_id},
+                    {"_id": 0, "entry_id": 1, "user_id": 1, "user_name": 1, "square_number": 1, "paid_amount": 1, "created_at": 1},
+                    session=session
+                ).limit(100).to_list(100)
+                game["entries"] = entries
+            
+            # Get payouts if game is active or completed
+            if wants(selected, "payouts"):
+                if game["status"] in ["active", "completed"]:
+                    payouts = await read_db[collections["payouts"]].find(
+                        {"game_id": game_id},
+                        {"_id": 0},
+                        session=session
+                    ).to_list(100)
+                    game["payouts"] = payouts
+                else:
+                    game["payouts"] = []
+            
+            # Squares players are holding while they confirm
+            if wants(selected, "held_squares"):
+                game["held_squares"] = await read_db.square_holds.find(
+                    {"game_id": game_id, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+                    {"_id": 0, "square_number": 1, "user_id": 1, "expires_at": 1},
+                    session=session
+                ).to_list(10)
+        return game
     
-    if not entries:
-        raise HTTPException(status_code=400, detail="You have no entries in this game")
+    try:
+        game = await mongo_breaker.call(load)
+    except DependencyUnavailable:
+        stale = stale_responses.get(f"game:{game_id}")
+        if stale is None:
+            raise
+        return JSONResponse(jsonable_encoder(select_fields(stale[1], selected)), headers=stale_headers(stale[0]))
+    
+    if wants(selected, "odds"):
+        table = await load_odds_table()
+        game["odds"] = game_odds(game, table) if table is not None else None
+    if selected is None:
+        stale_responses.put(f"game:{game_id}", game)
+    return select_fields(game, selected)
+
+@api_router.post("/games")
+async def create_game(game_request: CreateGameRequest, authorization: Optional[str] = Header(None)):
+    """Create a new game"""
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
     
-    # Remove all user's entries
-    for entry in entries:
-        square_num = entry["square_number"]
-        game["squares"][square_num] = None
+    async with write_session(user.user_id) as session:
+        game_id = f"game_{uuid.uuid4().hex[:12]}"
+        game = {
+            "game_id": game_id,
+            "creator_id": user.user_id,
+            "event_name": game_request.event_name,
+            "entry_fee": game_request.entry_fee,
+            "status": "pending",
+            "squares": [None] * 10,  # 10 empty squares
+            "random_numbers": [None] * 10,
+            "created_at": datetime.now(timezone.utc),
+            "quarter_scores": {},
+            "winners": {},
+            "version": 0,
+            "open_squares": random.sample(range(10), 10)
+        }
         
-        # Refund user (only if entry fee > 0)
-        if entry["paid_amount"] > 0:
-            await db.users.update_one(
-                {"user_id": user.user_id},
-                {"$inc": {"mock_balance": entry["paid_amount"]}}
-            )
+        await db.games.insert_one(game, session=session)
+        # Remove MongoDB's _id field before returning
+        game.pop('_id', None)
+        cache_game(game)
+        await game_changed(game_id)
+        return game
+
+@api_router.post("/games/bulk")
+async def create_games_bulk(bulk_request: BulkCreateGamesRequest, authorization: Optional[str] = Header(None)):
+    """Create `count` identical boards from a template in a single insert"""
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
     
-    # Delete entries
-    await db.game_entries.delete_many({"game_id": game_id, "user_id": user.user_id})
+    if bulk_request.count < 1 or bulk_request.count > BULK_CREATE_MAX_GAMES:
+        raise HTTPException(status_code=400, detail=f"count must be between 1 and {BULK_CREATE_MAX_GAMES}")
+    if bulk_request.entry_fee < 0:
+        raise HTTPException(status_code=400, detail="entry_fee must not be negative")
+    
+    now = datetime.now(timezone.utc)
+    games = []
+    for n in range(bulk_request.start, bulk_request.start + bulk_request.count):
+        game = {
+            "game_id": f"game_{uuid.uuid4().hex[:12]}",
+            "creator_id": user.user_id,
+            "event_name": bulk_request.event_name,
+            "entry_fee": bulk_request.entry_fee,
+            "status": "pending",
+            "squares": [None] * 10,
+            "random_numbers": [None] * 10,
+            "created_at": now,
+            "quarter_scores": {},
+            "winners": {},
+            "version": 0,
+            "open_squares": random.sample(range(10), 10)
+        }
+        if bulk_request.name_pattern:
+            game["name"] = bulk_request.name_pattern.replace("{n}", str(n))
+        games.append(game)
+    
+    async with write_session(user.user_id) as session:
+        await db.games.insert_many(games, session=session)
+    
+    game_ids = []
+    for game in games:
+        game.pop('_id', None)
+        cache_game(game)
+        game_ids.append(game["game_id"])
+    await games_created(game_ids)
+    return {"game_ids": game_ids, "count": len(game_ids)}
+
+@api_router.post("/games/{game_id}/join")
+async def join_game(game_id: str, join_request: JoinGameRequest, authorization: Optional[str] = Header(None)):
+    """Join a game by selecting a square"""
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
     
-    # Update game
-    await db.games.update_one(
-        {"game_id": game_id},
-        {"$set": {"squares": game["squares"]}}
-    )
+    square_num = join_request.square_number
+    if square_num < 0 or square_num > 9:
+        raise HTTPException(status_code=400, detail="Invalid square number")
     
-    return {"message": f"Successfully left {len(entries)} square(s)", "refunded": sum(e["paid_amount"] for e in entries)}
+    # Validated and written together with concurrent joins of the same game
+    return await join_batcher.submit(game_id, user, square_num)
 
-@api_router.delete("/games/{game_id}")
-async def delete_game(game_id: str, authorization: Optional[str] = Header(None)):
-    """Delete a game (only creator can do this, and only if game is pending)"""
+@api_router.post("/games/{game_id}/reserve")
+async def reserve_square(game_id: str, reserve_request: ReserveSquareRequest, authorization: Optional[str] = Header(None)):
+    """Hold a square for the caller while they confirm joining"""
     user = await get_current_user(authorization)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    # Get game
-    game = await db.games.find_one({"game_id": game_id}, {"_id": 0})
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
+    square_num = reserve_request.square_number
+    if square_num < 0 or square_num > 9:
+        raise HTTPException(status_code=400, detail="Invalid square number")
     
-    if game["creator_id"] != user.user_id:
-        raise HTTPException(status_code=403, detail="Only game creator can delete the game")
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(seconds=SQUARE_HOLD_SECONDS)
+    async with write_session(user.user_id) as session:
+        # Tapping a square the caller already holds extends the hold
+        hold = await db.square_holds.find_one_and_update(
+            {"game_id": game_id, "square_number": square_num, "user_id": user.user_id, "expires_at": {"$gt": now}},
+            {"$set": {"expires_at": expires_at}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+            session=session
+        )
+        if hold:
+            return hold
+        
+        # Holds count towards the 2 entries per game
+        user_entries_count = await db.game_entries.count_documents({
+            "game_id": game_id,
+            "user_id": user.user_id
+        }, session=session)
+        user_holds_count = await db.square_holds.count_documents({
+            "game_id": game_id,
+            "user_id": user.user_id,
+            "expires_at": {"$gt": now}
+        }, session=session)
+        if user_entries_count + user_holds_count >= 2:
+            raise HTTPException(status_code=400, detail="You can only have 2 entries per game")
+        
+        # Taking the square out of open_squares keeps other joins and
+        # quick-join away from it until the hold ends
+        game = await db.games.find_one_and_update(
+            {"game_id": game_id, "status": "pending", f"squares.{square_num}": None, "open_squares": square_num},
+            {"$pull": {"open_squares": square_num}, "$inc": {"version": 1}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+            session=session
+        )
+        if not game:
+            game = await fetch_game(game_id, session)
+            if not game:
+                raise HTTPException(status_code=404, detail="Game not found")
+            if game["status"] != "pending":
+                raise HTTPException(status_code=400, detail="Game is not accepting new players")
+            if game["squares"][square_num] is not None:
+                raise HTTPException(status_code=400, detail="Square already taken")
+            raise HTTPException(status_code=409, detail="Square is held by another player")
+        cache_game(game)
+        await game_changed(game_id)
+        
+        hold = {
+            "hold_id": f"hold_{uuid.uuid4().hex[:12]}",
+            "game_id": game_id,
+            "square_number": square_num,
+            "user_id": user.user_id,
+            "expires_at": expires_at,
+            "created_at": now
+        }
+        # Replaces a hold on this square that expired but was not swept yet
+        await db.square_holds.replace_one(
+            {"game_id": game_id, "square_number": square_num},
+            hold,
+            upsert=True,
+            session=session
+        )
+        return hold
+
+@api_router.delete("/games/{game_id}/reserve/{square_number}")
+async def release_square(game_id: str, square_number: int, authorization: Optional[str] = Header(None)):
+    """Give up a square the caller is holding"""
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
     
-    if game["status"] != "pending":
-        raise HTTPException(status_code=400, detail="Cannot delete game after it has started")
+    async with write_session(user.user_id) as session:
+        hold = await db.square_holds.find_one_and_delete(
+            {"game_id": game_id, "square_number": square_number, "user_id": user.user_id},
+            projection={"_id": 0},
+            session=session
+        )
+        if not hold:
+            raise HTTPException(status_code=404, detail="Hold not found")
+        
+        await release_held_squares([hold], session)
+        return {"message": "Square released"}
+
+@api_router.post("/games/quick-join")
+async def quick_join(quick_join_request: QuickJoinRequest, authorization: Optional[str] = Header(None)):
+    """Claim a random open square in any matching pending game"""
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
     
-    # Refund all players
-    entries = await db.game_entries.find({"game_id": game_id}, {"_id": 0}).to_list(100)
-    for entry in entries:
-        if entry["paid_amount"] > 0:
-            await db.users.update_one(
-                {"user_id": entry["user_id"]},
-                {"$inc": {"mock_balance": entry["paid_amount"]}}
+    async with write_session(user.user_id) as session:
+        # Fees are checked against the stored balance, not the caller record
+        current_user = await load_user(user.user_id)
+        if not current_user:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        max_fee = current_user.mock_balance
+        if quick_join_request.max_entry_fee is not None:
+            max_fee = min(max_fee, quick_join_request.max_entry_fee)
+        
+        query: Dict[str, Any] = {
+            "status": "pending",
+            "open_squares.0": {"$exists": True},
+            "entry_fee": {"$gte": quick_join_request.min_entry_fee, "$lte": max_fee},
+            # At most 2 squares per player and game
+            "$expr": {"$lt": [
+                {"$size": {"$filter": {"input": "$squares", "as": "square", "cond": {"$eq": ["$$square.user_id", user.user_id]}}}},
+                2
+            ]},
+        }
+        if quick_join_request.event_name:
+            query["event_name"] = quick_join_request.event_name
+        
+        # Pop the first open square and fill it in one atomic update
+        entry_id = f"entry_{uuid.uuid4().hex[:12]}"
+        square = {"user_id": user.user_id, "user_name": user.name, "entry_id": entry_id}
+        claimed = {"$arrayElemAt": ["$open_squares", 0]}
+        game = await db.games.find_one_and_update(
+            query,
+            [{"$set": {
+                "squares": {"$map": {
+                    "input": {"$range": [0, 10]},
+                    "as": "i",
+                    "in": {"$cond": [{"$eq": ["$$i", claimed]}, {"$literal": square}, {"$arrayElemAt": ["$squares", "$$i"]}]}
+                }},
+                "open_squares": {"$slice": ["$open_squares", 1, 10]},
+                "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+            }}],
+            projection={"_id": 0},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+            session=session
+        )
+        if not game:
+            raise HTTPException(status_code=404, detail="No open squares match your request")
+        
+        game_id = game["game_id"]
+        square_num = next(i for i, sq in enumerate(game["squares"]) if sq and sq["entry_id"] == entry_id)
+        cache_game(game)
+        await game_changed(game_id)
+        
+        if game["entry_fee"] > 0:
+            result = await db.users.update_one(
+                {"user_id": user.user_id, "mock_balance": {"$gte": game["entry_fee"]}},
+                {"$inc": {"mock_balance": -game["entry_fee"]}},
+                session=session
             )
+            if result.modified_count == 0:
+                # Balance changed meanwhile; hand the square back
+                await db.games.update_one(
+                    {"game_id": game_id, f"squares.{square_num}.entry_id": entry_id},
+                    {"$set": {f"squares.{square_num}": None}, "$push": {"open_squares": square_num}, "$inc": {"version": 1}},
+                    session=session
+                )
+                evict_game(game_id)
+                await game_changed(game_id)
+                raise HTTPException(status_code=400, detail="Insufficient balance")
+        
+        entry = {
+            "entry_id": entry_id,
+            "game_id": game_id,
+            "user_id": user.user_id,
+            "user_name": user.name,
+            "square_number": square_num,
+            "paid_amount": game["entry_fee"],
+            "created_at": datetime.now(timezone.utc)
+        }
+        await db.game_entries.insert_one(entry, session=session)
+        entry.pop('_id', None)
+        
+        game_status = game["status"]
+        if not game["open_squares"] and await activate_if_full(game_id, session):
+            game_status = "active"
+        
+        return {"message": "Successfully joined game", "entry": entry, "game_id": game_id, "game_status": game_status}
+
+@api_router.post("/games/{game_id}/score")
+async def update_score(game_id: str, score_request: UpdateScoreRequest, authorization: Optional[str] = Header(None)):
+    """Update score for a quarter (only game creator can do this)"""
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
     
-    # Delete all entries
-    await db.game_entries.delete_many({"game_id": game_id})
+    async with write_session(user.user_id) as session:
+        # Get game
+        game = await fetch_game(game_id, session)
+        if not game:
+            raise HTTPException(status_code=404, detail="Game not found")
+        
+        if game["creator_id"] != user.user_id:
+            raise HTTPException(status_code=403, detail="Only game creator can update scores")
+        
+        if game["status"] != "active":
+            raise HTTPException(status_code=400, detail="Game is not active")
+        
+        quarter = score_request.quarter
+        score = score_request.score
+        
+        if quarter not in QUARTERS:
+            raise HTTPException(status_code=400, detail="Invalid quarter")
+        
+        # Its payout may already be settled; a corrected score would pay a second winner
+        if quarter in game["quarter_scores"]:
+            raise HTTPException(status_code=400, detail="Quarter already scored")
+        
+        # Parse score (e.g., "21-17")
+        try:
+            parse_score(score)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid score format (use XX-XX)")
+        
+        result = await record_quarter_score(game, quarter, score, session)
+        if not result:
+            raise HTTPException(status_code=409, detail="Game was just updated, please try again")
+        
+        return {"message": "Score updated", **result}
+
+@api_router.post("/games/{game_id}/leave")
+async def leave_square(game_id: str, authorization: Optional[str] = Header(None)):
+    """Leave/undo a square selection (only if game is still pending)"""
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
     
-    # Delete game
-    await db.games.delete_one({"game_id": game_id})
+    async with write_session(user.user_id) as session:
+        # Get game
+        game = await fetch_game(game_id, session)
+        if not game:
+            raise HTTPException(status_code=404, detail="Game not found")
+        
+        if game["status"] != "pending":
+            raise HTTPException(status_code=400, detail="Cannot leave square after game has started")
+        
+        # Find user's entries in this game
+        entries = await db.game_entries.find(
+            {"game_id": game_id, "user_id": user.user_id},
+            {"_id": 0},
+            session=session
+        ).to_list(10)
+        
+        if not entries:
+            raise HTTPException(status_code=400, detail="You have no entries in this game")
+        
+        # Free the squares first; rejected if the game changed since it was read
+        for entry in entries:
+            game["squares"][entry["square_number"]] = None
+        freed = [entry["square_number"] for entry in entries]
+        game["open_squares"] = [i for i in game.get("open_squares", []) if i not in freed] + freed
+        
+        updated = await update_game(game, {"$set": {"squares": game["squares"], "open_squares": game["open_squares"]}}, session)
+        if not updated:
+            raise HTTPException(status_code=409, detail="Game was just updated, please try again")
+        
+        # Refund user (only if entry fee > 0)
+        for entry in entries:
+            if entry["paid_amount"] > 0:
+                await db.users.update_one(
+                    {"user_id": user.user_id},
+                    {"$inc": {"mock_balance": entry["paid_amount"]}},
+                    session=session
+                )
+        
+        # Delete entries
+        await db.game_entries.delete_many({"game_id": game_id, "user_id": user.user_id}, session=session)
+        
+        return {"message": f"Successfully left {len(entries)} square(s)", "refunded": sum(e["paid_amount"] for e in entries)}
+
+@api_router.delete("/games/{game_id}")
+async def delete_game(game_id: str, authorization: Optional[str] = Header(None)):
+    """Delete a game (only creator can do this, and only if game is pending)"""
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
     
-    return {"message": "Game deleted successfully", "refunded_entries": len(entries)}
+    async with write_session(user.user_id) as session:
+        # Get game
+        game = await fetch_game(game_id, session)
+        if not game:
+            raise HTTPException(status_code=404, detail="Game not found")
+        
+        if game["creator_id"] != user.user_id:
+            raise HTTPException(status_code=403, detail="Only game creator can delete the game")
+        
+        if game["status"] != "pending":
+            raise HTTPException(status_code=400, detail="Cannot delete game after it has started")
+        
+        # Delete game first; rejected if someone joined since it was read
+        result = await db.games.delete_one({"game_id": game_id, **version_filter(game)}, session=session)
+        evict_game(game_id)
+        if result.deleted_count == 0:
+            raise HTTPException(status_code=409, detail="Game was just updated, please try again")
+        await game_changed(game_id)
+        
+        # Refund all players
+        entries = await db.game_entries.find({"game_id": game_id}, {"_id": 0}, session=session).to_list(100)
+        for entry in entries:
+            if entry["paid_amount"] > 0:
+                await db.users.update_one(
+                    {"user_id": entry["user_id"]},
+                    {"$inc": {"mock_balance": entry["paid_amount"]}},
+                    session=session
+                )
+        
+        # Delete all entries
+        await db.game_entries.delete_many({"game_id": game_id}, session=session)
+        await db.square_holds.delete_many({"game_id": game_id}, session=session)
+        
+        return {"message": "Game deleted successfully", "refunded_entries": len(entries)}
 
 @api_router.get("/profile")
-async def get_profile(authorization: Optional[str] = Header(None)):
-    """Get user profile with game history"""
+async def get_profile(fields: Optional[str] = None, authorization: Optional[str] = Header(None)):
+    """Get user profile with game history, optionally only some of its parts"""
     user = await get_current_user(authorization)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    # Get user's game entries
-    entries = await db.game_entries.find(
-        {"user_id": user.user_id},
-        {"_id": 0, "entry_id": 1, "game_id": 1, "square_number": 1, "paid_amount": 1, "created_at": 1}
-    ).limit(100).to_list(100)
+    selected = parse_fields(fields, PROFILE_FIELDS)
+    profile = {}
+    read_db = route_db("get_profile")
+    async with read_session(user.user_id) as session:
+        # Get user's game entries
+        if wants(selected, "entries"):
+            profile["entries"] = await find_with_archive(
+                read_db, "game_entries",
+                {"user_id": user.user_id},
+                {"_id": 0, "entry_id": 1, "game_id": 1, "square_number": 1, "paid_amount": 1, "created_at": 1},
+                session
+            )
+        
+        # Get user's payouts
+        if wants(selected, "payouts") or wants(selected, "total_winnings"):
+            payouts = await find_with_archive(
+                read_db, "payouts",
+                {"user_id": user.user_id},
+                {"_id": 0},
+                session
+            )
+            profile["payouts"] = payouts
+            profile["total_winnings"] = sum(p["amount"] for p in payouts)
+        
+        # Get games created by user
+        if wants(selected, "created_games"):
+            profile["created_games"] = await find_with_archive(
+                read_db, "games",
+                {"creator_id": user.user_id},
+                {"_id": 0, "game_id": 1, "event_name": 1, "entry_fee": 1, "status": 1, "created_at": 1},
+                session
+            )
     
-    # Get user's payouts
-    payouts = await db.payouts.find(
-        {"user_id": user.user_id},
-        {"_id": 0}
-    ).limit(100).to_list(100)
+    if wants(selected, "user"):
+        if is_access_token(extract_token(authorization)):
+            # Token claims only hold a balance snapshot
+            user = await load_user(user.user_id) or user
+        profile["user"] = user
     
-    # Get games created by user
-    created_games = await db.games.find(
-        {"creator_id": user.user_id},
-        {"_id": 0, "game_id": 1, "event_name": 1, "entry_fee": 1, "status": 1, "created_at": 1}
-    ).limit(100).to_list(100)
+    return {field: profile[field] for field in PROFILE_FIELDS if wants(selected, field)}
+
+
+@api_router.get("/leaderboards")
+async def get_leaderboard(
+    event_name: Optional[str] = None,
+    metric: str = "net_profit",
+    limit: int = 20,
+    authorization: Optional[str] = Header(None)
+):
+    """Top players overall or for one event by total won, net profit or win count"""
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
     
-    return {
-        "user": user,
-        "entries": entries,
-        "payouts": payouts,
-        "created_games": created_games,
-        "total_winnings": sum(p["amount"] for p in payouts)
+    if metric not in LEADERBOARD_METRICS:
+        raise HTTPException(status_code=400, detail=f"Invalid metric (use one of {', '.join(LEADERBOARD_METRICS)})")
+    if limit < 1 or limit > 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+    
+    scope = f"event:{event_name}" if event_name else "global"
+    board = await load_leaderboard(scope)
+    return {"scope": scope, "metric": metric, "entries": board.top(metric, limit)}
+
+
+# ============= Batch Route =============
+# Users already authenticated in this request, by Authorization header (batch sub-requests)
+authenticated_users: ContextVar[Optional[Dict[Optional[str], User]]] = ContextVar("authenticated_users", default=None)
+
+async def run_sub_request(sub_request: BatchSubRequest, request: Request) -> Dict[str, Any]:
+    """Call the app in-process with one sub-request and collect its response"""
+    path, _, query = sub_request.path.partition("?")
+    body = b"" if sub_request.body is None else json.dumps(sub_request.body).encode("utf-8")
+    # Caller headers (authorization, forwarding, request id, causal token) carry over
+    headers = [
+        (name, value) for name, value in request.scope["headers"]
+        if name not in (b"content-type", b"content-length")
+    ]
+    headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": sub_request.method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": headers,
+        "client": request.scope.get("client"),
+        "server": request.scope.get("server"),
+        "batch_sub_request": True,
     }
+    
+    sent = False
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+    
+    status = 500
+    response_headers: Dict[str, str] = {}
+    chunks = []
+    async def send(message):
+        nonlocal status, response_headers
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in message.get("headers", [])}
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+    
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        logger.exception(f"Batch sub-request {sub_request.method} {sub_request.path} failed")
+        return {"id": sub_request.id, "status": 500, "headers": {}, "body": {"detail": "Internal Server Error"}}
+    content = b"".join(chunks)
+    if content and response_headers.get("content-type", "").startswith("application/json"):
+        result = json.loads(content)
+    else:
+        result = content.decode("utf-8", "replace") or None
+    headers = {name: response_headers[name] for name in BATCH_RESPONSE_HEADERS if name in response_headers}
+    return {"id": sub_request.id, "status": status, "headers": headers, "body": result}
+
+@api_router.post("/batch")
+async def batch(batch_request: BatchRequest, request: Request, authorization: Optional[str] = Header(None)):
+    """Run several API calls concurrently in one round trip, authenticating once.
+
+    Sub-requests have no order among each other; each gets its own status
+    and is rate limited and admitted as if it had been sent on its own.
+    """
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    if not batch_request.requests or len(batch_request.requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"A batch holds 1 to {BATCH_MAX_REQUESTS} requests")
+    for sub_request in batch_request.requests:
+        sub_request.method = sub_request.method.upper()
+        if sub_request.method not in BATCH_METHODS:
+            raise HTTPException(status_code=400, detail=f"Unsupported method {sub_request.method}")
+        if not sub_request.path.startswith("/api/") or sub_request.path.split("?")[0].rstrip("/") == "/api/batch":
+            raise HTTPException(status_code=400, detail=f"Invalid path {sub_request.path}")
+    
+    # Sub-requests run in copies of this context and reuse the user resolved above
+    authenticated_users.set({authorization: user})
+    responses = await asyncio.gather(*[run_sub_request(sub_request, request) for sub_request in batch_request.requests])
+    return {"responses": responses}
+
+
+# ============= Admin Routes =============
+def require_admin(user: User):
+    """Reject callers that are not listed in ADMIN_USER_IDS"""
+    if user.user_id not in ADMIN_USER_IDS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+async def stream_export(cursor, collection: str, export_format: str, batch_size: int):
+    """Encode documents chunk by chunk so memory stays flat regardless of size"""
+    columns = EXPORT_COLUMNS[collection]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format == "csv":
+        writer.writerow(columns)
+    
+    rows = 0
+    async for doc in cursor:
+        if export_format == "ndjson":
+            buffer.write(json.dumps(doc, default=json_default))
+            buffer.write("\n")
+        else:
+            writer.writerow([csv_value(doc.get(column)) for column in columns])
+        rows += 1
+        if rows % batch_size == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+@api_router.get("/admin/export/{collection}")
+async def export_collection(
+    collection: str,
+    format: str = "ndjson",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    status: Optional[str] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    archived: bool = False,
+    authorization: Optional[str] = Header(None)
+):
+    """Stream games, game_entries or payouts (or their archives) as NDJSON or CSV (admin only)"""
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    require_admin(user)
+    
+    if collection not in EXPORT_COLUMNS:
+        raise HTTPException(status_code=404, detail="Unknown collection")
+    if format not in ["ndjson", "csv"]:
+        raise HTTPException(status_code=400, detail="Invalid format (use ndjson or csv)")
+    if batch_size < 1 or batch_size > 10000:
+        raise HTTPException(status_code=400, detail="batch_size must be between 1 and 10000")
+    
+    cursor = export_cursor(db, collection, start, end, status, batch_size, archived)
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    return StreamingResponse(
+        stream_export(cursor, collection, format, batch_size),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{collection}.{format}"'}
+    )
+
+
+@api_router.get("/admin/admission")
+async def admission_stats(authorization: Optional[str] = Header(None)):
+    """In-flight requests, queue depth and shed counts per route (admin only)"""
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    require_admin(user)
+    
+    return admission.stats()
+
+
+@api_router.post("/admin/leaderboards/rebuild")
+async def rebuild_leaderboards_route(authorization: Optional[str] = Header(None)):
+    """Recompute all leaderboards from payouts (admin only)"""
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    require_admin(user)
+    
+    rows = await rebuild_leaderboards()
+    return {"message": "Leaderboards rebuilt", "rows": rows}
+
+
+@api_router.post("/admin/scores")
+async def ingest_score(update: ScoreUpdate, authorization: Optional[str] = Header(None)):
+    """Settle a quarter-end score on every active game of its event, like a feed update (admin only)"""
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    require_admin(user)
+    
+    return await ingest_score_update(update)
+
+
+@api_router.get("/admin/jobs")
+async def job_stats(limit: int = 20, authorization: Optional[str] = Header(None)):
+    """Job counts by kind and status, and the most recent dead jobs (admin only)"""
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    require_admin(user)
+    
+    counts: Dict[str, Dict[str, int]] = {}
+    # Sorting first lets the counts be taken from the (kind, status) index alone
+    async for row in db.jobs.aggregate([
+        {"$sort": {"kind": 1, "status": 1}},
+        {"$group": {"_id": {"kind": "$kind", "status": "$status"}, "count": {"$sum": 1}}},
+    ]):
+        counts.setdefault(row["_id"]["kind"], {})[row["_id"]["status"]] = row["count"]
+    dead = await db.dead_jobs.find({}, {"_id": 0}).sort("failed_at", -1).limit(limit).to_list(limit)
+    return {"counts": counts, "dead": dead, "dead_total": await db.dead_jobs.estimated_document_count()}
+
+
+@api_router.post("/admin/jobs/{job_id}/retry")
+async def retry_dead_job(job_id: str, authorization: Optional[str] = Header(None)):
+    """Move a dead job back to the queue with a fresh attempt count (admin only)"""
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    require_admin(user)
+    
+    job = await db.dead_jobs.find_one({"job_id": job_id})
+    if not job:
+        raise HTTPException(status_code=404, detail="Dead job not found")
+    
+    job.pop("error", None)
+    job.pop("failed_at", None)
+    job.pop("claim", None)
+    job.pop("locked_until", None)
+    await db.jobs.insert_one({**job, "status": "queued", "attempts": 0, "run_at": datetime.now(timezone.utc)})
+    await db.dead_jobs.delete_one({"job_id": job_id})
+    job_wakeup.set()
+    return {"message": "Job requeued", "job_id": job_id}
+
+
+# ============= Traffic Capture =============
+traffic_logger = logging.getLogger("squaredaddy.traffic")
+traffic_logger.propagate = False
+traffic_listener: Optional[QueueListener] = None
+
+def start_traffic_capture():
+    """Write captured requests to the rotating log from a background thread"""
+    global traffic_listener
+    if traffic_listener is not None:
+        return
+    handler = RotatingFileHandler(TRAFFIC_CAPTURE_PATH, maxBytes=TRAFFIC_CAPTURE_MAX_BYTES, backupCount=TRAFFIC_CAPTURE_BACKUPS)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    records: "queue.Queue[logging.LogRecord]" = queue.Queue()
+    traffic_logger.handlers = [QueueHandler(records)]
+    traffic_logger.setLevel(logging.INFO)
+    traffic_listener = QueueListener(records, handler)
+    traffic_listener.start()
+
+def stop_traffic_capture():
+    """Write out queued captures and close the log; capture may be started again"""
+    global traffic_listener
+    if traffic_listener is not None:
+        traffic_listener.stop()
+        for handler in traffic_listener.handlers:
+            handler.close()
+        traffic_logger.handlers = []
+        traffic_listener = None
+
+def token_identity(token: Optional[str]) -> Optional[str]:
+    """Stable pseudonym for a bearer token; the token itself is never logged"""
+    if not token:
+        return None
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+class TrafficCaptureMiddleware:
+    """Record method, path, body, status, timing and caller of every API request.
+
+    Bodies are kept for writes up to TRAFFIC_CAPTURE_MAX_BODY_BYTES, except
+    on /api/auth/* where they may carry credentials. replay_traffic.py
+    re-issues the log against a running app.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        # Batch sub-requests are replayed as part of their captured batch
+        if scope["type"] != "http" or not scope["path"].startswith("/api/") or scope.get("batch_sub_request"):
+            await self.app(scope, receive, send)
+            return
+        
+        started_at = time.time()
+        started = time.perf_counter()
+        headers = dict(scope["headers"])
+        record = {
+            "ts": round(started_at, 6),
+            "method": scope["method"],
+            "path": scope["path"],
+            "query": scope["query_string"].decode("latin-1"),
+            "identity": token_identity(extract_token(headers.get(b"authorization", b"").decode("latin-1"))),
+            "body": None,
+            "status": None,
+        }
+        keep_body = scope["method"] in ("POST", "PUT", "PATCH", "DELETE") and not scope["path"].startswith("/api/auth/")
+        body = bytearray()
+        
+        async def capture_receive():
+            message = await receive()
+            if keep_body and message["type"] == "http.request" and len(body) <= TRAFFIC_CAPTURE_MAX_BODY_BYTES:
+                body.extend(message.get("body", b""))
+            return message
+        
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                record["status"] = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, capture_receive, capture_send)
+        finally:
+            record["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            if body and len(body) <= TRAFFIC_CAPTURE_MAX_BODY_BYTES:
+                record["body"] = body.decode("utf-8", "replace")
+            traffic_logger.info(json.dumps(record))
+
+
+# ============= Admission Control =============
+def classify_request(method: str, path: str) -> Tuple[str, int]:
+    """Route name and priority (0 = most urgent) of an API request"""
+    for route_method, pattern, route, priority in ADMISSION_ROUTES:
+        if method == route_method and pattern.match(path):
+            return route, priority
+    return "other", 1
+
+class AdmissionController:
+    """Caps in-flight requests, overall and per route, with a bounded queue.
+
+    Requests that cannot start right away wait in one FIFO per priority.
+    A freed slot goes to the most urgent waiter whose route is under its
+    limit. When the queue is full an urgent request displaces the newest
+    waiter of a lower priority; anything left waiting longer than
+    ADMISSION_QUEUE_TIMEOUT_SECONDS is shed.
+    """
+    
+    def __init__(self, max_concurrency: int, queue_size: int, route_limits: Dict[str, int]):
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self.route_limits = route_limits
+        self.in_flight = 0
+        self.route_in_flight: Dict[str, int] = {}
+        self.waiting: List[deque] = [deque() for _ in range(3)]
+        self.admitted: Dict[str, int] = {}
+        self.shed: Dict[str, int] = {}
+    
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self.waiting)
+    
+    def has_capacity(self, route: str) -> bool:
+        return (
+            self.in_flight < self.max_concurrency
+            and self.route_in_flight.get(route, 0) < self.route_limits.get(route, self.max_concurrency)
+        )
+    
+    def start(self, route: str):
+        self.in_flight += 1
+        self.route_in_flight[route] = self.route_in_flight.get(route, 0) + 1
+        self.admitted[route] = self.admitted.get(route, 0) + 1
+    
+    def reject(self, route: str) -> bool:
+        self.shed[route] = self.shed.get(route, 0) + 1
+        return False
+    
+    async def acquire(self, route: str, priority: int) -> bool:
+        """Wait for a slot; False means the request was shed"""
+        # Never overtake waiters of the same or a more urgent priority
+        if self.has_capacity(route) and not any(self.waiting[level] for level in range(priority + 1)):
+            self.start(route)
+            return True
+        
+        if self.queue_depth() >= self.queue_size:
+            for level in range(len(self.waiting) - 1, priority, -1):
+                if self.waiting[level]:
+                    _, displaced = self.waiting[level].pop()
+                    displaced.set_result(False)
+                    break
+            else:
+                return self.reject(route)
+        
+        entry = (route, asyncio.get_running_loop().create_future())
+        self.waiting[priority].append(entry)
+        future = entry[1]
+        try:
+            await asyncio.wait((future,), timeout=ADMISSION_QUEUE_TIMEOUT_SECONDS)
+        except asyncio.CancelledError:
+            # Client went away while waiting
+            if future.done() and future.result():
+                self.release(route)
+            elif not future.done():
+                self.waiting[priority].remove(entry)
+                future.cancel()
+            raise
+        
+        if not future.done():
+            self.waiting[priority].remove(entry)
+            future.cancel()
+            return self.reject(route)
+        if not future.result():
+            return self.reject(route)
+        return True
+    
+    def release(self, route: str):
+        self.in_flight -= 1
+        self.route_in_flight[route] -= 1
+        # Hand freed slots to the most urgent waiters that fit
+        for queue in self.waiting:
+            for entry in list(queue):
+                if self.in_flight >= self.max_concurrency:
+                    return
+                waiting_route, future = entry
+                if self.has_capacity(waiting_route):
+                    queue.remove(entry)
+                    self.start(waiting_route)
+                    future.set_result(True)
+    
+    def stats(self) -> Dict[str, Any]:
+        routes = set(self.admitted) | set(self.shed)
+        return {
+            "max_concurrency": self.max_concurrency,
+            "queue_size": self.queue_size,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth(),
+            "queue_depth_by_priority": [len(queue) for queue in self.waiting],
+            "routes": {
+                route: {
+                    "limit": self.route_limits.get(route, self.max_concurrency),
+                    "in_flight": self.route_in_flight.get(route, 0),
+                    "admitted": self.admitted.get(route, 0),
+                    "shed": self.shed.get(route, 0),
+                }
+                for route in sorted(routes)
+            },
+        }
+
+admission = AdmissionController(ADMISSION_MAX_CONCURRENCY, ADMISSION_QUEUE_SIZE, ADMISSION_ROUTE_LIMITS)
+
+class AdmissionControlMiddleware:
+    """Shed API requests with 503 + Retry-After once the admission queue is full"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/") or scope["path"] in ADMISSION_EXEMPT_PATHS | ADMISSION_DISPATCH_PATHS:
+            await self.app(scope, receive, send)
+            return
+        
+        route, priority = classify_request(scope["method"], scope["path"])
+        if not await admission.acquire(route, priority):
+            response = JSONResponse(
+                {"detail": "Server is busy, please try again shortly"},
+                status_code=503,
+                headers={"Retry-After": str(ADMISSION_RETRY_AFTER_SECONDS)}
+            )
+            await response(scope, receive, send)
+            return
+        
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release(route)
+
+
+# ============= Rate Limiting =============
+class MemoryRateLimitStore:
+    """Token buckets of this worker, least recently used dropped first"""
+    
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self.buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+    
+    async def take(self, key: str, capacity: float, rate: float) -> Tuple[bool, float]:
+        """Take one token; returns (allowed, tokens left)"""
+        now = time.monotonic()
+        tokens, updated = self.buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self.buckets[key] = (tokens, now)
+        self.buckets.move_to_end(key)
+        while len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        return allowed, tokens
+
+class MongoRateLimitStore:
+    """Token buckets shared by all workers in the rate_limits collection.
+
+    Refill and take happen in one pipeline update timed with $$NOW, so
+    workers with skewed clocks still agree. Buckets expire through a TTL
+    index once they would be full again. Falls back to the in-process
+    store while MongoDB is unavailable.
+    """
+    
+    def __init__(self, fallback: MemoryRateLimitStore):
+        self.fallback = fallback
+    
+    async def take(self, key: str, capacity: float, rate: float) -> Tuple[bool, float]:
+        elapsed = {"$divide": [{"$subtract": ["$$NOW", {"$ifNull": ["$updated_at", "$$NOW"]}]}, 1000]}
+        try:
+            bucket = await db.rate_limits.find_one_and_update(
+                {"_id": key},
+                [
+                    {"$set": {
+                        "tokens": {"$min": [capacity, {"$add": [{"$ifNull": ["$tokens", capacity]}, {"$multiply": [elapsed, rate]}]}]},
+                        "updated_at": "$$NOW",
+                    }},
+                    {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                    {"$set": {
+                        "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                        "expires_at": {"$add": ["$$NOW", int(capacity / rate * 1000)]},
+                    }},
+                ],
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except Exception:
+            logger.exception("Shared rate limit store unavailable, limiting per worker")
+            return await self.fallback.take(key, capacity, rate)
+        return bucket["allowed"], bucket["tokens"]
+
+memory_rate_limit_store = MemoryRateLimitStore(RATE_LIMIT_MAX_KEYS)
+rate_limit_store = MongoRateLimitStore(memory_rate_limit_store) if RATE_LIMIT_STORE == "mongo" else memory_rate_limit_store
+
+def client_ip(scope) -> str:
+    if RATE_LIMIT_TRUSTED_PROXIES > 0:
+        # Each proxy appends the address it received the request from
+        hops = [
+            hop.strip()
+            for name, value in scope["headers"] if name == b"x-forwarded-for"
+            for hop in value.decode("latin-1").split(",") if hop.strip()
+        ]
+        if len(hops) >= RATE_LIMIT_TRUSTED_PROXIES:
+            return hops[-RATE_LIMIT_TRUSTED_PROXIES]
+    return scope["client"][0] if scope.get("client") else "unknown"
+
+def rate_limit_subject(token: str) -> Optional[str]:
+    """The user behind a bearer token, without a database lookup.
+
+    Access tokens are verified and keyed by their subject, so refreshing
+    does not buy a fresh bucket. Session tokens resolve through the
+    authentication cache; until a token has been seen there it is keyed by
+    its hash.
+    """
+    if not token:
+        return None
+    if is_access_token(token):
+        claims = decode_access_token(token)
+        return claims["sub"] if claims else None
+    
+    identity = token_identity(token)
+    cached = stale_responses.get(f"auth:{identity}")
+    if cached is not None:
+        user, _ = cached[1]
+        return user.user_id
+    return f"token:{identity}"
+
+class RateLimitMiddleware:
+    """Per-user and per-IP token buckets per route, with RateLimit-* headers.
+
+    Callers are keyed by user (see rate_limit_subject; the check costs no
+    session lookup) and by client IP, whose bucket is
+    RATE_LIMIT_IP_MULTIPLIER times larger to allow for shared addresses.
+    The tighter of the two is reported.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/") or scope["path"] in ADMISSION_EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        
+        route, _ = classify_request(scope["method"], scope["path"])
+        capacity, rate = RATE_LIMITS.get(route, RATE_LIMITS["other"])
+        buckets = [(f"ip:{client_ip(scope)}:{route}", capacity * RATE_LIMIT_IP_MULTIPLIER, rate * RATE_LIMIT_IP_MULTIPLIER)]
+        subject = rate_limit_subject(extract_token(dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")))
+        if subject:
+            buckets.append((f"user:{subject}:{route}", capacity, rate))
+        
+        # The bucket closest to empty decides what the caller is told
+        allowed, limit, remaining, reset = True, 0.0, float("inf"), 0
+        for key, bucket_capacity, bucket_rate in buckets:
+            bucket_allowed, tokens = await rate_limit_store.take(key, bucket_capacity, bucket_rate)
+            if not bucket_allowed or (allowed and tokens < remaining):
+                limit, remaining = bucket_capacity, tokens
+                # Until the next token when limited, until full otherwise
+                reset = math.ceil(((1 - tokens) if not bucket_allowed else (bucket_capacity - tokens)) / bucket_rate)
+            allowed = allowed and bucket_allowed
+        headers = [
+            (b"ratelimit-limit", str(int(limit)).encode()),
+            (b"ratelimit-remaining", str(int(remaining)).encode()),
+            (b"ratelimit-reset", str(reset).encode()),
+        ]
+        
+        if not allowed:
+            response = JSONResponse(
+                {"detail": "Too many requests, please slow down"},
+                status_code=429,
+                headers={"Retry-After": str(max(reset, 1))}
+            )
+            response.raw_headers.extend(headers)
+            await response(scope, receive, send)
+            return
+        
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), *headers]}
+            await send(message)
+        
+        await self.app(scope, receive, send_with_headers)
+
+
+# ============= Logging =============
+# Request id, route and user of the request being handled, for log records
+request_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar("request_context", default=None)
+access_logger = logging.getLogger("squaredaddy.access")
+log_listener: Optional[QueueListener] = None
+log_queue_handler: Optional["DroppingQueueHandler"] = None
+
+class RequestContextFilter(logging.Filter):
+    """Copy the request context onto records.
+
+    Runs on the thread that emits the record, before it is queued: the
+    context lives in contextvars, which the writer thread cannot see.
+    """
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = request_context.get() or {}
+        record.request_id = context.get("request_id")
+        record.route = context.get("route")
+        record.user_id = context.get("user_id")
+        return True
+
+class DroppingQueueHandler(QueueHandler):
+    """Drops records instead of blocking when the writer thread falls behind"""
+    
+    dropped = 0
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message now but leave exc_info to the formatter
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+    
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request context and extra fields"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        line = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in ("request_id", "route", "user_id"):
+            if getattr(record, key, None):
+                line[key] = getattr(record, key)
+        line.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            line["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(line, default=str)
+
+def configure_logging():
+    """Route all records through a bounded queue to a writer thread"""
+    global log_listener, log_queue_handler
+    handler = logging.StreamHandler()
+    if LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    
+    queue_handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    queue_handler.addFilter(RequestContextFilter())
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+    # RequestLoggingMiddleware writes the access records
+    logging.getLogger("uvicorn.access").disabled = True
+    log_queue_handler = queue_handler
+    log_listener = QueueListener(queue_handler.queue, handler, respect_handler_level=True)
+    log_listener.start()
+
+async def log_drop_report_loop():
+    """Warn about records dropped since the last report"""
+    reported = 0
+    while True:
+        await asyncio.sleep(LOG_DROP_REPORT_SECONDS)
+        dropped = log_queue_handler.dropped
+        if dropped > reported:
+            logger.warning(f"Dropped {dropped - reported} log record(s) since the last report because the log queue was full", extra={"fields": {"dropped_total": dropped}})
+            reported = dropped
+
+def stop_logging():
+    """Write out queued records"""
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+
+class RequestLoggingMiddleware:
+    """Bind a request id to the request and write one sampled access record.
+
+    The id comes from X-Request-ID or is generated, and is echoed on the
+    response. Access records of a route are kept at its
+    ACCESS_LOG_SAMPLE_RATES rate (logged as sample_rate, for re-weighting);
+    server errors and requests slower than ACCESS_LOG_SLOW_MS are always
+    kept.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+        
+        request_id = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex
+        route, _ = classify_request(scope["method"], scope["path"])
+        context = {"request_id": request_id, "route": route, "user_id": None}
+        reset_token = request_context.set(context)
+        started = time.perf_counter()
+        status = None
+        
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-request-id", request_id.encode("latin-1"))]}
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            sample_rate = ACCESS_LOG_SAMPLE_RATES.get(route, 1.0)
+            if status is None or status >= 500 or duration_ms >= ACCESS_LOG_SLOW_MS or random.random() < sample_rate:
+                access_logger.info(
+                    f"{scope['method']} {scope['path']} {status}",
+                    extra={"fields": {
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status,
+                        "duration_ms": round(duration_ms, 3),
+                        "sample_rate": sample_rate,
+                    }}
+                )
+            request_context.reset(reset_token)
 
 
 # ============= Include Router =============
 app.include_router(api_router)
 
+# Added innermost first: CORS wraps capture, which also records limited and
+# shed requests; rate limits are checked before a request is queued
+if ADMISSION_MAX_CONCURRENCY > 0:
+    app.add_middleware(AdmissionControlMiddleware)
+
+if RATE_LIMIT_STORE != "off":
+    app.add_middleware(RateLimitMiddleware)
+
+if TRAFFIC_CAPTURE_PATH:
+    app.add_middleware(TrafficCaptureMiddleware)
+
+if secondary_reads_enabled:
+    app.add_middleware(CausalTokenMiddleware)
+
+app.add_middleware(RequestLoggingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Change-Seq", CAUSAL_TOKEN_HEADER],
 )
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+
+# ============= Background Tasks =============
+background_tasks: List[asyncio.Task] = []
+
+async def ensure_indexes():
+    """Create the indexes the request paths and background tasks rely on"""
+    await db.users.create_index("user_id")
+    await db.users.create_index("email")
+    await db.user_sessions.create_index("session_token")
+    await db.user_sessions.create_index("sid", sparse=True)
+    await db.revoked_tokens.create_index("sid", unique=True)
+    await db.revoked_tokens.create_index("expires_at", expireAfterSeconds=0)
+    await db.leaderboards.create_index([("scope", 1), ("user_id", 1)], unique=True)
+    await db.games.create_index("game_id")
+    await db.games.create_index("created_at")
+    # Exports stream every exported collection and archive in created_at order
+    for collection in ("game_entries", "payouts", *ARCHIVE_COLLECTIONS.values()):
+        await db[collection].create_index("created_at")
+    await db.games.create_index([("creator_id", 1), ("created_at", 1)])
+    # Quick-join: equality, then the created_at sort, then the fee range
+    await db.games.create_index([("status", 1), ("event_name", 1), ("created_at", 1), ("entry_fee", 1)])
+    await db.games.create_index([("status", 1), ("created_at", 1), ("entry_fee", 1)])
+    await db.game_entries.create_index([("game_id", 1), ("user_id", 1)])
+    await db.game_entries.create_index("user_id")
+    await db.game_entries.create_index("entry_id")
+    await db.payouts.create_index("game_id")
+    await db.payouts.create_index("user_id")
+    await db.payouts.create_index("payout_id", unique=True)
+    await db.jobs.create_index([("status", 1), ("run_at", 1)])
+    await db.jobs.create_index([("status", 1), ("locked_until", 1)])
+    await db.jobs.create_index("claim", sparse=True)
+    await db.jobs.create_index([("kind", 1), ("status", 1)])
+    await db.jobs.create_index("payload.payout_id", sparse=True)
+    await db.dead_jobs.create_index("job_id", unique=True)
+    await db.dead_jobs.create_index("failed_at")
+    await db.dead_jobs.create_index("payload.payout_id", sparse=True)
+    await db.games.create_index("pending_settlements.settled_at", sparse=True)
+    await db.square_holds.create_index([("game_id", 1), ("square_number", 1)], unique=True)
+    await db.rate_limits.create_index("expires_at", expireAfterSeconds=0)
+    await db.games.create_index("change_seq", sparse=True)
+    await db.game_tombstones.create_index("game_id", unique=True)
+    await db.game_tombstones.create_index("change_seq")
+    await db.game_tombstones.create_index("deleted_at", expireAfterSeconds=int(GAME_TOMBSTONE_RETENTION_DAYS * 86400))
+    await db.square_holds.create_index("expires_at", expireAfterSeconds=SQUARE_HOLD_RETENTION_SECONDS)
+    await db.games.create_index([("status", 1), ("completed_at", 1)])
+    await db.games_archive.create_index("game_id", unique=True)
+    await db.games_archive.create_index("creator_id")
+    for collection, key in (("game_entries_archive", "entry_id"), ("payouts_archive", "payout_id")):
+        await db[collection].create_index(key, unique=True)
+        await db[collection].create_index("game_id")
+        await db[collection].create_index("user_id")
+
+async def backfill_open_squares():
+    """Give pending games created before quick-join their open_squares list"""
+    await db.games.update_many(
+        {"status": "pending", "open_squares": {"$exists": False}},
+        [{"$set": {
+            "open_squares": {"$filter": {
+                "input": {"$range": [0, 10]},
+                "as": "i",
+                "cond": {"$eq": [{"$arrayElemAt": ["$squares", "$$i"]}, None]}
+            }},
+            "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+        }}]
+    )
+
+async def ensure_cache_invalidation_feed():
+    """Create the capped collection workers tail for game cache invalidations"""
+    try:
+        await db.create_collection("cache_invalidations", capped=True, size=CACHE_INVALIDATION_FEED_BYTES)
+    except CollectionInvalid:
+        return
+    # A tailable cursor on an empty collection dies immediately
+    await db.cache_invalidations.insert_one({"game_id": None, "worker_id": WORKER_ID})
+
+async def warm_game_cache():
+    """Load the newest pending and active games, the ones live traffic touches"""
+    games = await db.games.find(
+        {"status": {"$in": ["pending", "active"]}},
+        {"_id": 0}
+    ).sort("created_at", -1).limit(GAME_CACHE_MAX_SIZE).to_list(GAME_CACHE_MAX_SIZE)
+    # Oldest first, so the newest are the last to be evicted
+    for game in reversed(games):
+        cache_game(game)
+
+async def cache_invalidation_loop():
+    """Evict games changed by other workers as their announcements arrive"""
+    while True:
+        try:
+            latest = await db.cache_invalidations.find_one({}, sort=[("$natural", -1)])
+            query = {"_id": {"$gt": latest["_id"]}} if latest else {}
+            cursor = db.cache_invalidations.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+            while cursor.alive:
+                async for change in cursor:
+                    if change["worker_id"] != WORKER_ID and change["game_id"]:
+                        evict_game(change["game_id"])
+                        invalidate_games_list()
+                await asyncio.sleep(CACHE_INVALIDATION_POLL_SECONDS)
+        except Exception:
+            logger.exception("Game cache invalidation feed failed")
+        
+        # Announcements may have been missed while the feed was down
+        game_cache.clear()
+        invalidate_games_list()
+        await asyncio.sleep(CACHE_INVALIDATION_POLL_SECONDS)
+
+async def revocation_sync_loop():
+    """Pick up logouts handled by other workers"""
+    while True:
+        await asyncio.sleep(REVOCATION_SYNC_INTERVAL_SECONDS)
+        try:
+            await sync_revoked_session_ids()
+        except Exception:
+            logger.exception("Failed to sync revoked sessions")
+
+async def square_hold_sweep_loop():
+    """Return squares from expired holds to their games"""
+    while True:
+        await asyncio.sleep(SQUARE_HOLD_SWEEP_SECONDS)
+        try:
+            # Keep going while there is a backlog
+            while await sweep_expired_holds() == SQUARE_HOLD_SWEEP_BATCH:
+                pass
+        except Exception:
+            logger.exception("Failed to release expired square holds")
+
+async def archive_loop():
+    """Move long completed games to the archive, a throttled batch at a time"""
+    while True:
+        try:
+            cutoff = datetime.now(timezone.utc) - timedelta(days=ARCHIVE_AFTER_DAYS)
+            while await archive_completed_games(cutoff) == ARCHIVE_BATCH_SIZE:
+                await asyncio.sleep(ARCHIVE_BATCH_PAUSE_SECONDS)
+        except Exception:
+            logger.exception("Failed to archive completed games")
+        await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+async def job_worker_loop():
+    """Process queued jobs, waiting up to JOB_POLL_SECONDS when the queue is empty"""
+    while True:
+        try:
+            claimed = await run_jobs_once()
+        except Exception:
+            logger.exception("Job worker failed")
+            claimed = 0
+        if claimed < JOB_BATCH_SIZE:
+            job_wakeup.clear()
+            try:
+                await asyncio.wait_for(job_wakeup.wait(), JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+async def settlement_reconcile_loop():
+    """Queue settlements whose job was lost between recording and queuing"""
+    while True:
+        await asyncio.sleep(SETTLEMENT_RECONCILE_SECONDS)
+        try:
+            await reconcile_settlements()
+        except Exception:
+            logger.exception("Failed to reconcile pending settlements")
+
+async def session_flush_loop():
+    """Periodically persist coalesced session activity"""
+    while True:
+        await asyncio.sleep(SESSION_FLUSH_INTERVAL_SECONDS)
+        try:
+            await flush_session_touches()
+        except Exception:
+            logger.exception("Failed to flush session activity")
+
+@app.on_event("startup")
+async def start_background_tasks():
+    # Stopped by an earlier shutdown in this process
+    if log_listener is None:
+        configure_logging()
+    if TRAFFIC_CAPTURE_PATH:
+        start_traffic_capture()
+    await ensure_indexes()
+    await ensure_cache_invalidation_feed()
+    await backfill_open_squares()
+    await warm_game_cache()
+    if await load_odds_table() is None:
+        logger.warning(f"No score dataset at {SCORE_DATASET_PATH}; game odds are not available")
+    await load_leaderboard("global")
+    background_tasks.append(asyncio.create_task(cache_invalidation_loop()))
+    background_tasks.append(asyncio.create_task(session_flush_loop()))
+    background_tasks.append(asyncio.create_task(square_hold_sweep_loop()))
+    background_tasks.append(asyncio.create_task(log_drop_report_loop()))
+    for _ in range(JOB_WORKERS):
+        background_tasks.append(asyncio.create_task(job_worker_loop()))
+    background_tasks.append(asyncio.create_task(settlement_reconcile_loop()))
+    if ARCHIVE_AFTER_DAYS > 0:
+        background_tasks.append(asyncio.create_task(archive_loop()))
+    if SCORE_FEED:
+        background_tasks.append(asyncio.create_task(score_feed_loop(make_score_feed(SCORE_FEED))))
+    if AUTH_TOKEN_MODE == "jwt":
+        await sync_revoked_session_ids()
+        background_tasks.append(asyncio.create_task(revocation_sync_loop()))
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    # The app may be started again in this process (tests do)
+    background_tasks.clear()
+    try:
+        await flush_session_touches()
+    except Exception:
+        logger.exception("Failed to flush session activity")
+    stop_traffic_capture()
     client.close()
+    stop_logging()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Export games, game entries and payouts for accounting and offline analysis.
+
+Documents are streamed from MongoDB in cursor batches, so memory use stays
+flat no matter how large the collections are. NDJSON and CSV mirror the
+/api/admin/export endpoint; Parquet is written one row group per batch.
+
+Usage:
+  python export_data.py games --format csv --output games.csv
+  python export_data.py payouts --format parquet --output payouts.parquet --start 2026-01-01
+  python export_data.py game_entries --status completed > entries.ndjson
+  python export_data.py games --archived --format csv --output old_games.csv
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+import pymongo
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from exports import EXPORT_COLUMNS as COLUMNS, csv_value, export_cursor, json_default  # noqa: E402
+
+# Nested fields are stored as JSON strings in Parquet
+NESTED_COLUMNS = {"squares", "random_numbers", "quarter_scores", "winners"}
+
+
+def parse_date(value):
+    """Parse an ISO date/datetime argument as UTC"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def batches(cursor, batch_size):
+    """Group cursor documents into lists of at most batch_size"""
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_ndjson(cursor, collection, out, batch_size):
+    rows = 0
+    for batch in batches(cursor, batch_size):
+        out.write("".join(json.dumps(doc, default=json_default) + "\n" for doc in batch))
+        rows += len(batch)
+    return rows
+
+
+def write_csv(cursor, collection, out, batch_size):
+    columns = COLUMNS[collection]
+    writer = csv.writer(out)
+    writer.writerow(columns)
+    rows = 0
+    for batch in batches(cursor, batch_size):
+        for doc in batch:
+            writer.writerow([csv_value(doc.get(column)) for column in columns])
+        rows += len(batch)
+    return rows
+
+
+def write_parquet(cursor, collection, path, batch_size):
+    """Write one Parquet row group per cursor batch with a fixed schema"""
+    import numpy as np
+    import pandas as pd
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        sys.exit("❌ Parquet export requires pyarrow (pip install pyarrow)")
+
+    columns = COLUMNS[collection]
+    writer = None
+    rows = 0
+    try:
+        for batch in batches(cursor, batch_size):
+            frame = pd.DataFrame.from_records(batch, columns=columns)
+            for column in NESTED_COLUMNS.intersection(columns):
+                frame[column] = [json.dumps(value, default=json_default) for value in frame[column]]
+            frame["created_at"] = pd.to_datetime(frame["created_at"], utc=True)
+            for column in ("entry_fee", "paid_amount", "amount"):
+                if column in frame:
+                    frame[column] = frame[column].astype(np.float64)
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            else:
+                table = table.cast(writer.schema)
+            writer.write_table(table)
+            rows += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export SquareDaddy collections")
+    parser.add_argument("collection", choices=sorted(COLUMNS))
+    parser.add_argument("--format", choices=["ndjson", "csv", "parquet"], default="ndjson")
+    parser.add_argument("--output", help="Output file (defaults to stdout for ndjson/csv)")
+    parser.add_argument("--start", type=parse_date, help="Include documents created at or after this date")
+    parser.add_argument("--end", type=parse_date, help="Include documents created before this date")
+    parser.add_argument("--status", help="Game status (pending, active, completed)")
+    parser.add_argument("--archived", action="store_true", help="Export the archive of long completed games instead")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default=os.environ.get("DB_NAME", "test_database"))
+    args = parser.parse_args()
+
+    if args.format == "parquet" and not args.output:
+        parser.error("--output is required for parquet")
+
+    client = pymongo.MongoClient(args.mongo_url)
+    cursor = export_cursor(client[args.db], args.collection, args.start, args.end, args.status, args.batch_size, args.archived)
+
+    if args.format == "parquet":
+        rows = write_parquet(cursor, args.collection, args.output, args.batch_size)
+    else:
+        write = write_ndjson if args.format == "ndjson" else write_csv
+        if args.output:
+            with open(args.output, "w", newline="") as out:
+                rows = write(cursor, args.collection, out, args.batch_size)
+        else:
+            rows = write(cursor, args.collection, sys.stdout, args.batch_size)
+
+    print(f"✅ Exported {rows} {args.collection} document(s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
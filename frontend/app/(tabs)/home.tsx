@@ -1,6 +1,6 @@
-import React, { useState, useCallback } from 'react';
+import React, { useState, useCallback, useRef } from 'react';
 import { View, Text, StyleSheet, FlatList, TouchableOpacity, RefreshControl, ActivityIndicator } from 'react-native';
-import { useAuth } from '../../contexts/AuthContext';
+import { useAuth, GAMES_LIST_FIELDS, GAMES_LIST_PATH } from '../../contexts/AuthContext';
 import { useRouter, useFocusEffect } from 'expo-router';
 import { Ionicons } from '@expo/vector-icons';
 import { SafeAreaView } from 'react-native-safe-area-context';
@@ -13,30 +13,40 @@ interface Game {
   game_id: string;
   creator_id: string;
   event_name: string;
+  name?: string;
   entry_fee: number;
   status: string;
-  squares: any[];
   created_at: string;
+  filled_squares: number;
   user_entries?: any[];
 }
 
 export default function HomeScreen() {
-  const { user } = useAuth();
+  const { user, takePrefetched } = useAuth();
   const router = useRouter();
   const [games, setGames] = useState<Game[]>([]);
   const [loading, setLoading] = useState(true);
   const [refreshing, setRefreshing] = useState(false);
+  // Change sequence number the list is current as of, for delta syncs
+  const changeSeq = useRef<number | null>(null);
 
   const fetchGames = async () => {
     try {
+      const prefetched = takePrefetched(GAMES_LIST_PATH);
+      if (prefetched) {
+        setGames(prefetched.body);
+        changeSeq.current = Number(prefetched.headers['x-change-seq']) || null;
+        return;
+      }
       const token = await AsyncStorage.getItem('session_token');
-      const response = await fetch(`${BACKEND_URL}/api/games`, {
+      const response = await fetch(`${BACKEND_URL}${GAMES_LIST_PATH}`, {
         headers: {
           'Authorization': `Bearer ${token}`
         }
       });
       if (response.ok) {
         const data = await response.json();
+        changeSeq.current = Number(response.headers.get('X-Change-Seq')) || null;
         setGames(data);
       }
     } catch (error) {
@@ -47,15 +57,58 @@ export default function HomeScreen() {
     }
   };
 
+  // Fetch only the games changed since the last load and merge them in
+  const syncGames = async () => {
+    if (changeSeq.current === null) {
+      await fetchGames();
+      return;
+    }
+    try {
+      const token = await AsyncStorage.getItem('session_token');
+      const response = await fetch(
+        `${BACKEND_URL}/api/games/changes?since=${changeSeq.current}&fields=${GAMES_LIST_FIELDS}`,
+        {
+          headers: {
+            'Authorization': `Bearer ${token}`
+          }
+        }
+      );
+      if (!response.ok) {
+        return;
+      }
+      const changes = await response.json();
+      if (changes.reset) {
+        await fetchGames();
+        return;
+      }
+      changeSeq.current = changes.seq;
+      setGames(current => {
+        const gone = new Set<string>(changes.deleted);
+        const byId = new Map<string, Game>();
+        current.forEach(game => byId.set(game.game_id, game));
+        changes.games.forEach((game: Game) => byId.set(game.game_id, game));
+        return Array.from(byId.values())
+          .filter(game => !gone.has(game.game_id))
+          .sort((a, b) => new Date(b.created_at).getTime() - new Date(a.created_at).getTime())
+          .slice(0, 100);
+      });
+    } catch (error) {
+      console.error('Error syncing games:', error);
+    } finally {
+      setLoading(false);
+      setRefreshing(false);
+    }
+  };
+
   useFocusEffect(
     useCallback(() => {
-      fetchGames();
+      syncGames();
     }, [])
   );
 
   const onRefresh = () => {
     setRefreshing(true);
-    fetchGames();
+    syncGames();
   };
 
   const getStatusColor = (status: string) => {
@@ -71,12 +124,8 @@ export default function HomeScreen() {
     }
   };
 
-  const getFilledSquares = (squares: any[]) => {
-    return squares.filter(s => s !== null).length;
-  };
-
   const renderGame = ({ item }: { item: Game }) => {
-    const filledSquares = getFilledSquares(item.squares);
+    const filledSquares = item.filled_squares;
     const isUserInGame = item.user_entries && item.user_entries.length > 0;
 
     return (
@@ -85,7 +134,7 @@ export default function HomeScreen() {
         onPress={() => router.push(`/game/${item.game_id}`)}
       >
         <View style={styles.gameHeader}>
-          <Text style={styles.eventName}>{item.event_name}</Text>
+          <Text style={styles.eventName}>{item.name ? `${item.event_name} · ${item.name}` : item.event_name}</Text>
           <View style={[styles.statusBadge, { backgroundColor: getStatusColor(item.status) }]}>
             <Text style={styles.statusText}>{item.status.toUpperCase()}</Text>
           </View>
@@ -135,7 +184,7 @@ export default function HomeScreen() {
     <SafeAreaView style={styles.container} edges={['top']}>
       <View style={styles.header}>
         <Text style={styles.title}>Squares</Text>
-        <TouchableOpacity onPress={fetchGames}>
+        <TouchableOpacity onPress={syncGames}>
           <Ionicons name="refresh" size={24} color="#FFF" />
         </TouchableOpacity>
       </View>
@@ -18,13 +18,18 @@ interface ProfileData {
 }
 
 export default function ProfileScreen() {
-  const { user, logout, refreshUser } = useAuth();
+  const { user, logout, refreshUser, takePrefetched } = useAuth();
   const [profileData, setProfileData] = useState<ProfileData | null>(null);
   const [loading, setLoading] = useState(true);
   const [refreshing, setRefreshing] = useState(false);
 
   const fetchProfile = async () => {
     try {
+      const prefetched = takePrefetched('/api/profile');
+      if (prefetched) {
+        setProfileData(prefetched.body);
+        return;
+      }
       const token = await AsyncStorage.getItem('session_token');
       const response = await fetch(`${BACKEND_URL}/api/profile`, {
         headers: {
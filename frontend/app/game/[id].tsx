@@ -11,6 +11,9 @@ import Toast from 'react-native-toast-message';
 
 const BACKEND_URL = Constants.expoConfig?.extra?.EXPO_PUBLIC_BACKEND_URL || process.env.EXPO_PUBLIC_BACKEND_URL;
 
+// The API may return UTC datetimes without an offset
+const parseUtc = (value: string) => new Date(/(Z|[+-]\d{2}:\d{2})$/.test(value) ? value : `${value}Z`);
+
 export default function GameDetailScreen() {
   const { id } = useLocalSearchParams();
   const router = useRouter();
@@ -18,6 +21,7 @@ export default function GameDetailScreen() {
   const [game, setGame] = useState<any>(null);
   const [loading, setLoading] = useState(true);
   const [joining, setJoining] = useState(false);
+  const [hold, setHold] = useState<any>(null);
   const [leaving, setLeaving] = useState(false);
   const [deleting, setDeleting] = useState(false);
 
@@ -25,6 +29,16 @@ export default function GameDetailScreen() {
     fetchGame();
   }, [id, user]);
 
+  // Drop the hold once the server has released it
+  useEffect(() => {
+    if (!hold) return;
+    const timeout = setTimeout(() => {
+      setHold(null);
+      fetchGame();
+    }, parseUtc(hold.expires_at).getTime() - Date.now());
+    return () => clearTimeout(timeout);
+  }, [hold]);
+
   const fetchGame = async () => {
     try {
       const token = await AsyncStorage.getItem('session_token');
@@ -69,6 +83,81 @@ export default function GameDetailScreen() {
     }
   };
 
+  const handleReserveSquare = async (squareNumber: number) => {
+    if (game.status !== 'pending') {
+      Toast.show({
+        type: 'error',
+        text1: 'Error',
+        text2: 'This game is no longer accepting new players',
+        position: 'top',
+      });
+      return;
+    }
+
+    if (game.squares[squareNumber] !== null) {
+      Toast.show({
+        type: 'error',
+        text1: 'Error',
+        text2: 'This square is already taken',
+        position: 'top',
+      });
+      return;
+    }
+
+    setJoining(true);
+    try {
+      const token = await AsyncStorage.getItem('session_token');
+      const response = await fetch(`${BACKEND_URL}/api/games/${id}/reserve`, {
+        method: 'POST',
+        headers: {
+          'Authorization': `Bearer ${token}`,
+          'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({ square_number: squareNumber })
+      });
+
+      if (response.ok) {
+        setHold(await response.json());
+      } else {
+        const error = await response.json();
+        Toast.show({
+          type: 'error',
+          text1: 'Error',
+          text2: error.detail || 'Failed to reserve square',
+          position: 'top',
+        });
+        await fetchGame();
+      }
+    } catch (error) {
+      console.error('Error reserving square:', error);
+      Toast.show({
+        type: 'error',
+        text1: 'Error',
+        text2: 'Failed to reserve square',
+        position: 'top',
+      });
+    } finally {
+      setJoining(false);
+    }
+  };
+
+  const handleReleaseSquare = async () => {
+    const squareNumber = hold.square_number;
+    setHold(null);
+    try {
+      const token = await AsyncStorage.getItem('session_token');
+      await fetch(`${BACKEND_URL}/api/games/${id}/reserve/${squareNumber}`, {
+        method: 'DELETE',
+        headers: {
+          'Authorization': `Bearer ${token}`
+        }
+      });
+    } catch (error) {
+      console.error('Error releasing square:', error);
+    }
+    await fetchGame();
+  };
+
   const handleJoinSquare = async (squareNumber: number) => {
     if (game.status !== 'pending') {
       Toast.show({
@@ -104,6 +193,7 @@ export default function GameDetailScreen() {
 
       if (response.ok) {
         const result = await response.json();
+        setHold(null);
         Toast.show({
           type: 'success',
           text1: 'Success!',
@@ -344,12 +434,16 @@ export default function GameDetailScreen() {
           <View style={styles.gridContainer}>
             {game.squares.map((square: any, index: number) => {
               const isOwnedByUser = square?.user_id === user?.user_id;
+              const heldBy = hold?.square_number === index ? user?.user_id : game.held_squares?.find((h: any) => h.square_number === index)?.user_id;
+              const isHeldByOther = square === null && heldBy && heldBy !== user?.user_id;
+              const isHeldByUser = square === null && heldBy === user?.user_id;
+              const canPick = square === null && canJoinMore && !heldBy && !hold;
               return (
                 <TouchableOpacity
                   key={index}
-                  style={[styles.square, square !== null && { backgroundColor: getUserColor(square.user_id) }, square === null && canJoinMore && styles.emptySquare, isOwnedByUser && styles.ownedSquare]}
-                  onPress={() => square === null && canJoinMore && handleJoinSquare(index)}
-                  disabled={square !== null || !canJoinMore || joining}
+                  style={[styles.square, square !== null && { backgroundColor: getUserColor(square.user_id) }, canPick && styles.emptySquare, isOwnedByUser && styles.ownedSquare, isHeldByUser && styles.heldSquare]}
+                  onPress={() => canPick && handleReserveSquare(index)}
+                  disabled={!canPick || joining}
                 >
                   {isOwnedByUser && (
                     <View style={styles.youBadge}>
@@ -369,7 +463,11 @@ export default function GameDetailScreen() {
                     <Text style={styles.squareUser} numberOfLines={2}>
                       {square.user_name.length > 12 ? square.user_name.substring(0, 12) + '...' : square.user_name}
                     </Text>
-                  ) : canJoinMore ? (
+                  ) : isHeldByOther ? (
+                    <Text style={styles.heldText}>Held</Text>
+                  ) : isHeldByUser ? (
+                    <Text style={styles.clickToPickText}>Yours?</Text>
+                  ) : canPick ? (
                     <Text style={styles.clickToPickText}>Click to Pick</Text>
                   ) : null}
                 </TouchableOpacity>
@@ -378,6 +476,20 @@ export default function GameDetailScreen() {
           </View>
         </View>
 
+        {hold && (
+          <View style={styles.card}>
+            <Text style={styles.cardTitle}>Square {hold.square_number} is held for you</Text>
+            <View style={styles.holdButtons}>
+              <TouchableOpacity style={[styles.confirmButton, joining && styles.leaveButtonDisabled]} onPress={() => handleJoinSquare(hold.square_number)} disabled={joining}>
+                <Text style={styles.leaveButtonText}>{joining ? 'Joining...' : `Confirm ($${game.entry_fee})`}</Text>
+              </TouchableOpacity>
+              <TouchableOpacity style={styles.cancelHoldButton} onPress={handleReleaseSquare} disabled={joining}>
+                <Text style={styles.leaveButtonText}>Cancel</Text>
+              </TouchableOpacity>
+            </View>
+          </View>
+        )}
+
         {(game.status === 'active' || game.status === 'completed') && (
           <View style={styles.card}>
             <Text style={styles.cardTitle}>Scores & Winners</Text>
@@ -474,6 +586,11 @@ const styles = StyleSheet.create({
   squareUser: { fontSize: 10, color: '#FFF', textAlign: 'center', fontWeight: '600' },
   squareUserActive: { fontSize: 8, color: '#FFF', textAlign: 'center', fontWeight: '600', marginTop: 2 },
   clickToPickText: { fontSize: 9, color: '#4CAF50', textAlign: 'center', fontWeight: '600', paddingHorizontal: 2 },
+  heldSquare: { borderColor: '#4CAF50', borderWidth: 3 },
+  heldText: { fontSize: 9, color: '#888', textAlign: 'center', fontWeight: '600', fontStyle: 'italic' },
+  holdButtons: { flexDirection: 'row', justifyContent: 'space-between' },
+  confirmButton: { flex: 1, backgroundColor: '#4CAF50', paddingVertical: 14, borderRadius: 8, alignItems: 'center', marginRight: 8 },
+  cancelHoldButton: { flex: 1, backgroundColor: '#888', paddingVertical: 14, borderRadius: 8, alignItems: 'center' },
   quarterItem: { padding: 12, backgroundColor: '#0f3460', borderRadius: 8, marginBottom: 8 },
   quarterHeader: { flexDirection: 'row', justifyContent: 'space-between', alignItems: 'center', marginBottom: 8 },
   quarterLabel: { fontSize: 16, fontWeight: '600', color: '#FFF' },
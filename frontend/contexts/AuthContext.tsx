@@ -1,4 +1,4 @@
-import React, { createContext, useState, useContext, useEffect, ReactNode } from 'react';
+import React, { createContext, useState, useContext, useEffect, useRef, ReactNode } from 'react';
 import AsyncStorage from '@react-native-async-storage/async-storage';
 import * as WebBrowser from 'expo-web-browser';
 import * as Linking from 'expo-linking';
@@ -23,16 +23,31 @@ interface AuthContextType {
   login: () => Promise<void>;
   logout: () => Promise<void>;
   refreshUser: () => Promise<void>;
+  takePrefetched: (path: string) => PrefetchedResponse | undefined;
 }
 
+// A launch response kept for the screen that would otherwise fetch it
+export interface PrefetchedResponse {
+  body: any;
+  headers: Record<string, string>;
+}
+
+// Only the fields the home tab renders
+export const GAMES_LIST_FIELDS = 'creator_id,event_name,name,entry_fee,status,created_at,filled_squares,user_entries';
+export const GAMES_LIST_PATH = `/api/games?fields=${GAMES_LIST_FIELDS}`;
+
+// Fetched together with the user at launch, in a single /api/batch round trip
+const LAUNCH_PATHS = [GAMES_LIST_PATH, '/api/profile'];
+
 const AuthContext = createContext<AuthContextType | undefined>(undefined);
 
 export const AuthProvider = ({ children }: { children: ReactNode }) => {
   const [user, setUser] = useState<User | null>(null);
   const [loading, setLoading] = useState(true);
+  const prefetched = useRef<Record<string, PrefetchedResponse>>({});
 
   useEffect(() => {
-    checkAuth();
+    checkAuth(true);
     
     // Handle deep links (cold start)
     Linking.getInitialURL().then(url => {
@@ -42,19 +57,60 @@ export const AuthProvider = ({ children }: { children: ReactNode }) => {
     });
   }, []);
 
-  const checkAuth = async () => {
+  // The user, and the status of the batch if it failed or else of its /api/auth/me
+  const fetchLaunchData = async (token: string): Promise<{ status: number; userData: User | null }> => {
+    const response = await fetch(`${BACKEND_URL}/api/batch`, {
+      method: 'POST',
+      headers: {
+        'Authorization': `Bearer ${token}`,
+        'Content-Type': 'application/json'
+      },
+      body: JSON.stringify({
+        requests: ['/api/auth/me', ...LAUNCH_PATHS].map(path => ({ id: path, method: 'GET', path }))
+      })
+    });
+    if (!response.ok) {
+      return { status: response.status, userData: null };
+    }
+    const { responses } = await response.json();
+    let status = 0;
+    let userData = null;
+    for (const result of responses) {
+      if (result.id === '/api/auth/me') {
+        status = result.status;
+        if (status === 200) {
+          userData = result.body;
+        }
+      } else if (result.status === 200) {
+        prefetched.current[result.id] = { body: result.body, headers: result.headers || {} };
+      }
+    }
+    return { status, userData };
+  };
+
+  const checkAuth = async (launch: boolean = false) => {
     try {
       const token = await AsyncStorage.getItem('session_token');
       if (token) {
-        const response = await fetch(`${BACKEND_URL}/api/auth/me`, {
-          headers: {
-            'Authorization': `Bearer ${token}`
+        let status = 0;
+        let userData = null;
+        if (launch) {
+          ({ status, userData } = await fetchLaunchData(token));
+        } else {
+          const response = await fetch(`${BACKEND_URL}/api/auth/me`, {
+            headers: {
+              'Authorization': `Bearer ${token}`
+            }
+          });
+          status = response.status;
+          if (response.ok) {
+            userData = await response.json();
           }
-        });
-        if (response.ok) {
-          const userData = await response.json();
+        }
+        if (userData) {
           setUser(userData);
-        } else {
+        } else if (status === 401) {
+          // Only a rejected session logs out; a shed or rate-limited request does not
           await AsyncStorage.removeItem('session_token');
         }
       }
@@ -69,6 +125,13 @@ export const AuthProvider = ({ children }: { children: ReactNode }) => {
     await checkAuth();
   };
 
+  // Launch data for a screen's first load; later loads fetch fresh data
+  const takePrefetched = (path: string) => {
+    const data = prefetched.current[path];
+    delete prefetched.current[path];
+    return data;
+  };
+
   const handleRedirect = async (url: string) => {
     try {
       // Parse session_id from URL (support both # and ? formats)
@@ -91,7 +154,7 @@ export const AuthProvider = ({ children }: { children: ReactNode }) => {
         if (response.ok) {
           const data = await response.json();
           await AsyncStorage.setItem('session_token', data.session_token);
-          await checkAuth();
+          await checkAuth(true);
         }
       }
     } catch (error) {
@@ -139,7 +202,7 @@ export const AuthProvider = ({ children }: { children: ReactNode }) => {
   };
 
   return (
-    <AuthContext.Provider value={{ user, loading, login, logout, refreshUser }}>
+    <AuthContext.Provider value={{ user, loading, login, logout, refreshUser, takePrefetched }}>
       {children}
     </AuthContext.Provider>
   );
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Recompute all leaderboards from payouts and settled entries.
+
+Leaderboards are normally maintained incrementally as scores are entered.
+Run this after restoring data, changing the stats or fixing a payout by hand.
+The session token must belong to a user listed in ADMIN_USER_IDS.
+
+Usage:
+  python rebuild_leaderboards.py ADMIN_SESSION_TOKEN [BACKEND_URL]
+"""
+
+import sys
+
+import requests
+
+BACKEND_URL = "http://localhost:8001/api"
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("❌ Error: Admin session token required!")
+        print("\nUsage:")
+        print("  python rebuild_leaderboards.py ADMIN_SESSION_TOKEN [BACKEND_URL]")
+        return
+
+    token = sys.argv[1]
+    backend_url = sys.argv[2] if len(sys.argv) > 2 else BACKEND_URL
+
+    print("🏆 Rebuilding leaderboards...")
+    response = requests.post(
+        f"{backend_url}/admin/leaderboards/rebuild",
+        headers={"Authorization": f"Bearer {token}"},
+        timeout=600
+    )
+
+    if response.status_code == 200:
+        print(f"✅ Rebuilt {response.json()['rows']} leaderboard rows")
+    else:
+        print(f"❌ Failed to rebuild leaderboards: {response.status_code} - {response.text}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
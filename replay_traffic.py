@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Replay API traffic captured by the backend against a running app.
+
+Start the backend with TRAFFIC_CAPTURE_PATH=/path/to/traffic.log to record
+requests (one JSON line each, tokens hashed). This tool re-issues them with
+the original spacing, sped up N times, and compares latencies per route
+with the ones recorded.
+
+Captured callers are identified by token hash only, so each one is mapped
+to a token that is valid on the target: either explicitly with --token-map
+(JSON object of hash -> token) or round-robin from --tokens (one token per
+line, e.g. the --tokens-out file of seed_data.py). Replay against a copy of
+the data the traffic was captured on, otherwise ids in paths will not
+resolve and the status mismatches are reported.
+
+Usage:
+  python replay_traffic.py traffic.log --tokens tokens.txt
+  python replay_traffic.py traffic.log --speed 4 --target http://localhost:8001
+  python replay_traffic.py traffic.log --speed 0 --concurrency 500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+
+import httpx
+import numpy as np
+
+BACKEND_URL = "http://localhost:8001"
+
+# Ids in paths are collapsed so requests group by route
+ID_PATTERN = re.compile(r"/(game|entry|payout|hold)_[0-9a-f]+")
+
+
+def capture_files(path):
+    """The log and its rotated backups, oldest first"""
+    backups = []
+    n = 1
+    while os.path.exists(f"{path}.{n}"):
+        backups.append(f"{path}.{n}")
+        n += 1
+    return list(reversed(backups)) + [path]
+
+
+def load_records(paths):
+    records = []
+    for path in paths:
+        for file_path in capture_files(path):
+            with open(file_path) as log:
+                records.extend(json.loads(line) for line in log if line.strip())
+    records.sort(key=lambda record: record["ts"])
+    return records
+
+
+def route_of(record):
+    return f"{record['method']} {ID_PATTERN.sub(lambda match: '/{' + match.group(1) + '_id}', record['path'])}"
+
+
+def build_token_map(records, args):
+    token_map = {}
+    if args.token_map:
+        with open(args.token_map) as mapping:
+            token_map.update(json.load(mapping))
+    if args.tokens:
+        with open(args.tokens) as token_file:
+            tokens = [line.strip() for line in token_file if line.strip()]
+        if not tokens:
+            sys.exit(f"❌ No tokens found in {args.tokens}")
+        identities = sorted({record["identity"] for record in records if record["identity"]} - set(token_map))
+        for n, identity in enumerate(identities):
+            token_map[identity] = tokens[n % len(tokens)]
+    return token_map
+
+
+async def replay(records, token_map, args):
+    """Issue every record at its original offset divided by --speed"""
+    results = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+    first_ts = records[0]["ts"]
+    started = time.monotonic()
+
+    async def issue(http, record):
+        if args.speed > 0:
+            delay = (record["ts"] - first_ts) / args.speed - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        headers = {}
+        token = token_map.get(record["identity"])
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        if record.get("body"):
+            headers["Content-Type"] = "application/json"
+        url = record["path"] + (f"?{record['query']}" if record.get("query") else "")
+        async with semaphore:
+            request_started = time.perf_counter()
+            try:
+                response = await http.request(record["method"], url, headers=headers, content=record.get("body"))
+                status = response.status_code
+            except httpx.HTTPError:
+                status = None
+            duration_ms = (time.perf_counter() - request_started) * 1000
+        results.append((record, status, duration_ms))
+
+    async with httpx.AsyncClient(base_url=args.target, timeout=args.timeout) as http:
+        await asyncio.gather(*[issue(http, record) for record in records])
+    return results, time.monotonic() - started
+
+
+def report(results, elapsed, speed):
+    by_route = {}
+    for record, status, duration_ms in results:
+        by_route.setdefault(route_of(record), []).append((record, status, duration_ms))
+
+    print(f"\n{'route':<44} {'count':>6} {'rec p50':>9} {'new p50':>9} {'rec p95':>9} {'new p95':>9} {'Δp95':>8} {'status≠':>8}")
+    for route, rows in sorted(by_route.items(), key=lambda item: -len(item[1])):
+        recorded = np.array([record["duration_ms"] for record, _, _ in rows])
+        replayed = np.array([duration_ms for _, _, duration_ms in rows])
+        mismatched = sum(1 for record, status, _ in rows if status != record["status"])
+        rec_p50, rec_p95 = np.percentile(recorded, [50, 95])
+        new_p50, new_p95 = np.percentile(replayed, [50, 95])
+        delta = (new_p95 - rec_p95) / rec_p95 * 100 if rec_p95 else 0.0
+        print(f"{route[:44]:<44} {len(rows):>6} {rec_p50:>8.1f}ms {new_p50:>8.1f}ms {rec_p95:>8.1f}ms {new_p95:>8.1f}ms {delta:>+7.0f}% {mismatched:>8}")
+
+    failed = sum(1 for _, status, _ in results if status is None)
+    print(f"\n✅ Replayed {len(results)} request(s) in {elapsed:.1f}s at {speed or 'max'}x speed ({failed} connection error(s))")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured SquareDaddy API traffic")
+    parser.add_argument("logs", nargs="+", help="Capture log(s); rotated backups (.1, .2, ...) are picked up too")
+    parser.add_argument("--target", default=BACKEND_URL, help="Base URL of the app to replay against")
+    parser.add_argument("--speed", type=float, default=1.0, help="Time compression factor (0 = as fast as possible)")
+    parser.add_argument("--tokens", help="File of valid tokens, assigned round-robin to captured callers")
+    parser.add_argument("--token-map", help="JSON file mapping captured token hashes to valid tokens")
+    parser.add_argument("--concurrency", type=int, default=200, help="Maximum requests in flight")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--limit", type=int, help="Only replay the first N requests")
+    args = parser.parse_args()
+
+    records = load_records(args.logs)
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        sys.exit("❌ No captured requests found")
+
+    token_map = build_token_map(records, args)
+    unmapped = {record["identity"] for record in records if record["identity"] and record["identity"] not in token_map}
+    if unmapped:
+        print(f"⚠️  {len(unmapped)} caller(s) have no token and are replayed unauthenticated", file=sys.stderr)
+
+    print(f"🔁 Replaying {len(records)} request(s) against {args.target}...")
+    results, elapsed = asyncio.run(replay(records, token_map, args))
+    report(results, elapsed, args.speed)
+
+
+if __name__ == "__main__":
+    main()
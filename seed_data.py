@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Seed a local MongoDB with a production-sized SquareDaddy dataset.
+
+Users, sessions, games, entries and payouts are generated in memory and
+written with insert_many in batches, so tens of thousands of documents take
+seconds. Games follow the same rules as the backend: 10 squares, at most 2
+per player, numbers drawn once the board is full, quarter winners paid
+20/20/20/40% of the pot. Balances reflect the fees paid and payouts won.
+
+Run rebuild_leaderboards.py afterwards to recompute the leaderboards.
+
+Usage:
+  python seed_data.py --users 5000 --games 20000
+  python seed_data.py --games 1000 --status-mix pending=1 --fill 0.5
+  python seed_data.py --drop --users 200 --games 500 --tokens-out tokens.txt
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+
+import pymongo
+
+QUARTERS = ["Q1", "Q2", "Q3", "Q4"]
+PAYOUT_PERCENTAGES = {"Q1": 0.20, "Q2": 0.20, "Q3": 0.20, "Q4": 0.40}
+STARTING_BALANCE = 1000.0
+
+SEEDED_COLLECTIONS = ["users", "user_sessions", "games", "game_entries", "payouts"]
+
+# Points a team can score in one quarter, weighted towards common outcomes
+QUARTER_POINTS = [0, 0, 3, 3, 6, 7, 7, 10, 10, 13, 14, 14, 17, 21]
+
+
+def parse_mix(value):
+    """Parse "pending=0.2,active=0.3,completed=0.5" into normalized weights"""
+    mix = {}
+    for part in value.split(","):
+        status, _, weight = part.partition("=")
+        if status not in ("pending", "active", "completed"):
+            raise argparse.ArgumentTypeError(f"unknown status {status!r}")
+        mix[status] = float(weight or 1)
+    total = sum(mix.values())
+    if total <= 0:
+        raise argparse.ArgumentTypeError("weights must add up to more than 0")
+    return {status: weight / total for status, weight in mix.items()}
+
+
+def parse_list(cast):
+    def parse(value):
+        return [cast(item.strip()) for item in value.split(",") if item.strip()]
+    return parse
+
+
+def random_hex(digits):
+    """Hex id drawn from the seeded generator, so --seed reproduces ids too"""
+    return f"{random.getrandbits(digits * 4):0{digits}x}"
+
+
+def make_users(count, now, days):
+    users, sessions = [], []
+    for n in range(count):
+        user_id = f"seed_user_{random_hex(12)}"
+        created_at = now - timedelta(seconds=random.uniform(0, days * 86400))
+        users.append({
+            "user_id": user_id,
+            "email": f"seed.{n}.{user_id[-6:]}@example.com",
+            "name": f"Seed Player {n}",
+            "picture": None,
+            "mock_balance": STARTING_BALANCE,
+            "created_at": created_at,
+        })
+        sessions.append({
+            "user_id": user_id,
+            "session_token": f"seed_session_{random_hex(32)}",
+            "sid": random_hex(32),
+            "expires_at": now + timedelta(days=7),
+            "created_at": now,
+            "last_seen_at": now,
+        })
+    return users, sessions
+
+
+def quarter_scores():
+    """Cumulative end-of-quarter scores like "21-17" """
+    team1 = team2 = 0
+    scores = {}
+    for quarter in QUARTERS:
+        team1 += random.choice(QUARTER_POINTS)
+        team2 += random.choice(QUARTER_POINTS)
+        scores[quarter] = f"{team1}-{team2}"
+    return scores
+
+
+def make_game(users, status, args, now, balances):
+    """One game with its entries and payouts, consistent with the backend rules"""
+    game_id = f"game_{random_hex(12)}"
+    created_at = now - timedelta(seconds=random.uniform(0, args.days * 86400))
+    entry_fee = random.choice(args.entry_fees)
+
+    filled = 10
+    if status == "pending":
+        # Roughly args.fill of the board taken, never full
+        filled = min(9, sum(random.random() < args.fill for _ in range(10)))
+    square_numbers = random.sample(range(10), filled)
+
+    squares = [None] * 10
+    entries = []
+    owners = {}
+    for square_num in square_numbers:
+        user = random.choice(users)
+        # At most 2 squares per player and game
+        while owners.get(user["user_id"], 0) >= 2:
+            user = random.choice(users)
+        owners[user["user_id"]] = owners.get(user["user_id"], 0) + 1
+        entry_id = f"entry_{random_hex(12)}"
+        squares[square_num] = {"user_id": user["user_id"], "user_name": user["name"], "entry_id": entry_id}
+        entries.append({
+            "entry_id": entry_id,
+            "game_id": game_id,
+            "user_id": user["user_id"],
+            "user_name": user["name"],
+            "square_number": square_num,
+            "paid_amount": entry_fee,
+            "created_at": created_at + timedelta(seconds=random.uniform(0, 3600)),
+        })
+        balances[user["user_id"]] -= entry_fee
+
+    game = {
+        "game_id": game_id,
+        "creator_id": random.choice(users)["user_id"],
+        "event_name": random.choice(args.events),
+        "entry_fee": entry_fee,
+        "status": status,
+        "squares": squares,
+        "random_numbers": [None] * 10,
+        "created_at": created_at,
+        "quarter_scores": {},
+        "winners": {},
+        "version": filled,
+        "open_squares": [i for i in random.sample(range(10), 10) if squares[i] is None],
+    }
+
+    payouts = []
+    if status == "pending":
+        return game, entries, payouts
+
+    numbers = list(range(10))
+    random.shuffle(numbers)
+    game["random_numbers"] = numbers
+    game["version"] += 1
+
+    scores = quarter_scores()
+    scored = QUARTERS if status == "completed" else QUARTERS[:random.randint(0, 3)]
+    for quarter in scored:
+        team1, team2 = (int(points) for points in scores[quarter].split("-"))
+        winning_number = (team1 % 10 + team2 % 10) % 10
+        winner = squares[numbers.index(winning_number)]
+        game["quarter_scores"][quarter] = scores[quarter]
+        game["winners"][quarter] = winner["user_id"]
+        game["version"] += 1
+        amount = entry_fee * 10 * PAYOUT_PERCENTAGES[quarter]
+        payouts.append({
+            "payout_id": f"payout_{random_hex(12)}",
+            "game_id": game_id,
+            "user_id": winner["user_id"],
+            "quarter": quarter,
+            "amount": amount,
+            "paid": True,
+            "created_at": created_at + timedelta(hours=2 + QUARTERS.index(quarter)),
+        })
+        balances[winner["user_id"]] += amount
+    if status == "completed":
+        game["completed_at"] = created_at + timedelta(hours=5)
+
+    return game, entries, payouts
+
+
+def insert_batches(collection, docs, batch_size):
+    for start in range(0, len(docs), batch_size):
+        collection.insert_many(docs[start:start + batch_size], ordered=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed SquareDaddy collections with generated data")
+    parser.add_argument("--users", type=int, default=1000, help="Number of players (each gets a session)")
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--status-mix", type=parse_mix, default=parse_mix("pending=0.3,active=0.2,completed=0.5"),
+                        help="Weights of game statuses, e.g. pending=0.3,active=0.2,completed=0.5")
+    parser.add_argument("--fill", type=float, default=0.5, help="Average share of squares taken in pending games")
+    parser.add_argument("--entry-fees", type=parse_list(float), default=[0.0, 5.0, 10.0, 20.0, 50.0])
+    parser.add_argument("--events", type=parse_list(str), default=["Super Bowl", "Monday Night Football", "Sunday Night Football", "Thanksgiving Classic"])
+    parser.add_argument("--days", type=float, default=90, help="Spread created_at over this many days before now")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, help="Random seed for a reproducible dataset")
+    parser.add_argument("--drop", action="store_true", help="Clear the seeded collections first")
+    parser.add_argument("--tokens-out", help="Write the generated session tokens here, one per line")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default=os.environ.get("DB_NAME", "test_database"))
+    args = parser.parse_args()
+
+    if args.users < 5 and args.games:
+        parser.error("--users must be at least 5 to fill a board (2 squares per player)")
+    if not 0 <= args.fill <= 1:
+        parser.error("--fill must be between 0 and 1")
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    started = time.monotonic()
+    now = datetime.now(timezone.utc)
+    users, sessions = make_users(args.users, now, args.days)
+    balances = {user["user_id"]: STARTING_BALANCE for user in users}
+
+    statuses = random.choices(list(args.status_mix), weights=list(args.status_mix.values()), k=args.games)
+    games, entries, payouts = [], [], []
+    for status in statuses:
+        game, game_entries, game_payouts = make_game(users, status, args, now, balances)
+        games.append(game)
+        entries.extend(game_entries)
+        payouts.extend(game_payouts)
+    for user in users:
+        user["mock_balance"] = round(balances[user["user_id"]], 2)
+    generated = time.monotonic() - started
+
+    client = pymongo.MongoClient(args.mongo_url)
+    db = client[args.db]
+    if args.drop:
+        for name in SEEDED_COLLECTIONS:
+            db[name].delete_many({})
+
+    for name, docs in (("users", users), ("user_sessions", sessions), ("games", games), ("game_entries", entries), ("payouts", payouts)):
+        insert_batches(db[name], docs, args.batch_size)
+        print(f"✅ Inserted {len(docs)} {name}", file=sys.stderr)
+
+    if args.tokens_out:
+        with open(args.tokens_out, "w") as out:
+            out.writelines(f"{session['session_token']}\n" for session in sessions)
+        print(f"🔑 Wrote {len(sessions)} session tokens to {args.tokens_out}", file=sys.stderr)
+
+    counts = {status: statuses.count(status) for status in args.status_mix}
+    print(f"🎲 Games by status: {counts}", file=sys.stderr)
+    print(f"⏱️  Generated in {generated:.1f}s, total {time.monotonic() - started:.1f}s", file=sys.stderr)
+    print("ℹ️  Run rebuild_leaderboards.py to recompute the leaderboards", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
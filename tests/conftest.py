@@ -0,0 +1,117 @@
+"""
+Fixtures shared by the test modules.
+
+backend/server.py creates its MongoDB client at import, so it is imported
+once per run by the `server` fixture, after command monitoring is
+registered. Tests that need a database use `mongo`, which skips them when
+none is reachable and drops the throwaway database afterwards:
+
+  MONGO_URL=mongodb://localhost:27017 python -m pytest tests
+"""
+
+import os
+import sys
+import uuid
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+import pymongo
+import pytest
+from pymongo import monitoring
+
+ROOT_DIR = Path(__file__).parent.parent
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+TEST_DB_NAME = f"tests_{uuid.uuid4().hex[:8]}"
+
+
+class CommandRecorder(monitoring.CommandListener):
+    """Keeps the commands sent to the test database"""
+
+    def __init__(self):
+        self.commands = []
+
+    def started(self, event):
+        if event.database_name == TEST_DB_NAME:
+            self.commands.append(dict(event.command))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+recorder = CommandRecorder()
+
+
+@pytest.fixture(scope="session")
+def server():
+    """The backend module, pointed at the test database"""
+    # The backend creates its client at import; listeners must exist first
+    monitoring.register(recorder)
+    os.environ["MONGO_URL"] = MONGO_URL
+    os.environ["DB_NAME"] = TEST_DB_NAME
+    os.environ.setdefault("ARCHIVE_AFTER_DAYS", "0")
+    # Jobs are run by the tests so their effects can be checked
+    os.environ.setdefault("JOB_WORKERS", "0")
+    sys.path.insert(0, str(ROOT_DIR / "backend"))
+    import server
+
+    return server
+
+
+@pytest.fixture(scope="module")
+def mongo(server):
+    """The test database, empty; skips the module when no MongoDB is reachable"""
+    sync_client = pymongo.MongoClient(MONGO_URL, serverSelectionTimeoutMS=2000)
+    try:
+        sync_client.admin.command("ping")
+    except pymongo.errors.PyMongoError:
+        sync_client.close()
+        pytest.skip(f"No MongoDB reachable at {MONGO_URL}")
+
+    # Forget what an earlier module's database held
+    server.game_cache.clear()
+    server.invalidate_games_list()
+    server.leaderboards.clear()
+    try:
+        yield sync_client[TEST_DB_NAME]
+    finally:
+        sync_client.drop_database(TEST_DB_NAME)
+        sync_client.close()
+
+
+@pytest.fixture(scope="module")
+def client(server, mongo):
+    """The app with its background tasks running"""
+    from fastapi.testclient import TestClient
+
+    with TestClient(server.app) as client:
+        yield client
+
+
+@pytest.fixture(scope="module")
+def make_user(mongo):
+    """Creates a user with a live session; returns their id and auth headers"""
+
+    def make_user(balance=1000.0):
+        user_id = f"user_{uuid.uuid4().hex[:12]}"
+        token = f"session_{uuid.uuid4().hex}"
+        now = datetime.now(timezone.utc)
+        mongo.users.insert_one({"user_id": user_id, "email": f"{user_id}@example.com", "name": user_id, "mock_balance": balance, "created_at": now})
+        mongo.user_sessions.insert_one({"user_id": user_id, "session_token": token, "expires_at": now + timedelta(days=1), "created_at": now})
+        return user_id, {"Authorization": f"Bearer {token}"}
+
+    return make_user
+
+
+@pytest.fixture(scope="module")
+def new_game(client, make_user):
+    """Creates a pending Super Bowl game by a new user; returns its id"""
+
+    def new_game(entry_fee=10.0):
+        _, headers = make_user()
+        response = client.post("/api/games", json={"event_name": "Super Bowl", "entry_fee": entry_fee}, headers=headers)
+        return response.json()["game_id"]
+
+    return new_game
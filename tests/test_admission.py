@@ -0,0 +1,134 @@
+"""
+Admission control: requests over the concurrency limits wait in a bounded
+priority queue and are shed when it is full or they wait too long.
+"""
+
+import asyncio
+
+import pytest
+
+URGENT, NORMAL, HEAVY = 0, 1, 2
+
+
+@pytest.fixture
+def make_controller(server, monkeypatch):
+    monkeypatch.setattr(server, "ADMISSION_QUEUE_TIMEOUT_SECONDS", 0.05)
+
+    def make_controller(max_concurrency=1, queue_size=2, route_limits=None):
+        return server.AdmissionController(max_concurrency, queue_size, route_limits or {})
+
+    return make_controller
+
+
+async def waiting(controller, route, priority):
+    """Start an acquire and let it reach the queue"""
+    task = asyncio.create_task(controller.acquire(route, priority))
+    await asyncio.sleep(0)
+    return task
+
+
+def test_waiter_past_the_timeout_is_shed(make_controller):
+    controller = make_controller()
+
+    async def scenario():
+        assert await controller.acquire("join_game", URGENT)
+        assert not await controller.acquire("join_game", URGENT)
+
+    asyncio.run(scenario())
+    stats = controller.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["in_flight"] == 1
+    assert stats["routes"]["join_game"] == {"limit": 1, "in_flight": 1, "admitted": 1, "shed": 1}
+
+
+def test_released_slot_goes_to_the_most_urgent_waiter(make_controller):
+    controller = make_controller(queue_size=2)
+
+    async def scenario():
+        assert await controller.acquire("other", NORMAL)
+        heavy = await waiting(controller, "get_games", HEAVY)
+        urgent = await waiting(controller, "join_game", URGENT)
+        controller.release("other")
+        assert await urgent
+        assert not heavy.done()
+        controller.release("join_game")
+        assert await heavy
+
+    asyncio.run(scenario())
+    assert controller.stats()["routes"]["get_games"]["admitted"] == 1
+
+
+def test_full_queue_displaces_a_less_urgent_waiter(make_controller):
+    controller = make_controller(queue_size=1)
+
+    async def scenario():
+        assert await controller.acquire("other", NORMAL)
+        heavy = await waiting(controller, "get_games", HEAVY)
+        urgent = await waiting(controller, "join_game", URGENT)
+        assert not await heavy
+        controller.release("other")
+        assert await urgent
+
+    asyncio.run(scenario())
+    assert controller.stats()["routes"]["get_games"]["shed"] == 1
+
+
+def test_full_queue_rejects_at_once_without_a_less_urgent_waiter(make_controller):
+    controller = make_controller(queue_size=1)
+
+    async def scenario():
+        assert await controller.acquire("other", NORMAL)
+        queued = await waiting(controller, "join_game", URGENT)
+        assert not await controller.acquire("get_games", HEAVY)
+        assert not queued.done()
+        controller.release("other")
+        assert await queued
+
+    asyncio.run(scenario())
+
+
+def test_route_limit_does_not_block_other_routes(make_controller):
+    controller = make_controller(max_concurrency=2, route_limits={"get_games": 1})
+
+    async def scenario():
+        assert await controller.acquire("get_games", HEAVY)
+        second_list = await waiting(controller, "get_games", HEAVY)
+        assert await controller.acquire("join_game", URGENT)
+        controller.release("join_game")
+        # The freed slot does not fit the waiting route
+        assert not second_list.done()
+        controller.release("get_games")
+        assert await second_list
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue(make_controller):
+    controller = make_controller()
+
+    async def scenario():
+        assert await controller.acquire("other", NORMAL)
+        queued = await waiting(controller, "other", NORMAL)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        assert controller.queue_depth() == 0
+        controller.release("other")
+        assert controller.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_shed_request_gets_503_with_retry_after(server, make_controller, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    controller = make_controller(queue_size=0)
+    monkeypatch.setattr(server, "admission", controller)
+    asyncio.run(controller.acquire("get_games", HEAVY))
+
+    # Shed before the route runs, so no database is needed
+    response = TestClient(server.app).get("/api/games")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(server.ADMISSION_RETRY_AFTER_SECONDS)
+    assert controller.stats()["routes"]["get_games"]["shed"] == 1
@@ -0,0 +1,193 @@
+"""
+Circuit breakers and stale responses: a failing dependency is cut off
+after repeated failures and probed again later, while read routes serve
+their last good response.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+
+class Unreachable(Exception):
+    pass
+
+
+@pytest.fixture
+def breaker(server, monkeypatch):
+    monkeypatch.setattr(server, "CIRCUIT_FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(server, "CIRCUIT_RESET_SECONDS", 10)
+    return server.CircuitBreaker("test", (Unreachable,), timeout_seconds=0.05)
+
+
+def call(breaker, operation):
+    return asyncio.run(breaker.call(operation))
+
+
+async def unreachable():
+    raise Unreachable()
+
+
+async def answer():
+    return "answer"
+
+
+def fail(breaker, server, times):
+    for _ in range(times):
+        with pytest.raises(server.DependencyUnavailable):
+            call(breaker, unreachable)
+
+
+def reset_elapsed(breaker):
+    """Pretend the circuit opened long enough ago to be probed"""
+    breaker.opened_at -= 10
+
+
+def test_opens_after_consecutive_failures(server, breaker):
+    fail(breaker, server, 1)
+    assert breaker.state == "closed"
+    fail(breaker, server, 1)
+    assert breaker.state == "open"
+
+    calls = []
+
+    async def operation():
+        calls.append(1)
+
+    with pytest.raises(server.DependencyUnavailable):
+        call(breaker, operation)
+    assert calls == []
+    assert 1 <= breaker.retry_after() <= 10
+
+
+def test_success_resets_the_failure_count(server, breaker):
+    fail(breaker, server, 1)
+    assert call(breaker, answer) == "answer"
+    fail(breaker, server, 1)
+
+    assert breaker.state == "closed"
+
+
+def test_timeout_counts_as_failure(server, breaker):
+    async def slow():
+        await asyncio.sleep(1)
+
+    for _ in range(2):
+        with pytest.raises(server.DependencyUnavailable):
+            call(breaker, slow)
+
+    assert breaker.state == "open"
+
+
+def test_other_errors_mean_the_dependency_answered(server, breaker):
+    async def not_found():
+        raise KeyError("missing")
+
+    for _ in range(3):
+        with pytest.raises(KeyError):
+            call(breaker, not_found)
+
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_one_trial_through(server, breaker):
+    fail(breaker, server, 2)
+    reset_elapsed(breaker)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def trial():
+            await release.wait()
+            return "answer"
+
+        first = asyncio.create_task(breaker.call(trial))
+        await asyncio.sleep(0)
+        assert breaker.state == "half_open"
+        with pytest.raises(server.DependencyUnavailable):
+            await breaker.call(answer)
+        release.set()
+        return await first
+
+    assert asyncio.run(scenario()) == "answer"
+    assert breaker.state == "closed"
+
+
+def test_failed_trial_opens_the_circuit_again(server, breaker):
+    fail(breaker, server, 2)
+    reset_elapsed(breaker)
+
+    fail(breaker, server, 1)
+
+    assert breaker.state == "open"
+    assert time.monotonic() - breaker.opened_at < 1
+
+
+def test_stale_entries_expire(server, monkeypatch):
+    monkeypatch.setattr(server, "STALE_MAX_AGE_SECONDS", 60)
+    cache = server.StaleCache(max_entries=2)
+    cache.put("a", 1)
+
+    age, value = cache.get("a")
+    assert value == 1 and age < 1
+
+    cache.entries["a"] = (time.monotonic() - 61, 1)
+    assert cache.get("a") is None
+    assert "a" not in cache.entries
+
+
+def test_stale_cache_drops_least_recently_used(server):
+    cache = server.StaleCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("a", 1)
+    cache.put("c", 3)
+
+    assert list(cache.entries) == ["a", "c"]
+
+
+@pytest.fixture
+def mongo_down(server, monkeypatch):
+    """The MongoDB circuit open, with empty stale caches; no database is touched"""
+    breaker = server.CircuitBreaker("MongoDB", (Unreachable,), timeout_seconds=1)
+    breaker.state = "open"
+    breaker.opened_at = time.monotonic()
+    monkeypatch.setattr(server, "mongo_breaker", breaker)
+    monkeypatch.setattr(server, "stale_responses", server.StaleCache(10))
+    monkeypatch.setattr(server, "game_cache", type(server.game_cache)())
+
+    user = server.User(user_id="user_1", email="user_1@example.com", name="User 1", created_at=datetime.now(timezone.utc))
+    server.stale_responses.put(f"auth:{server.token_identity('token_1')}", (user, datetime.now(timezone.utc) + timedelta(days=1)))
+    return {"Authorization": "Bearer token_1"}
+
+
+def test_read_route_serves_its_last_good_response(server, mongo_down):
+    from fastapi.testclient import TestClient
+
+    server.stale_responses.put("game:game_1", {"game_id": "game_1", "status": "pending", "squares": [None] * 10})
+
+    response = TestClient(server.app).get("/api/games/game_1", headers=mongo_down)
+
+    assert response.status_code == 200
+    assert response.json()["game_id"] == "game_1"
+    assert response.headers["Warning"] == '110 - "Response is Stale"'
+    assert int(response.headers["Age"]) >= 0
+
+
+def test_without_a_stale_response_the_route_fails_fast(server, mongo_down):
+    from fastapi.testclient import TestClient
+
+    response = TestClient(server.app).get("/api/games/game_2", headers=mongo_down)
+
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_write_route_does_not_use_stale_sessions(server, mongo_down):
+    from fastapi.testclient import TestClient
+
+    response = TestClient(server.app).post("/api/games", json={"event_name": "Super Bowl", "entry_fee": 0}, headers=mongo_down)
+
+    assert response.status_code == 503
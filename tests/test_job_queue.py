@@ -0,0 +1,198 @@
+"""
+Job queue: failed jobs are retried with backoff and dead-lettered after
+JOB_MAX_ATTEMPTS, and quarter settlements run exactly once even when a
+job is lost or run twice.
+"""
+
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def empty_queue(server, mongo, monkeypatch):
+    monkeypatch.setattr(server, "JOB_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(server, "JOB_RETRY_BASE_SECONDS", 0)
+    mongo.jobs.delete_many({})
+    mongo.dead_jobs.delete_many({})
+
+
+def make_due(mongo):
+    """Let retried jobs run now instead of after their backoff"""
+    mongo.jobs.update_many({}, {"$set": {"run_at": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+
+
+def test_failing_job_is_retried_then_dead_lettered(server, client, mongo, monkeypatch):
+    calls = []
+
+    async def failing(payloads):
+        calls.append(payloads)
+        raise RuntimeError("provider down")
+
+    monkeypatch.setitem(server.JOB_HANDLERS, "flaky", failing)
+    client.portal.call(server.enqueue_job, "flaky", {"n": 1})
+
+    client.portal.call(server.run_jobs_once)
+    job = mongo.jobs.find_one({"kind": "flaky"})
+    assert (job["status"], job["attempts"]) == ("queued", 1)
+    assert "provider down" in job["error"]
+
+    make_due(mongo)
+    client.portal.call(server.run_jobs_once)
+    assert mongo.jobs.count_documents({}) == 0
+    dead = mongo.dead_jobs.find_one({"kind": "flaky"})
+    assert (dead["status"], dead["attempts"]) == ("dead", 2)
+    # Batch attempt, then one by one, on each of the two runs
+    assert len(calls) == 4
+
+
+def test_failing_job_does_not_hold_back_its_batch(server, client, mongo, monkeypatch):
+    done = []
+
+    async def picky(payloads):
+        if any(payload["n"] == 2 for payload in payloads):
+            raise RuntimeError("bad payload")
+        done.extend(payload["n"] for payload in payloads)
+
+    monkeypatch.setitem(server.JOB_HANDLERS, "picky", picky)
+    for n in (1, 2, 3):
+        client.portal.call(server.enqueue_job, "picky", {"n": n})
+
+    client.portal.call(server.run_jobs_once)
+
+    assert sorted(done) == [1, 3]
+    assert [job["payload"]["n"] for job in mongo.jobs.find()] == [2]
+
+
+def test_unknown_kind_is_dead_lettered(server, client, mongo):
+    client.portal.call(server.enqueue_job, "from_a_newer_release", {})
+
+    client.portal.call(server.run_jobs_once)
+    make_due(mongo)
+    client.portal.call(server.run_jobs_once)
+
+    assert mongo.jobs.count_documents({}) == 0
+    assert "Unknown job kind" in mongo.dead_jobs.find_one({"kind": "from_a_newer_release"})["error"]
+
+
+def test_expired_lease_counts_as_an_attempt(server, client, mongo):
+    client.portal.call(server.enqueue_job, "settle_quarter", {})
+    for attempt in (1, 2):
+        # Claimed by a worker that then stalls past its lease
+        claimed = client.portal.call(server.claim_jobs, 10)
+        assert [job["attempts"] for job in claimed] == [attempt]
+        mongo.jobs.update_many({}, {"$set": {"locked_until": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+        make_due(mongo)
+
+    assert client.portal.call(server.claim_jobs, 10) == []
+    assert mongo.jobs.count_documents({}) == 0
+    assert "Lease" in mongo.dead_jobs.find_one()["error"]
+
+
+def active_game(client, mongo, make_user):
+    """A full, active game with a $10 entry fee; returns its id and the creator's headers"""
+    _, creator_headers = make_user()
+    game_id = client.post("/api/games", json={"event_name": "Super Bowl", "entry_fee": 10.0}, headers=creator_headers).json()["game_id"]
+    for square in range(0, 10, 2):
+        _, headers = make_user()
+        for offset in (0, 1):
+            assert client.post(f"/api/games/{game_id}/join", json={"square_number": square + offset}, headers=headers).status_code == 200
+    assert mongo.games.find_one({"game_id": game_id})["status"] == "active"
+    return game_id, creator_headers
+
+
+def test_lost_settlement_is_queued_again(server, client, mongo, make_user, monkeypatch):
+    game_id, creator_headers = active_game(client, mongo, make_user)
+
+    async def crash(*args, **kwargs):
+        raise RuntimeError("process stopped")
+
+    # The score is recorded but the process stops before queuing its job
+    with monkeypatch.context() as patch:
+        patch.setattr(server, "enqueue_job", crash)
+        with pytest.raises(RuntimeError):
+            client.post(f"/api/games/{game_id}/score", json={"quarter": "Q1", "score": "21-17"}, headers=creator_headers)
+    game = mongo.games.find_one({"game_id": game_id})
+    assert game["quarter_scores"]["Q1"] == "21-17"
+    assert [settlement["quarter"] for settlement in game["pending_settlements"]] == ["Q1"]
+    assert mongo.jobs.count_documents({}) == 0
+
+    # Left alone while its job may still be on the way
+    assert client.portal.call(server.reconcile_settlements) == 0
+    recorded_at = datetime.now(timezone.utc) - timedelta(seconds=server.SETTLEMENT_GRACE_SECONDS + 1)
+    mongo.games.update_one({"game_id": game_id}, {"$set": {"pending_settlements.0.settled_at": recorded_at}})
+    assert client.portal.call(server.reconcile_settlements) == 1
+    assert client.portal.call(server.reconcile_settlements) == 0
+    client.portal.call(server.run_jobs_once)
+
+    payout = mongo.payouts.find_one({"game_id": game_id})
+    assert payout["amount"] == 20.0 and payout["paid"]
+    assert mongo.games.find_one({"game_id": game_id})["pending_settlements"] == []
+    assert client.portal.call(server.reconcile_settlements) == 0
+
+
+def test_settling_twice_pays_and_counts_once(server, client, mongo, make_user):
+    game_id, creator_headers = active_game(client, mongo, make_user)
+    assert client.post(f"/api/games/{game_id}/score", json={"quarter": "Q2", "score": "14-10"}, headers=creator_headers).status_code == 200
+    payload = mongo.jobs.find_one({"kind": "settle_quarter"})["payload"]
+    winner = payload["winner_user_id"]
+    balance = mongo.users.find_one({"user_id": winner})["mock_balance"]
+    wins = mongo.leaderboards.find_one({"scope": "global", "user_id": winner}) or {}
+
+    async def settle_concurrently():
+        await asyncio.gather(server.settle_quarters([payload]), server.settle_quarters([payload]))
+
+    client.portal.call(settle_concurrently)
+    client.portal.call(server.run_jobs_once)
+
+    assert mongo.payouts.count_documents({"game_id": game_id, "quarter": "Q2"}) == 1
+    assert mongo.users.find_one({"user_id": winner})["mock_balance"] == balance + payload["amount"]
+    leaderboard = mongo.leaderboards.find_one({"scope": "global", "user_id": winner})
+    assert leaderboard["win_count"] == wins.get("win_count", 0) + 1
+
+
+def test_scored_quarter_cannot_be_scored_again(server, client, mongo, make_user):
+    game_id, creator_headers = active_game(client, mongo, make_user)
+    assert client.post(f"/api/games/{game_id}/score", json={"quarter": "Q3", "score": "24-20"}, headers=creator_headers).status_code == 200
+    winner = mongo.jobs.find_one({"kind": "settle_quarter"})["payload"]["winner_user_id"]
+    balances = {user["user_id"]: user["mock_balance"] for user in mongo.users.find()}
+
+    # A corrected score with another winning number
+    response = client.post(f"/api/games/{game_id}/score", json={"quarter": "Q3", "score": "25-20"}, headers=creator_headers)
+    assert (response.status_code, response.json()["detail"]) == (400, "Quarter already scored")
+
+    client.portal.call(server.run_jobs_once)
+
+    payout = mongo.payouts.find_one({"game_id": game_id, "quarter": "Q3"})
+    assert mongo.payouts.count_documents({"game_id": game_id, "quarter": "Q3"}) == 1
+    game = mongo.games.find_one({"game_id": game_id})
+    assert game["quarter_scores"]["Q3"] == "24-20"
+    assert game["winners"]["Q3"] == payout["user_id"] == winner
+    assert game["pending_settlements"] == []
+    credited = {user["user_id"] for user in mongo.users.find() if user["mock_balance"] != balances[user["user_id"]]}
+    assert credited == {winner}
+
+
+def test_failed_leaderboard_write_is_retried(server, client, mongo, make_user, monkeypatch):
+    game_id, creator_headers = active_game(client, mongo, make_user)
+    assert client.post(f"/api/games/{game_id}/score", json={"quarter": "Q1", "score": "7-3"}, headers=creator_headers).status_code == 200
+    winner = mongo.jobs.find_one({"kind": "settle_quarter"})["payload"]["winner_user_id"]
+    wins = mongo.leaderboards.find_one({"scope": "global", "user_id": winner}) or {}
+
+    async def unavailable(event_name, deltas):
+        raise RuntimeError("leaderboards unavailable")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(server, "record_leaderboard_deltas", unavailable)
+        client.portal.call(server.run_jobs_once)
+    assert mongo.jobs.find_one({"kind": "settle_quarter"})["attempts"] == 1
+    assert not mongo.payouts.find_one({"game_id": game_id, "quarter": "Q1"}).get("leaderboard_recorded")
+
+    make_due(mongo)
+    client.portal.call(server.run_jobs_once)
+
+    assert mongo.jobs.count_documents({}) == 0
+    assert mongo.payouts.find_one({"game_id": game_id, "quarter": "Q1"})["leaderboard_recorded"]
+    leaderboard = mongo.leaderboards.find_one({"scope": "global", "user_id": winner})
+    assert leaderboard["win_count"] == wins.get("win_count", 0) + 1
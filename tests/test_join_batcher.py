@@ -0,0 +1,73 @@
+"""
+Batched joins: squares of players who cannot pay the entry fee are handed
+back while the rest of their batch goes through.
+"""
+
+import asyncio
+
+from fastapi import HTTPException
+
+
+def join_together(client, server, game_id, joins):
+    """Submit (headers, square) joins in one batch; results or HTTPExceptions in order"""
+
+    async def submit():
+        users = [await server.get_current_user(headers["Authorization"]) for headers, _ in joins]
+        return await asyncio.gather(
+            *[server.join_batcher.submit(game_id, user, square) for user, (_, square) in zip(users, joins)],
+            return_exceptions=True,
+        )
+
+    return client.portal.call(submit)
+
+
+def test_unpaid_join_is_rolled_back(server, client, mongo, make_user, new_game):
+    game_id = new_game()
+    payer, payer_headers = make_user()
+    broke, broke_headers = make_user(balance=5.0)
+
+    joined, unpaid = join_together(client, server, game_id, [(payer_headers, 1), (broke_headers, 2)])
+
+    assert joined["entry"]["user_id"] == payer
+    assert isinstance(unpaid, HTTPException)
+    assert (unpaid.status_code, unpaid.detail) == (400, "Insufficient balance")
+    game = mongo.games.find_one({"game_id": game_id})
+    assert game["squares"][1]["user_id"] == payer
+    assert game["squares"][2] is None
+    assert 2 in game["open_squares"] and 1 not in game["open_squares"]
+    assert mongo.users.find_one({"user_id": payer})["mock_balance"] == 990.0
+    assert mongo.users.find_one({"user_id": broke})["mock_balance"] == 5.0
+    assert [entry["user_id"] for entry in mongo.game_entries.find({"game_id": game_id})] == [payer]
+    # The cached copy reflects the rollback too
+    assert client.get(f"/api/games/{game_id}", headers=payer_headers).json()["squares"][2] is None
+
+
+def test_unpaid_held_square_stays_held(server, client, mongo, make_user, new_game):
+    game_id = new_game()
+    payer, payer_headers = make_user()
+    broke, broke_headers = make_user(balance=5.0)
+    assert client.post(f"/api/games/{game_id}/reserve", json={"square_number": 3}, headers=broke_headers).status_code == 200
+
+    joined, unpaid = join_together(client, server, game_id, [(payer_headers, 1), (broke_headers, 3)])
+
+    assert joined["entry"]["square_number"] == 1
+    assert unpaid.status_code == 400
+    game = mongo.games.find_one({"game_id": game_id})
+    assert game["squares"][3] is None
+    # Released when the hold ends, not by the failed join
+    assert 3 not in game["open_squares"]
+    assert mongo.square_holds.find_one({"game_id": game_id, "square_number": 3})["user_id"] == broke
+
+
+def test_batch_of_unpaid_joins_changes_nothing(server, client, mongo, make_user, new_game):
+    game_id = new_game()
+    before = mongo.games.find_one({"game_id": game_id})
+    joins = [(make_user(balance=0.0)[1], square) for square in (4, 5)]
+
+    results = join_together(client, server, game_id, joins)
+
+    assert all(isinstance(result, HTTPException) and result.status_code == 400 for result in results)
+    game = mongo.games.find_one({"game_id": game_id})
+    assert game["squares"] == before["squares"]
+    assert sorted(game["open_squares"]) == sorted(before["open_squares"])
+    assert mongo.game_entries.count_documents({"game_id": game_id}) == 0
@@ -0,0 +1,337 @@
+"""
+Query-plan regression tests for the MongoDB queries behind each endpoint.
+
+Each test calls an endpoint of backend/server.py against a seeded MongoDB,
+captures the commands the backend sends (pymongo command monitoring) and
+explains them. A query fails if its winning plan scans a whole collection,
+sorts in memory, or examines far more documents than it returns.
+
+Needs a MongoDB to write a throwaway database to; the tests are skipped
+when none is reachable:
+
+  MONGO_URL=mongodb://localhost:27017 python -m pytest tests/test_query_plans.py
+"""
+
+import argparse
+import sys
+import uuid
+from datetime import datetime, timezone, timedelta
+
+import httpx
+import pytest
+
+from .conftest import ROOT_DIR, recorder
+
+SEED_USERS = 500
+SEED_GAMES = 3000
+
+# Commands that read or select documents and can be explained
+EXPLAINED_COMMANDS = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"}
+# The cache invalidation feed is a capped collection read in natural order
+UNINDEXED_COLLECTIONS = {"cache_invalidations"}
+# Fields the driver adds that explain does not accept
+DRIVER_FIELDS = {"lsid", "$db", "$clusterTime", "txnNumber", "$readPreference", "readConcern", "writeConcern", "ordered"}
+
+MAX_EXAMINED_RATIO = 10
+# Below this many examined documents the ratio is noise
+MIN_EXAMINED = 50
+
+
+def seed(db):
+    """Users, sessions, games, entries and payouts from seed_data.py"""
+    sys.path.insert(0, str(ROOT_DIR))
+    import seed_data
+
+    args = argparse.Namespace(fill=0.5, entry_fees=[0.0, 10.0], events=["Super Bowl", "Monday Night Football"], days=30)
+    now = datetime.now(timezone.utc)
+    users, sessions = seed_data.make_users(SEED_USERS, now, args.days)
+    balances = {user["user_id"]: seed_data.STARTING_BALANCE for user in users}
+    statuses = ["pending", "active", "completed"] * (SEED_GAMES // 3)
+    games, entries, payouts = [], [], []
+    for status in statuses:
+        game, game_entries, game_payouts = seed_data.make_game(users, status, args, now, balances)
+        games.append(game)
+        entries.extend(game_entries)
+        payouts.extend(game_payouts)
+    for user in users:
+        user["mock_balance"] = 1_000_000.0
+
+    for name, docs in (("users", users), ("user_sessions", sessions), ("games", games), ("game_entries", entries), ("payouts", payouts)):
+        db[name].insert_many(docs, ordered=False)
+    return {session["user_id"]: session["session_token"] for session in sessions}
+
+
+@pytest.fixture(scope="module")
+def app(server, mongo):
+    from fastapi.testclient import TestClient
+
+    tokens = seed(mongo)
+    with TestClient(server.app) as client:
+        yield client, server, mongo, tokens
+
+
+def explain(db, command):
+    """executionStats explain of a captured command, one per write statement"""
+    name = next(iter(command))
+    body = {key: value for key, value in command.items() if key not in DRIVER_FIELDS}
+    if name in ("update", "delete"):
+        statements = "updates" if name == "update" else "deletes"
+        return [
+            db.command("explain", {**body, statements: [statement]}, verbosity="executionStats")
+            for statement in body[statements]
+        ]
+    return [db.command("explain", body, verbosity="executionStats")]
+
+
+def find_all(node, key):
+    """Every value stored under `key` anywhere in an explain document"""
+    if isinstance(node, dict):
+        for name, value in node.items():
+            if name == key:
+                yield value
+            else:
+                yield from find_all(value, key)
+    elif isinstance(node, list):
+        for value in node:
+            yield from find_all(value, key)
+
+
+def plan_stages(plan):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from plan_stages(value)
+
+
+def plan_problems(command, explained, whole_collections=()):
+    """What is wrong with a plan; commands on `whole_collections` may read all of it"""
+    collection = command[next(iter(command))]
+    if collection in UNINDEXED_COLLECTIONS:
+        return []
+
+    problems = []
+    stages = {stage.upper() for plan in find_all(explained, "winningPlan") for stage in plan_stages(plan)}
+    if "SORT" in stages:
+        problems.append("in-memory sort")
+    if collection in whole_collections:
+        return problems
+    if "COLLSCAN" in stages:
+        problems.append("collection scan")
+    for stats in find_all(explained, "executionStats"):
+        examined = max(stats.get("totalDocsExamined", 0), stats.get("totalKeysExamined", 0))
+        returned = max(stats.get("nReturned", 0), 1)
+        if examined > MIN_EXAMINED and examined / returned > MAX_EXAMINED_RATIO:
+            problems.append(f"examined {examined} documents to return {returned}")
+    return problems
+
+
+def assert_indexed(app, call, whole_collections=()):
+    """Run `call` and fail on any badly planned query it issued.
+
+    Commands on `whole_collections` are expected to read every document of
+    them and are only checked for in-memory sorts.
+    """
+    client, server, db, _ = app
+    # Reads must reach MongoDB rather than the in-process caches
+    server.game_cache.clear()
+    server.invalidate_games_list()
+    recorder.commands.clear()
+
+    response = call(client)
+    if isinstance(response, httpx.Response):
+        assert response.status_code < 500, response.text
+
+    failures = []
+    for command in [command for command in recorder.commands if next(iter(command)) in EXPLAINED_COMMANDS]:
+        for explained in explain(db, command):
+            for problem in plan_problems(command, explained, whole_collections):
+                failures.append(f"{next(iter(command))} on {command[next(iter(command))]}: {problem}\n  {command}")
+    assert not failures, "\n".join(failures)
+    return response
+
+
+def token_for(app, user_id):
+    return {"Authorization": f"Bearer {app[3][user_id]}"}
+
+
+def any_user(app):
+    return next(iter(app[3]))
+
+
+def game_with(app, **query):
+    return app[2].games.find_one(query, {"_id": 0})
+
+
+def new_session(app):
+    """Token of a fresh session of some user, for tests that end it"""
+    token = f"test_{uuid.uuid4().hex}"
+    app[2].user_sessions.insert_one({
+        "user_id": any_user(app),
+        "session_token": token,
+        "expires_at": datetime.now(timezone.utc) + timedelta(days=1),
+        "created_at": datetime.now(timezone.utc),
+    })
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def admin(app, monkeypatch):
+    """Headers of a user the backend treats as an admin"""
+    user_id = any_user(app)
+    monkeypatch.setattr(app[1], "ADMIN_USER_IDS", {user_id})
+    return token_for(app, user_id)
+
+
+@pytest.fixture
+def jwt_mode(app, monkeypatch):
+    monkeypatch.setattr(app[1], "AUTH_TOKEN_MODE", "jwt")
+    monkeypatch.setattr(app[1], "JWT_SECRET", "query-plan-tests-" + "0" * 32)
+
+
+def test_auth_me(app):
+    assert_indexed(app, lambda client: client.get("/api/auth/me", headers=token_for(app, any_user(app))))
+
+
+def test_logout(app):
+    headers = new_session(app)
+    assert_indexed(app, lambda client: client.post("/api/auth/logout", headers=headers))
+
+
+def test_refresh_and_logout_access_token(app, jwt_mode):
+    headers = new_session(app)
+    response = assert_indexed(app, lambda client: client.post("/api/auth/refresh", headers=headers))
+    access = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    assert_indexed(app, lambda client: client.post("/api/auth/logout", headers=access))
+
+
+def test_list_games(app):
+    assert_indexed(app, lambda client: client.get("/api/games", headers=token_for(app, any_user(app))))
+
+
+def test_game_changes(app):
+    headers = token_for(app, any_user(app))
+    seq = int(app[0].get("/api/games", headers=headers).headers["X-Change-Seq"])
+    assert_indexed(app, lambda client: client.get("/api/games/changes", params={"since": seq}, headers=headers))
+
+
+@pytest.mark.parametrize("status", ["pending", "active", "completed"])
+def test_game_details(app, status):
+    game = game_with(app, status=status)
+    assert_indexed(app, lambda client: client.get(f"/api/games/{game['game_id']}", headers=token_for(app, any_user(app))))
+
+
+def test_create_game(app):
+    body = {"event_name": "Super Bowl", "entry_fee": 10.0}
+    assert_indexed(app, lambda client: client.post("/api/games", json=body, headers=token_for(app, any_user(app))))
+
+
+def test_create_games_bulk(app):
+    body = {"event_name": "Super Bowl", "entry_fee": 10.0, "count": 50, "name_pattern": "Office Pool {n}"}
+    assert_indexed(app, lambda client: client.post("/api/games/bulk", json=body, headers=token_for(app, any_user(app))))
+
+
+def test_reserve_and_release_square(app):
+    game = game_with(app, status="pending", **{"open_squares.0": {"$exists": True}})
+    square = game["open_squares"][0]
+    headers = token_for(app, any_user(app))
+    assert_indexed(app, lambda client: client.post(f"/api/games/{game['game_id']}/reserve", json={"square_number": square}, headers=headers))
+    assert_indexed(app, lambda client: client.delete(f"/api/games/{game['game_id']}/reserve/{square}", headers=headers))
+
+
+def test_join_and_leave(app):
+    game = game_with(app, status="pending", **{"open_squares.0": {"$exists": True}})
+    user_id = next(uid for uid in app[3] if all(not square or square["user_id"] != uid for square in game["squares"]))
+    headers = token_for(app, user_id)
+    assert_indexed(app, lambda client: client.post(f"/api/games/{game['game_id']}/join", json={"square_number": game["open_squares"][0]}, headers=headers))
+    assert_indexed(app, lambda client: client.post(f"/api/games/{game['game_id']}/leave", headers=headers))
+
+
+@pytest.mark.parametrize("event_name", [None, "Super Bowl"])
+def test_quick_join(app, event_name):
+    body = {"event_name": event_name, "max_entry_fee": 10.0}
+    assert_indexed(app, lambda client: client.post("/api/games/quick-join", json=body, headers=token_for(app, any_user(app))))
+
+
+def test_update_score(app):
+    game = game_with(app, status="active", **{"quarter_scores.Q1": {"$exists": False}})
+    body = {"quarter": "Q1", "score": "7-3"}
+    assert_indexed(app, lambda client: client.post(f"/api/games/{game['game_id']}/score", json=body, headers=token_for(app, game["creator_id"])))
+
+
+def test_settle_quarter_jobs(app):
+    _, server, _, _ = app
+    game = game_with(app, status="active", **{"quarter_scores.Q2": {"$exists": False}})
+    quarter = "Q1" if "Q1" not in game["quarter_scores"] else "Q2"
+    app[0].post(f"/api/games/{game['game_id']}/score", json={"quarter": quarter, "score": "14-10"}, headers=token_for(app, game["creator_id"]))
+    assert_indexed(app, lambda client: client.portal.call(server.run_jobs_once))
+
+
+def test_score_feed_settlement(app):
+    _, server, db, _ = app
+    game = game_with(app, status="active", **{"quarter_scores.Q3": {"$exists": False}})
+    db.games.update_one({"game_id": game["game_id"]}, {"$set": {"event_name": "Feed Bowl"}})
+    assert_indexed(app, lambda client: client.portal.call(server.settle_event_quarter, "Feed Bowl", "Q3", "10-7"))
+
+
+def test_delete_game(app):
+    game = game_with(app, status="pending")
+    assert_indexed(app, lambda client: client.delete(f"/api/games/{game['game_id']}", headers=token_for(app, game["creator_id"])))
+
+
+def test_profile(app):
+    assert_indexed(app, lambda client: client.get("/api/profile", headers=token_for(app, any_user(app))))
+
+
+@pytest.mark.parametrize("event_name", [None, "Super Bowl"])
+def test_leaderboards(app, event_name):
+    params = {"event_name": event_name} if event_name else {}
+    assert_indexed(app, lambda client: client.get("/api/leaderboards", params=params, headers=token_for(app, any_user(app))))
+
+
+def test_expired_hold_sweep(app):
+    _, server, db, _ = app
+    game = game_with(app, status="pending", **{"open_squares.0": {"$exists": True}})
+    db.square_holds.insert_one({
+        "hold_id": f"hold_{uuid.uuid4().hex[:12]}",
+        "game_id": game["game_id"],
+        "square_number": game["open_squares"][0],
+        "user_id": any_user(app),
+        "expires_at": datetime.now(timezone.utc) - timedelta(minutes=1),
+        "created_at": datetime.now(timezone.utc) - timedelta(minutes=2),
+    })
+    assert_indexed(app, lambda client: client.portal.call(server.sweep_expired_holds))
+
+
+def test_batch(app):
+    game = game_with(app, status="active")
+    body = {"requests": [{"path": "/api/auth/me"}, {"path": "/api/games"}, {"path": "/api/profile"}, {"path": f"/api/games/{game['game_id']}"}]}
+    response = assert_indexed(app, lambda client: client.post("/api/batch", json=body, headers=token_for(app, any_user(app))))
+    assert all(result["status"] == 200 for result in response.json()["responses"])
+
+
+@pytest.mark.parametrize("collection", ["games", "game_entries", "payouts"])
+@pytest.mark.parametrize("status", [None, "completed"])
+def test_export(app, admin, collection, status):
+    params = {"start": (datetime.now(timezone.utc) - timedelta(days=7)).isoformat()}
+    if status:
+        params["status"] = status
+    assert_indexed(app, lambda client: client.get(f"/api/admin/export/{collection}", params=params, headers=admin))
+
+
+def test_job_stats(app, admin):
+    now = datetime.now(timezone.utc)
+    app[2].dead_jobs.insert_many([
+        {"job_id": f"job_{uuid.uuid4().hex[:12]}", "kind": "settle_quarter", "payload": {}, "status": "dead", "attempts": 5, "failed_at": now - timedelta(minutes=n)}
+        for n in range(100)
+    ])
+    assert_indexed(app, lambda client: client.get("/api/admin/jobs", headers=admin))
+
+
+def test_rebuild_leaderboards(app, admin):
+    # Rebuilding reads every entry and payout by design
+    whole = {"game_entries", "payouts"}
+    assert_indexed(app, lambda client: client.post("/api/admin/leaderboards/rebuild", headers=admin), whole)
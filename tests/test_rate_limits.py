@@ -0,0 +1,103 @@
+"""
+Rate limiting: in-process token buckets, and which client and user a
+request is charged to.
+"""
+
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+
+def take(store, key="user:a:other", capacity=3, rate=1.0):
+    return asyncio.run(store.take(key, capacity, rate))
+
+
+def age(store, key, seconds):
+    """Pretend the bucket was last updated `seconds` earlier"""
+    tokens, updated = store.buckets[key]
+    store.buckets[key] = (tokens, updated - seconds)
+
+
+@pytest.fixture
+def store(server):
+    return server.MemoryRateLimitStore(max_keys=100)
+
+
+def test_burst_up_to_capacity(store):
+    results = [take(store) for _ in range(4)]
+
+    assert [allowed for allowed, _ in results] == [True, True, True, False]
+    assert results[2][1] == pytest.approx(0, abs=0.01)
+
+
+def test_tokens_refill_at_the_rate(store):
+    for _ in range(3):
+        take(store)
+    age(store, "user:a:other", 1.5)
+
+    assert take(store)[0]
+    assert not take(store)[0]
+
+
+def test_refill_stops_at_capacity(store):
+    take(store)
+    age(store, "user:a:other", 3600)
+
+    assert [take(store)[0] for _ in range(4)] == [True, True, True, False]
+
+
+def test_buckets_are_independent(store):
+    for _ in range(3):
+        take(store, "user:a:other")
+
+    assert not take(store, "user:a:other")[0]
+    assert take(store, "user:b:other")[0]
+
+
+def test_least_recently_used_bucket_is_dropped(server):
+    store = server.MemoryRateLimitStore(max_keys=2)
+    take(store, "a")
+    take(store, "b")
+    take(store, "a")
+    take(store, "c")
+
+    assert list(store.buckets) == ["a", "c"]
+
+
+def scope(peer, *forwarded):
+    return {"client": (peer, 1234), "headers": [(b"x-forwarded-for", value.encode()) for value in forwarded]}
+
+
+def test_forwarded_for_is_ignored_without_trusted_proxies(server, monkeypatch):
+    monkeypatch.setattr(server, "RATE_LIMIT_TRUSTED_PROXIES", 0)
+
+    assert server.client_ip(scope("10.0.0.1", "203.0.113.9")) == "10.0.0.1"
+
+
+def test_client_is_the_hop_the_trusted_proxy_saw(server, monkeypatch):
+    monkeypatch.setattr(server, "RATE_LIMIT_TRUSTED_PROXIES", 1)
+
+    # The leftmost entries are whatever the client chose to send
+    assert server.client_ip(scope("10.0.0.1", "1.2.3.4, 203.0.113.9")) == "203.0.113.9"
+    assert server.client_ip(scope("10.0.0.1", "1.2.3.4", "203.0.113.9")) == "203.0.113.9"
+
+
+def test_two_trusted_proxies(server, monkeypatch):
+    monkeypatch.setattr(server, "RATE_LIMIT_TRUSTED_PROXIES", 2)
+
+    assert server.client_ip(scope("10.0.0.1", "1.2.3.4, 203.0.113.9, 10.0.0.2")) == "203.0.113.9"
+    # Fewer hops than proxies: the header was not written by them
+    assert server.client_ip(scope("10.0.0.1", "203.0.113.9")) == "10.0.0.1"
+
+
+def test_session_tokens_of_a_user_share_a_bucket(server, monkeypatch):
+    monkeypatch.setattr(server, "stale_responses", server.StaleCache(10))
+    user = server.User(user_id="user_1", email="user_1@example.com", name="User 1", created_at=datetime.now(timezone.utc))
+    expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+    for token in ("first", "second"):
+        server.stale_responses.put(f"auth:{server.token_identity(token)}", (user, expires_at))
+
+    assert server.rate_limit_subject("first") == server.rate_limit_subject("second") == "user_1"
+    # Not authenticated yet: keyed by the token until it is
+    assert server.rate_limit_subject("third") == f"token:{server.token_identity('third')}"
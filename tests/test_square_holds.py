@@ -0,0 +1,76 @@
+"""
+Square holds: a held square is kept from other players until its holder
+joins or the hold expires and the sweep hands it back.
+"""
+
+from datetime import datetime, timezone, timedelta
+
+
+def reserve(client, game_id, square, headers):
+    return client.post(f"/api/games/{game_id}/reserve", json={"square_number": square}, headers=headers)
+
+
+def join(client, game_id, square, headers):
+    return client.post(f"/api/games/{game_id}/join", json={"square_number": square}, headers=headers)
+
+
+def test_held_square_is_kept_for_its_holder(client, mongo, make_user, new_game):
+    game_id = new_game()
+    holder, holder_headers = make_user()
+    _, other_headers = make_user()
+
+    assert reserve(client, game_id, 4, holder_headers).status_code == 200
+    assert 4 not in mongo.games.find_one({"game_id": game_id})["open_squares"]
+    assert reserve(client, game_id, 4, other_headers).status_code == 409
+    assert join(client, game_id, 4, other_headers).status_code == 409
+
+    assert join(client, game_id, 4, holder_headers).status_code == 200
+    assert mongo.games.find_one({"game_id": game_id})["squares"][4]["user_id"] == holder
+    assert mongo.square_holds.count_documents({"game_id": game_id}) == 0
+
+
+def test_reserving_again_extends_the_hold(client, mongo, make_user, new_game):
+    game_id = new_game()
+    _, headers = make_user()
+
+    first = reserve(client, game_id, 5, headers).json()
+    again = reserve(client, game_id, 5, headers).json()
+
+    assert again["hold_id"] == first["hold_id"]
+    assert again["expires_at"] >= first["expires_at"]
+    assert mongo.square_holds.count_documents({"game_id": game_id}) == 1
+
+
+def test_holds_count_towards_the_entry_limit(client, make_user, new_game):
+    game_id = new_game()
+    _, headers = make_user()
+
+    assert reserve(client, game_id, 1, headers).status_code == 200
+    assert join(client, game_id, 2, headers).status_code == 200
+    assert reserve(client, game_id, 3, headers).status_code == 400
+
+
+def test_expired_hold_is_swept_back_into_the_game(server, client, mongo, make_user, new_game):
+    game_id = new_game()
+    _, holder_headers = make_user()
+    other, other_headers = make_user()
+    assert reserve(client, game_id, 6, holder_headers).status_code == 200
+    mongo.square_holds.update_one({"game_id": game_id}, {"$set": {"expires_at": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+
+    client.portal.call(server.sweep_expired_holds)
+
+    assert mongo.square_holds.count_documents({"game_id": game_id}) == 0
+    assert 6 in mongo.games.find_one({"game_id": game_id})["open_squares"]
+    assert join(client, game_id, 6, other_headers).status_code == 200
+    assert mongo.games.find_one({"game_id": game_id})["squares"][6]["user_id"] == other
+
+
+def test_sweep_leaves_live_holds_alone(server, client, mongo, make_user, new_game):
+    game_id = new_game()
+    _, headers = make_user()
+    assert reserve(client, game_id, 7, headers).status_code == 200
+
+    client.portal.call(server.sweep_expired_holds)
+
+    assert mongo.square_holds.count_documents({"game_id": game_id}) == 1
+    assert 7 not in mongo.games.find_one({"game_id": game_id})["open_squares"]